@@ -0,0 +1,112 @@
+"""
+Benchmark the certificate renderers.
+
+Usage:
+    python -m app.benchmarks.certificate_rendering [--count 500] [--json]
+
+Renders the same number of distinct certificates with the flowable
+(SimpleDocTemplate) renderer and the template-stamping renderer, bypassing
+the render cache, once with compact output (binary streams, PDF_COMPACT)
+and once with ASCII85 streams. Reports certificates/sec and the average and
+largest PDF size per renderer and output mode.
+"""
+
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from reportlab import rl_config
+
+from app.services.certificate_generator import CertificateGenerator
+from app.services.certificate_stamper import StampedCertificateRenderer
+
+
+def make_certificates(count: int) -> List[Dict[str, Any]]:
+    """Canonical JSON for count distinct certificates."""
+    generator = CertificateGenerator()
+    issued_on = datetime(2025, 1, 27, 10, 0, 0)
+    return [
+        generator.create_canonical_json(
+            cert_id=f"LEARNOVA-2025-{index:06d}",
+            name=f"Learner Number {index}",
+            learner_id=f"user-{index}",
+            course_id="course-456",
+            course_name="Introduction to Distributed Systems",
+            issued_on=issued_on + timedelta(minutes=index),
+            issuer_address="0x0000000000000000000000000000000000000000",
+            grade="Distinction" if index % 3 == 0 else "Pass",
+            duration_hours=12.5,
+            modules=8
+        )
+        for index in range(1, count + 1)
+    ]
+
+
+def _run_renderer(
+    name: str,
+    output: str,
+    render: Callable[[Dict[str, Any]], bytes],
+    certificates: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    sizes = []
+    started = time.perf_counter()
+    for certificate in certificates:
+        sizes.append(len(render(certificate)))
+    elapsed = time.perf_counter() - started
+    return {
+        'renderer': name,
+        'output': output,
+        'certificates': len(certificates),
+        'seconds': round(elapsed, 3),
+        'certs_per_sec': round(len(certificates) / elapsed, 1) if elapsed > 0 else 0.0,
+        'avg_kb': round(sum(sizes) / len(sizes) / 1024, 2),
+        'max_kb': round(max(sizes) / 1024, 2)
+    }
+
+
+def run_benchmark(count: int) -> List[Dict[str, Any]]:
+    """Render count certificates with each renderer and output mode (after one warm-up render)."""
+    certificates = make_certificates(count)
+    flowable = CertificateGenerator()._build_flowable_pdf
+    stamped = StampedCertificateRenderer().render
+    results = []
+    use_a85 = rl_config.useA85
+    try:
+        for output, a85 in (('a85', 1), ('compact', 0)):
+            rl_config.useA85 = a85
+            for name, render in (('flowable', flowable), ('stamped', stamped)):
+                render(certificates[0])
+                results.append(_run_renderer(name, output, render, certificates))
+    finally:
+        rl_config.useA85 = use_a85
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare certificate PDF renderers")
+    parser.add_argument("--count", type=int, default=500, help="Certificates rendered per renderer")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+    if args.count < 1:
+        parser.error("--count must be at least 1")
+
+    results = run_benchmark(args.count)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = results[0]['certs_per_sec']
+    print(f"{'renderer':<12}{'output':<10}{'certs':>8}{'seconds':>10}{'certs/s':>10}{'speedup':>10}{'avg KB':>9}{'max KB':>9}")
+    for row in results:
+        speedup = row['certs_per_sec'] / baseline if baseline else 0.0
+        print(
+            f"{row['renderer']:<12}{row['output']:<10}{row['certificates']:>8}{row['seconds']:>10}"
+            f"{row['certs_per_sec']:>10}{speedup:>9.2f}x{row['avg_kb']:>9}{row['max_kb']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark the installed PDF extraction backends over a local corpus.
+
+Usage:
+    python -m app.benchmarks.pdf_extraction path/to/pdfs [--backends pypdf2,pymupdf] [--json]
+
+Each backend runs in a fresh process so peak memory is measured in isolation.
+Reports pages/sec, peak RSS and extracted text size per backend.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import multiprocessing
+from typing import Any, Dict, List
+
+from app.utils.pdf_backends import BACKENDS, available_backends
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of the current process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_backend(backend_name: str, paths: List[str]) -> Dict[str, Any]:
+    """Extract every page of every file with one backend (runs in a child process)."""
+    backend = BACKENDS[backend_name]
+    baseline_mb = _peak_rss_mb()
+    pages = 0
+    chars = 0
+    failures = 0
+    started = time.perf_counter()
+
+    for path in paths:
+        try:
+            with backend.open(path) as document:
+                for index in range(backend.page_count(document)):
+                    chars += len(backend.page_text(document, index))
+                    pages += 1
+        except Exception as e:
+            failures += 1
+            print(f"  {backend_name}: failed on {os.path.basename(path)}: {e}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'backend': backend_name,
+        'files': len(paths) - failures,
+        'failures': failures,
+        'pages': pages,
+        'seconds': round(elapsed, 3),
+        'pages_per_sec': round(pages / elapsed, 1) if elapsed > 0 else 0.0,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'peak_rss_delta_mb': round(_peak_rss_mb() - baseline_mb, 1),
+        'output_chars': chars
+    }
+
+
+def find_pdfs(corpus: str) -> List[str]:
+    """Collect PDF paths from a file or directory (recursively)."""
+    if os.path.isfile(corpus):
+        return [corpus]
+    paths = []
+    for root, _, files in os.walk(corpus):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+    return sorted(paths)
+
+
+def run_benchmark(paths: List[str], backends: List[str]) -> List[Dict[str, Any]]:
+    """Run each backend over the corpus in its own spawned process."""
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for backend_name in backends:
+        with context.Pool(processes=1) as pool:
+            results.append(pool.apply(_run_backend, (backend_name, paths)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare PDF extraction backends")
+    parser.add_argument("corpus", help="PDF file or directory of PDFs")
+    parser.add_argument("--backends", help="Comma-separated backends (default: all installed)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    paths = find_pdfs(args.corpus)
+    if not paths:
+        parser.error(f"No PDF files found in {args.corpus}")
+
+    backends = args.backends.split(",") if args.backends else available_backends()
+    unknown = [name for name in backends if name not in BACKENDS or not BACKENDS[name].is_available()]
+    if unknown:
+        parser.error(f"Backends not available: {', '.join(unknown)}")
+
+    results = run_benchmark(paths, backends)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Corpus: {len(paths)} PDF(s) from {args.corpus}")
+    print(f"{'backend':<12}{'pages':>8}{'pages/s':>10}{'peak MB':>10}{'delta MB':>10}{'chars':>12}{'failed':>8}")
+    for row in sorted(results, key=lambda r: r['pages_per_sec'], reverse=True):
+        print(
+            f"{row['backend']:<12}{row['pages']:>8}{row['pages_per_sec']:>10}"
+            f"{row['peak_rss_mb']:>10}{row['peak_rss_delta_mb']:>10}{row['output_chars']:>12}{row['failures']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Merkle-batched on-chain anchoring.
+Collects certificate anchors over a time or size window, builds a Merkle
+tree and anchors only its root, in one transaction per batch.
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.tracing import span
+from app.utils.merkle import build_tree, inclusion_proof, leaf_hash, to_hex
+
+logger = logging.getLogger(__name__)
+
+# Anchor certificates in Merkle batches instead of one storeCert transaction each
+ANCHOR_BATCH_ENABLED = os.getenv("ANCHOR_BATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+# Longest time a certificate waits for its batch to fill
+ANCHOR_BATCH_WINDOW_SECONDS = float(os.getenv("ANCHOR_BATCH_WINDOW_SECONDS", "10"))
+# Certificates per batch; a full batch is anchored without waiting for the window
+ANCHOR_BATCH_MAX_SIZE = int(os.getenv("ANCHOR_BATCH_MAX_SIZE", "256"))
+
+
+class AnchorBatcher:
+    """
+    Groups certificate anchors into Merkle batches.
+
+    submit() returns at once with a future for the certificate's anchor, so
+    waiting for a batch to fill holds no worker thread. A full batch is
+    anchored in a background thread right away, a partial one by a timer
+    once the window has passed since its first certificate. If the
+    transaction fails, every certificate of the batch gets the error.
+    """
+
+    def __init__(
+        self,
+        blockchain: Callable[[], Any],
+        window_seconds: Optional[float] = None,
+        max_size: Optional[int] = None
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            blockchain: Returns the BlockchainService (resolved per batch, so it can be built lazily)
+            window_seconds: Batch window (defaults to ANCHOR_BATCH_WINDOW_SECONDS)
+            max_size: Batch size limit (defaults to ANCHOR_BATCH_MAX_SIZE)
+        """
+        self._blockchain = blockchain
+        self.window_seconds = ANCHOR_BATCH_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self.max_size = max(1, max_size or ANCHOR_BATCH_MAX_SIZE)
+        self._pending: List[Tuple[str, str, Future]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.anchored = 0
+        self.failed = 0
+
+    def submit(self, cert_id: str, cid: str) -> Future:
+        """
+        Add a certificate to the current batch.
+
+        Args:
+            cert_id: Certificate ID
+            cid: Document CID to anchor
+
+        Returns:
+            Future resolving to a dict with tx_hash, root (hex), proof (list
+            of hex sibling hashes), index (leaf position) and size
+            (certificates in the batch); it fails if anchoring the batch fails
+        """
+        future: Future = Future()
+        batch = None
+        with self._lock:
+            self._pending.append((cert_id, cid, future))
+            if len(self._pending) >= self.max_size:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            threading.Thread(target=self._anchor, args=(batch,), daemon=True).start()
+        return future
+
+    def flush(self):
+        """Anchor the certificates collected so far without waiting for the window."""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._anchor(batch)
+
+    def _take(self) -> List[Tuple[str, str, Future]]:
+        """Detach the pending batch (caller holds the lock)."""
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _anchor(self, batch: List[Tuple[str, str, Future]]):
+        levels = build_tree([leaf_hash(cert_id, cid) for cert_id, cid, _ in batch])
+        root = to_hex(levels[-1][0])
+        try:
+            with span("chain.anchor_batch", merkle_root=root, certs=len(batch)):
+                tx_result = self._blockchain().store_merkle_root(root, len(batch))
+        except Exception as e:
+            logger.error(f"Anchoring Merkle batch of {len(batch)} certificates failed: {e}")
+            with self._lock:
+                self.failed += len(batch)
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        with self._lock:
+            self.batches += 1
+            self.anchored += len(batch)
+        for index, (_, _, future) in enumerate(batch):
+            future.set_result({
+                'tx_hash': tx_result.get('tx_hash'),
+                'root': root,
+                'proof': [to_hex(node) for node in inclusion_proof(levels, index)],
+                'index': index,
+                'size': len(batch)
+            })
+
+    def stats(self) -> Dict[str, Any]:
+        """Batches anchored, certificates anchored or failed, and certificates waiting."""
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'anchored': self.anchored,
+                'failed': self.failed,
+                'pending': len(self._pending),
+                'avg_batch_size': round(self.anchored / self.batches, 1) if self.batches else 0.0
+            }
@@ -0,0 +1,171 @@
+"""
+Local content-addressed store for certificate documents.
+Keeps pinned certificate PDFs on disk keyed by their IPFS CID, so downloads
+do not depend on a public gateway. Content is only stored if it hashes to
+the CID it is stored under.
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from app.services.tracing import span
+from app.utils.disk_cache import DiskLRUCache
+from app.utils.ipfs_cid import compute_cid, cid_version
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_CACHE_ENABLED = os.getenv("ARTIFACT_CACHE_ENABLED", "true").lower() == "true"
+ARTIFACT_CACHE_DIR = os.getenv(
+    "ARTIFACT_CACHE_DIR",
+    os.path.join(os.path.dirname(__file__), "../../.cache/artifacts")
+)
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Gateways tried in order on a miss (comma-separated URL prefixes the CID is appended to)
+ARTIFACT_GATEWAYS = [
+    gateway.strip()
+    for gateway in os.getenv("ARTIFACT_GATEWAYS", os.getenv("IPFS_GATEWAY_BASE", "https://ipfs.io/ipfs/")).split(",")
+    if gateway.strip()
+]
+ARTIFACT_FETCH_TIMEOUT = float(os.getenv("ARTIFACT_FETCH_TIMEOUT", "30"))
+# Largest document fetched from a gateway
+ARTIFACT_FETCH_MAX_BYTES = int(os.getenv("ARTIFACT_FETCH_MAX_BYTES", str(20 * 1024 * 1024)))
+
+
+def matches_cid(cid: str, content: bytes) -> bool:
+    """True if content is what IPFS stores under cid (with Pinata's importer settings)."""
+    try:
+        return compute_cid(content, cid_version=cid_version(cid)) == cid
+    except ValueError:
+        return False
+
+
+class ArtifactStore:
+    """
+    Certificate documents on local disk, addressed by CID.
+
+    Entries are written when a document is pinned and when a miss is filled
+    from a gateway or by re-rendering. A CID names exactly one content, so
+    entries never go stale; the least recently used are evicted once the
+    store exceeds its size budget.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        gateways: Optional[List[str]] = None,
+        timeout: Optional[float] = None
+    ):
+        """
+        Initialize the store (the cache directory is opened on first use).
+
+        Args:
+            directory: Cache directory (defaults to ARTIFACT_CACHE_DIR)
+            max_bytes: Size budget (defaults to ARTIFACT_CACHE_MAX_BYTES)
+            gateways: Gateway URL prefixes (defaults to ARTIFACT_GATEWAYS)
+            timeout: Seconds per gateway request (defaults to ARTIFACT_FETCH_TIMEOUT)
+        """
+        self.directory = directory or ARTIFACT_CACHE_DIR
+        self.max_bytes = max_bytes or ARTIFACT_CACHE_MAX_BYTES
+        self.gateways = ARTIFACT_GATEWAYS if gateways is None else gateways
+        self.timeout = ARTIFACT_FETCH_TIMEOUT if timeout is None else timeout
+        self.fetched = 0
+        self.fetch_failures = 0
+        self._cache: Optional[DiskLRUCache] = None
+        self._cache_lock = threading.Lock()
+
+    @property
+    def cache(self) -> Optional[DiskLRUCache]:
+        """The on-disk cache, or None if disabled or unavailable."""
+        if not ARTIFACT_CACHE_ENABLED:
+            return None
+        if self._cache is None:
+            with self._cache_lock:
+                if self._cache is None:
+                    try:
+                        self._cache = DiskLRUCache(self.directory, self.max_bytes, suffix=".pdf")
+                    except OSError as e:
+                        logger.warning(f"Certificate artifact cache unavailable: {e}")
+                        return None
+        return self._cache
+
+    def get(self, cid: str) -> Optional[bytes]:
+        """
+        Get a stored document.
+
+        Returns:
+            Document bytes, or None on a miss
+        """
+        cache = self.cache
+        return cache.get(cid) if cache else None
+
+    def put(self, cid: str, content: bytes) -> bool:
+        """
+        Store a document under its CID.
+
+        Returns:
+            True if the content matches the CID (whether or not it could be cached)
+        """
+        if not matches_cid(cid, content):
+            logger.warning(f"Not storing artifact: content does not hash to {cid}")
+            return False
+        cache = self.cache
+        if cache:
+            try:
+                cache.set(cid, content)
+            except OSError as e:
+                logger.warning(f"Could not cache certificate artifact {cid}: {e}")
+        return True
+
+    def fetch(self, cid: str) -> Optional[bytes]:
+        """
+        Fetch a document from the gateways and store it.
+
+        Each gateway is tried in turn; a response that does not hash to the
+        CID is discarded.
+
+        Returns:
+            Verified document bytes, or None if no gateway served them
+        """
+        for gateway in self.gateways:
+            url = f"{gateway}{cid}"
+            try:
+                with span("artifact.fetch", cid=cid, gateway=gateway) as fetch_span:
+                    content = self._download(url)
+                    fetch_span.set_attribute('bytes', len(content))
+            except Exception as e:
+                logger.warning(f"Could not fetch {cid} from {gateway}: {e}")
+                continue
+            if self.put(cid, content):
+                with self._cache_lock:
+                    self.fetched += 1
+                return content
+            logger.warning(f"Gateway {gateway} returned content that does not match {cid}")
+        with self._cache_lock:
+            self.fetch_failures += 1
+        return None
+
+    def _download(self, url: str) -> bytes:
+        """GET a URL, refusing bodies over ARTIFACT_FETCH_MAX_BYTES."""
+        with requests.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > ARTIFACT_FETCH_MAX_BYTES:
+                    raise ValueError(f"Document exceeds {ARTIFACT_FETCH_MAX_BYTES} bytes")
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistics plus gateway fetch counters."""
+        cache = self.cache
+        stats: Dict[str, Any] = cache.stats() if cache else {}
+        with self._cache_lock:
+            stats.update(fetched=self.fetched, fetch_failures=self.fetch_failures)
+        return stats
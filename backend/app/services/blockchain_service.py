@@ -5,12 +5,25 @@ Handles certificate storage on-chain via Polygon Mumbai (or other EVM networks).
 
 import os
 import logging
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, List
+import requests
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
 
+from app.services.tracing import span
+from app.utils.merkle import leaf_hash, root_from_proof, from_hex, to_hex
+
 logger = logging.getLogger(__name__)
 
+# Pipeline stages send transactions from worker threads; nonce lookup and
+# submission must not interleave or two transactions get the same nonce
+_send_lock = threading.Lock()
+
+# Contract reads per JSON-RPC batch request, and its timeout in seconds
+CHAIN_BATCH_SIZE = int(os.getenv("CHAIN_BATCH_SIZE", "100"))
+CHAIN_BATCH_TIMEOUT = float(os.getenv("CHAIN_BATCH_TIMEOUT", "30"))
+
 class BlockchainService:
     """Service for interacting with CertRegistry smart contract."""
     
@@ -26,6 +39,7 @@ class BlockchainService:
             raise ValueError("PRIVATE_KEY environment variable is required")
         
         # Initialize Web3
+        self.rpc_url = rpc_url
         self.w3 = Web3(Web3.HTTPProvider(rpc_url))
         
         # Add POA middleware for Polygon (required for Mumbai testnet)
@@ -44,6 +58,8 @@ class BlockchainService:
         self.contract_address = Web3.to_checksum_address(contract_address)
         self.contract_abi = self._load_contract_abi()
         self.contract = self.w3.eth.contract(address=self.contract_address, abi=self.contract_abi)
+        # Merkle root -> anchor timestamp; an anchored root never changes, so lookups are kept
+        self._anchored_roots: Dict[str, int] = {}
         
     def _load_contract_abi(self) -> list:
         """
@@ -60,6 +76,8 @@ class BlockchainService:
         # Default minimal ABI for CertRegistry contract
         # Expected methods: storeCert(string certId, string cid, address owner)
         #                  getCertCID(string certId) -> string
+        #                  anchorRoot(bytes32 root, uint256 size)  (batch anchoring)
+        #                  getRootTimestamp(bytes32 root) -> uint256 (0 if never anchored)
         return [
             {
                 "inputs": [
@@ -89,6 +107,23 @@ class BlockchainService:
                 ],
                 "name": "CertStored",
                 "type": "event"
+            },
+            {
+                "inputs": [
+                    {"internalType": "bytes32", "name": "root", "type": "bytes32"},
+                    {"internalType": "uint256", "name": "size", "type": "uint256"}
+                ],
+                "name": "anchorRoot",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
+            {
+                "inputs": [{"internalType": "bytes32", "name": "root", "type": "bytes32"}],
+                "name": "getRootTimestamp",
+                "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+                "stateMutability": "view",
+                "type": "function"
             }
         ]
     
@@ -125,36 +160,65 @@ class BlockchainService:
         except Exception as e:
             logger.debug(f"Could not check existing certificate: {e}")
         
-        # Build transaction
+        logger.info(f"Sending transaction to store certificate {cert_id} on-chain...")
+        result = self._send_transaction('storeCert', [cert_id, cid, owner_address], cert_id=cert_id)
+        logger.info(f"Certificate {cert_id} successfully stored on-chain. Block: {result['block_number']}")
+        return result
+    
+    def store_merkle_root(self, root: str, size: int) -> Dict[str, Any]:
+        """
+        Anchor the Merkle root of a batch of certificates in one transaction.
+        
+        Args:
+            root: Root hash as 0x-prefixed hex
+            size: Number of certificates in the batch
+            
+        Returns:
+            Dict containing transaction hash and receipt
+            
+        Raises:
+            Exception: If transaction fails
+        """
+        logger.info(f"Sending transaction to anchor Merkle root {root} of {size} certificates...")
+        result = self._send_transaction('anchorRoot', [from_hex(root), size], merkle_root=root, certs=size)
+        logger.info(f"Merkle root {root} anchored on-chain. Block: {result['block_number']}")
+        return result
+    
+    def _send_transaction(self, fn_name: str, args: List[Any], **span_attributes: Any) -> Dict[str, Any]:
+        """Estimate gas for, sign and send a contract call, and wait for its receipt."""
         try:
-            function = self.contract.functions.storeCert(cert_id, cid, owner_address)
+            function = getattr(self.contract.functions, fn_name)(*args)
             
             # Estimate gas
-            gas_estimate = function.estimate_gas({'from': self.account.address})
-            
-            # Build transaction
-            transaction = function.build_transaction({
-                'from': self.account.address,
-                'nonce': self.w3.eth.get_transaction_count(self.account.address),
-                'gas': int(gas_estimate * 1.2),  # Add 20% buffer
-                'gasPrice': self.w3.eth.gas_price,
-            })
-            
-            # Sign transaction
-            signed_txn = self.account.sign_transaction(transaction)
-            
-            # Send transaction
-            logger.info(f"Sending transaction to store certificate {cert_id} on-chain...")
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+            with span("chain.estimate_gas", **span_attributes) as gas_span:
+                gas_estimate = function.estimate_gas({'from': self.account.address})
+                gas_span.set_attribute('gas', gas_estimate)
+            
+            with _send_lock, span("chain.send_transaction", **span_attributes) as send_span:
+                # Build transaction (pending count includes our unconfirmed transactions)
+                transaction = function.build_transaction({
+                    'from': self.account.address,
+                    'nonce': self.w3.eth.get_transaction_count(self.account.address, 'pending'),
+                    'gas': int(gas_estimate * 1.2),  # Add 20% buffer
+                    'gasPrice': self.w3.eth.gas_price,
+                })
+                
+                # Sign transaction
+                signed_txn = self.account.sign_transaction(transaction)
+                
+                # Send transaction
+                tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+                send_span.set_attributes(nonce=transaction['nonce'], tx_hash=tx_hash.hex())
             tx_hash_hex = tx_hash.hex()
             
             logger.info(f"Transaction sent. Hash: {tx_hash_hex}. Waiting for confirmation...")
             
             # Wait for confirmation (1 block for testnet)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+            with span("chain.wait_receipt", tx_hash=tx_hash_hex, **span_attributes) as receipt_span:
+                receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+                receipt_span.set_attributes(block_number=receipt.blockNumber, gas_used=receipt.gasUsed)
             
             if receipt.status == 1:
-                logger.info(f"Certificate {cert_id} successfully stored on-chain. Block: {receipt.blockNumber}")
                 return {
                     'tx_hash': tx_hash_hex,
                     'block_number': receipt.blockNumber,
@@ -182,24 +246,187 @@ class BlockchainService:
             CID string if found, None otherwise
         """
         try:
-            cid = self.contract.functions.getCertCID(cert_id).call()
+            with span("chain.get_cert_cid", cert_id=cert_id):
+                cid = self.contract.functions.getCertCID(cert_id).call()
             return cid if cid else None
         except Exception as e:
             logger.debug(f"Certificate {cert_id} not found on-chain: {str(e)}")
             return None
     
-    def verify_certificate(self, cert_id: str, expected_cid: str) -> bool:
+    def get_certificate_cids(self, cert_ids: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Get many certificate CIDs using JSON-RPC batch requests.
+        
+        Each batch of CHAIN_BATCH_SIZE getCertCID calls is one HTTP round
+        trip. Falls back to one call per ID if the node rejects batches.
+        
+        Args:
+            cert_ids: Certificate IDs to lookup
+            
+        Returns:
+            Dict of cert_id -> CID string, or None if not found
+        """
+        found: Dict[str, Optional[str]] = {}
+        for start in range(0, len(cert_ids), CHAIN_BATCH_SIZE):
+            chunk = cert_ids[start:start + CHAIN_BATCH_SIZE]
+            batch = [
+                {
+                    'jsonrpc': '2.0',
+                    'id': index,
+                    'method': 'eth_call',
+                    'params': [
+                        {
+                            'to': self.contract_address,
+                            'data': self.contract.encodeABI(fn_name='getCertCID', args=[cert_id])
+                        },
+                        'latest'
+                    ]
+                }
+                for index, cert_id in enumerate(chunk)
+            ]
+            with span("chain.get_cert_cids", certs=len(chunk)) as batch_span:
+                response = requests.post(self.rpc_url, json=batch, timeout=CHAIN_BATCH_TIMEOUT)
+                response.raise_for_status()
+                replies = response.json()
+                batched = isinstance(replies, list)
+                batch_span.set_attribute('batched', batched)
+            
+            if not batched:
+                logger.warning("RPC node rejected a batch request; reading certificate CIDs one by one")
+                for cert_id in chunk:
+                    found[cert_id] = self.get_certificate_cid(cert_id)
+                continue
+            
+            by_id = {reply.get('id'): reply for reply in replies if isinstance(reply, dict)}
+            for index, cert_id in enumerate(chunk):
+                reply = by_id.get(index)
+                if reply is None:
+                    found[cert_id] = self.get_certificate_cid(cert_id)
+                else:
+                    found[cert_id] = self._decode_cid(cert_id, reply)
+        return found
+    
+    def _decode_cid(self, cert_id: str, reply: Dict[str, Any]) -> Optional[str]:
+        """Decode a getCertCID eth_call reply; errors (e.g. reverts) mean not found."""
+        if 'error' in reply:
+            logger.debug(f"Certificate {cert_id} not found on-chain: {reply['error']}")
+            return None
+        result = reply.get('result') or '0x'
+        if len(result) <= 2:
+            return None
+        try:
+            (cid,) = self.w3.codec.decode(['string'], bytes.fromhex(result[2:]))
+        except Exception as e:
+            logger.debug(f"Could not decode CID for {cert_id}: {str(e)}")
+            return None
+        return cid if cid else None
+    
+    def get_cert_stored_events(self, from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        """
+        Get CertStored events emitted in a block range.
+        
+        Args:
+            from_block: First block (inclusive)
+            to_block: Last block (inclusive)
+            
+        Returns:
+            List of event dicts (cert_id, cid, owner, timestamp, block_number,
+            block_hash, log_index, tx_hash)
+        """
+        with span("chain.get_logs", from_block=from_block, to_block=to_block) as logs_span:
+            logs = self.contract.events.CertStored().get_logs(fromBlock=from_block, toBlock=to_block)
+            logs_span.set_attribute('events', len(logs))
+        return [
+            {
+                'cert_id': log['args']['certId'],
+                'cid': log['args']['cid'],
+                'owner': log['args']['owner'],
+                'timestamp': log['args']['timestamp'],
+                'block_number': log['blockNumber'],
+                'block_hash': log['blockHash'].hex(),
+                'log_index': log['logIndex'],
+                'tx_hash': log['transactionHash'].hex()
+            }
+            for log in logs
+        ]
+    
+    def get_block_header(self, block: Any = 'latest') -> Dict[str, Any]:
+        """
+        Get the number, hash and timestamp of a block.
+        
+        Args:
+            block: Block number or tag (e.g. 'latest')
+        """
+        with span("chain.get_block", block=str(block)):
+            header = self.w3.eth.get_block(block)
+        return {
+            'number': header['number'],
+            'hash': header['hash'].hex(),
+            'timestamp': header['timestamp']
+        }
+    
+    def get_root_timestamp(self, root: str) -> Optional[int]:
+        """
+        Get the time a Merkle root was anchored.
+        
+        Args:
+            root: Root hash as 0x-prefixed hex
+            
+        Returns:
+            Block timestamp of the anchor, None if the root was never anchored
+        """
+        if root in self._anchored_roots:
+            return self._anchored_roots[root]
+        with span("chain.get_root_timestamp", merkle_root=root):
+            timestamp = self.contract.functions.getRootTimestamp(from_hex(root)).call()
+        if timestamp:
+            self._anchored_roots[root] = timestamp
+        return timestamp or None
+    
+    def verify_merkle_inclusion(self, cert_id: str, cid: str, merkle: Dict[str, Any]) -> Optional[str]:
+        """
+        Check a batch-anchored certificate's inclusion proof.
+        
+        The root is recomputed from the certificate ID, the CID and the proof,
+        then looked up on chain, so neither the stored root nor the proof
+        has to be trusted.
+        
+        Args:
+            cert_id: Certificate ID
+            cid: Document CID the certificate should anchor
+            merkle: Inclusion proof as stored with the certificate ({'proof': [...]} of hex hashes)
+            
+        Returns:
+            The anchored root (hex) if the proof holds, None otherwise
+        """
+        root = to_hex(root_from_proof(leaf_hash(cert_id, cid), [from_hex(node) for node in merkle.get('proof', [])]))
+        if merkle.get('root') and merkle['root'] != root:
+            logger.warning(f"Inclusion proof of {cert_id} leads to {root}, not the recorded root {merkle['root']}")
+            return None
+        return root if self.get_root_timestamp(root) else None
+    
+    def verify_certificate(self, cert_id: str, expected_cid: str, merkle: Optional[Dict[str, Any]] = None) -> bool:
         """
         Verify that a certificate CID matches the on-chain value.
         
         Args:
             cert_id: Certificate ID to verify
             expected_cid: Expected CID to compare
+            merkle: Inclusion proof, for a certificate anchored in a batch;
+                it is checked against the anchored root instead
             
         Returns:
             True if CID matches, False otherwise
         """
         try:
+            if merkle:
+                root = self.verify_merkle_inclusion(cert_id, expected_cid.strip(), merkle)
+                if root:
+                    logger.info(f"Certificate {cert_id} verified under Merkle root {root}")
+                else:
+                    logger.warning(f"Inclusion proof of {cert_id} does not lead to an anchored root")
+                return root is not None
+            
             on_chain_cid = self.get_certificate_cid(cert_id)
             if not on_chain_cid:
                 logger.warning(f"Certificate {cert_id} not found on-chain")
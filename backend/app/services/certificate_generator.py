@@ -5,9 +5,14 @@ Creates canonical JSON certificates and renders them as PDFs.
 
 import os
 import json
+import hashlib
 import logging
+import threading
+from contextlib import contextmanager
+from io import BytesIO
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
+from reportlab import rl_config
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.units import inch
 from reportlab.lib import colors
@@ -15,41 +20,113 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 
+from app.services.certificate_stamper import StampedCertificateRenderer
+from app.services.serial_allocator import SerialAllocator
+from app.services.tracing import current_span
+from app.utils.disk_cache import DiskLRUCache
+
 logger = logging.getLogger(__name__)
 
+# Rendered PDFs cached by canonical JSON digest (rendering is deterministic)
+RENDER_CACHE_ENABLED = os.getenv("RENDER_CACHE_ENABLED", "true").lower() == "true"
+RENDER_CACHE_DIR = os.getenv(
+    "RENDER_CACHE_DIR",
+    os.path.join(os.path.dirname(__file__), "../../.cache/certificates")
+)
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Bump when the certificate layout changes so cached PDFs are not reused
+RENDER_VERSION = "1"
+
+# Certificate renderer: "flowable" lays out each PDF with platypus;
+# "stamped" draws a precomputed layout and stamps the fields (faster)
+CERT_RENDERER = os.getenv("CERT_RENDERER", "flowable").lower()
+RENDERERS = ("flowable", "stamped")
+
+# Compact PDF output: binary Flate streams instead of ASCII85-wrapped ones
+# (smaller and faster to write). Changes the bytes, so it is part of the cache key
+PDF_COMPACT = os.getenv("PDF_COMPACT", "true").lower() == "true"
+# reportlab reads rl_config.useA85 for every stream it writes, so it is only
+# switched off while compact renders run and restored after the last one
+_compact_lock = threading.Lock()
+_compact_renders = 0
+_saved_use_a85 = None
+
+
+@contextmanager
+def compact_output() -> Iterator[None]:
+    """Write binary Flate streams in the reportlab renders inside, if PDF_COMPACT."""
+    global _compact_renders, _saved_use_a85
+    if not PDF_COMPACT:
+        yield
+        return
+    with _compact_lock:
+        if _compact_renders == 0:
+            _saved_use_a85 = rl_config.useA85
+            rl_config.useA85 = 0
+        _compact_renders += 1
+    try:
+        yield
+    finally:
+        with _compact_lock:
+            _compact_renders -= 1
+            if _compact_renders == 0:
+                rl_config.useA85 = _saved_use_a85
+
+
+_render_cache: Optional[DiskLRUCache] = None
+_render_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> Optional[DiskLRUCache]:
+    """Get the shared rendered-certificate cache, or None if disabled or unavailable."""
+    global _render_cache
+    if not RENDER_CACHE_ENABLED:
+        return None
+    if _render_cache is None:
+        with _render_cache_lock:
+            if _render_cache is None:
+                try:
+                    _render_cache = DiskLRUCache(RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES, suffix=".pdf")
+                except OSError as e:
+                    logger.warning(f"Certificate render cache unavailable: {e}")
+                    return None
+    return _render_cache
+
+
+def canonical_digest(certificate_data: Dict[str, Any]) -> str:
+    """SHA-256 of canonical certificate JSON (sorted keys, no whitespace)."""
+    canonical = json.dumps(certificate_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
 class CertificateGenerator:
     """Service for generating canonical certificate JSON and PDF documents."""
     
-    def __init__(self):
-        """Initialize certificate generator."""
+    def __init__(self, renderer: Optional[str] = None):
+        """
+        Initialize certificate generator.
+        
+        Args:
+            renderer: "flowable" or "stamped" (defaults to CERT_RENDERER)
+        """
         self.issuer = os.getenv("CERT_ISSUER", "Learnova")
-        self.serial_counter = self._load_serial_counter()
-    
-    def _load_serial_counter(self) -> int:
-        """Load or initialize serial number counter."""
-        counter_file = os.path.join(os.path.dirname(__file__), "../../.cert_serial")
-        if os.path.exists(counter_file):
-            try:
-                with open(counter_file, 'r') as f:
-                    return int(f.read().strip())
-            except Exception:
-                return 0
-        return 0
-    
-    def _save_serial_counter(self, counter: int):
-        """Save serial number counter."""
-        counter_file = os.path.join(os.path.dirname(__file__), "../../.cert_serial")
-        try:
-            with open(counter_file, 'w') as f:
-                f.write(str(counter))
-        except Exception as e:
-            logger.warning(f"Failed to save serial counter: {e}")
+        self.renderer = (renderer or CERT_RENDERER).lower()
+        if self.renderer not in RENDERERS:
+            raise ValueError(f"CERT_RENDERER must be one of {', '.join(RENDERERS)}, got '{self.renderer}'")
+        self._stamper = StampedCertificateRenderer() if self.renderer == "stamped" else None
+        # RenderPool that renders in worker processes (set at application startup)
+        self.render_pool = None
+        # Shared across requests, worker threads and worker processes
+        self.serial_allocator = SerialAllocator()
     
     def generate_cert_id(self, year: Optional[int] = None) -> str:
         """
         Generate a canonical certificate ID.
         Format: LEARNOVA-YYYY-<serial>
         
+        Serials come from blocks leased by the SerialAllocator, so this is
+        an in-memory operation except when a block runs out.
+        
         Args:
             year: Year for certificate (defaults to current year)
             
@@ -59,12 +136,8 @@ class CertificateGenerator:
         if year is None:
             year = datetime.now().year
         
-        self.serial_counter += 1
-        serial = str(self.serial_counter).zfill(6)
-        cert_id = f"LEARNOVA-{year}-{serial}"
-        
-        self._save_serial_counter(self.serial_counter)
-        return cert_id
+        serial = str(self.serial_allocator.next(year)).zfill(6)
+        return f"LEARNOVA-{year}-{serial}"
     
     def create_canonical_json(
         self,
@@ -120,21 +193,72 @@ class CertificateGenerator:
         
         return certificate
     
-    def render_pdf(self, certificate_data: Dict[str, Any], output_path: str):
+    def render_pdf(self, certificate_data: Dict[str, Any], output_path: Optional[str] = None) -> bytes:
         """
         Render certificate PDF from canonical JSON data.
         
+        The PDF is built in memory; pass output_path to also save it to disk.
+        Rendering is deterministic: the same canonical JSON always gives
+        the same bytes (and so the same IPFS CID). Results are cached by
+        canonical JSON digest, so re-renders for resumes and downloads
+        reuse them.
+        
         Args:
             certificate_data: Canonical certificate JSON
-            output_path: Path to save PDF
+            output_path: Optional path to save PDF
+            
+        Returns:
+            PDF bytes
         """
+        cache = get_render_cache()
+        output = "compact" if PDF_COMPACT else "a85"
+        key = f"v{RENDER_VERSION}-{self.renderer}-{output}-{canonical_digest(certificate_data)}"
+        pdf_bytes = cache.get(key) if cache else None
+        render_span = current_span()
+        if render_span is not None:
+            render_span.set_attribute('cached', pdf_bytes is not None)
+        
+        if pdf_bytes is None:
+            if self.render_pool is not None:
+                pdf_bytes = self.render_pool.render_certificate(self.renderer, certificate_data)
+            else:
+                pdf_bytes = self._build_pdf(certificate_data)
+            if cache:
+                try:
+                    cache.set(key, pdf_bytes)
+                except OSError as e:
+                    logger.warning(f"Could not cache rendered certificate: {e}")
+        
+        if output_path:
+            with open(output_path, 'wb') as f:
+                f.write(pdf_bytes)
+            logger.info(f"Certificate PDF generated: {output_path}")
+        
+        return pdf_bytes
+    
+    def _build_pdf(self, certificate_data: Dict[str, Any]) -> bytes:
+        """Render the certificate with the configured renderer."""
+        with compact_output():
+            if self._stamper is not None:
+                return self._stamper.render(certificate_data)
+            return self._build_flowable_pdf(certificate_data)
+    
+    def _build_flowable_pdf(self, certificate_data: Dict[str, Any]) -> bytes:
+        """Lay out the certificate with reportlab platypus flowables."""
+        buffer = BytesIO()
         doc = SimpleDocTemplate(
-            output_path,
+            buffer,
             pagesize=A4,
             rightMargin=72,
             leftMargin=72,
             topMargin=72,
-            bottomMargin=18
+            bottomMargin=18,
+            # Fixed creation date and document ID instead of the current time
+            invariant=1,
+            pageCompression=1,
+            title=f"Certificate {certificate_data['certId']}",
+            author=certificate_data['issuer'],
+            creator=certificate_data['issuer']
         )
         
         styles = getSampleStyleSheet()
@@ -228,5 +352,5 @@ class CertificateGenerator:
         
         # Build PDF
         doc.build(story)
-        logger.info(f"Certificate PDF generated: {output_path}")
+        return buffer.getvalue()
 
@@ -4,26 +4,109 @@ Orchestrates the entire certificate generation, IPFS pinning, and blockchain anc
 """
 
 import os
+import time
+import uuid
+import socket
+import asyncio
 import logging
-import tempfile
+import threading
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Set, Tuple
 from dotenv import load_dotenv
 
 # Ensure environment variables are loaded
 load_dotenv()
 
+from app.services.anchor_batcher import AnchorBatcher, ANCHOR_BATCH_ENABLED
+from app.services.artifact_store import ArtifactStore
 from app.services.certificate_generator import CertificateGenerator
 from app.services.proof_generator import ProofGenerator
-from app.services.pinata_service import PinataService
+from app.services.pinata_service import PinataService, PINATA_CID_VERSION
 from app.services.blockchain_service import BlockchainService
 from app.services.db_service import DatabaseService
 from app.services.email_service import EmailService
+from app.services.stage_graph import StageGraph
+from app.services.tracing import current_span, span, traced
+from app.utils.ipfs_cid import CHUNK_SIZE, compute_cid
+from app.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Learners rendered, pinned and anchored at once during cohort issuance
+BULK_ISSUE_CONCURRENCY = int(os.getenv("BULK_ISSUE_CONCURRENCY", "8"))
+# Seconds before a service whose initialization failed is tried again
+SERVICE_RETRY_SECONDS = float(os.getenv("SERVICE_RETRY_SECONDS", "30"))
+# On-chain lookup cache for verification: TTL for a confirmed anchor, TTL for
+# lookups that may change soon (not yet on chain, different CID), and size
+VERIFY_CACHE_TTL_SECONDS = float(os.getenv("VERIFY_CACHE_TTL_SECONDS", "300"))
+VERIFY_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("VERIFY_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+VERIFY_CACHE_MAX_ENTRIES = int(os.getenv("VERIFY_CACHE_MAX_ENTRIES", "10000"))
+
+# Issuance attempts (first attempt plus resumes) before a certificate is given up
+RESUME_MAX_ATTEMPTS = int(os.getenv("RESUME_MAX_ATTEMPTS", "5"))
+# A pending row not updated for this long belongs to a crashed attempt and may be resumed
+RESUME_STALE_SECONDS = float(os.getenv("RESUME_STALE_SECONDS", "900"))
+
+# Cross-worker issuance lease per learner and course: how long a lease lives
+# (outlasting a crashed holder), how long a duplicate request waits for the
+# holder to finish, and how often it checks
+ISSUE_LEASE_SECONDS = float(os.getenv("ISSUE_LEASE_SECONDS", "600"))
+ISSUE_LEASE_WAIT_SECONDS = float(os.getenv("ISSUE_LEASE_WAIT_SECONDS", "300"))
+ISSUE_LEASE_POLL_SECONDS = float(os.getenv("ISSUE_LEASE_POLL_SECONDS", "2"))
+
+# Lease holder prefix identifying this worker process
+_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Issuance inputs checkpointed in meta['issuance'] so a failed issuance can be resumed
+_RESUME_INPUT_KEYS = ('learner_name', 'course_name', 'grade', 'duration_hours', 'modules', 'metadata', 'owner_address')
+# Inputs kept in meta['render'] of every record so its PDF can be rendered again
+_RENDER_INPUT_KEYS = ('learner_name', 'course_name', 'grade', 'duration_hours', 'modules', 'metadata', 'issuer_address')
+
+
+def _merkle_proof(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Inclusion proof of a certificate anchored in a Merkle batch, if it was."""
+    return (record.get('meta') or {}).get('merkle')
+
+
+def _chain_cache_key(cert_id: str, record: Dict[str, Any]) -> Tuple[str, str, Optional[str]]:
+    """Verification cache key: the anchor a record is checked against."""
+    proof = _merkle_proof(record)
+    return (cert_id, record['cid_doc'], proof.get('root') if proof else None)
+
+
+def _dag_layout(content: Optional[bytes]) -> str:
+    """Whether a document's IPFS DAG is a single block or chunked, which Pinata may hash differently."""
+    return 'multi-chunk' if content is not None and len(content) > CHUNK_SIZE else 'single-chunk'
+
+
+def _verifiable(record: Optional[Dict[str, Any]]) -> bool:
+    """An issued, unrevoked certificate with a document, whose anchor is worth looking up."""
+    return bool(record) and record.get('status') == 'issued' and not record.get('revoked') and bool(record.get('cid_doc'))
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    """Convert a database timestamp (ISO string or datetime) to a Unix timestamp."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return value.timestamp()
+
+
 class CertificatePipeline:
-    """Main pipeline for certificate issuance."""
+    """
+    Main pipeline for certificate issuance.
+    
+    One instance is meant to live for the whole application and be shared
+    across requests, so Web3 providers and Supabase clients are built once.
+    A service whose initialization fails is not retried on every access;
+    the error is cached for SERVICE_RETRY_SECONDS. check_health() probes
+    the connections and drops broken clients so they are rebuilt.
+    """
     
     def __init__(self):
         """Initialize all service dependencies."""
@@ -34,44 +117,525 @@ class CertificatePipeline:
         self._blockchain = None
         self._db = None
         self._email = None
+        self._init_failures: Dict[str, Tuple[float, str]] = {}
+        self._service_locks = {name: threading.Lock() for name in ('pinata', 'blockchain', 'db', 'email')}
+        self.verification_cache = TTLCache(VERIFY_CACHE_MAX_ENTRIES)
+        # CertEventIndex consulted before contract reads (set when the indexer runs)
+        self.chain_index = None
+        # Anchors certificates in Merkle batches (one root per transaction) when enabled
+        self.anchor_batcher = AnchorBatcher(lambda: self.blockchain) if ANCHOR_BATCH_ENABLED else None
+        # Issuances running in this process, keyed by (user_id, course_id)
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        # Certificate PDFs on local disk by CID, for direct downloads
+        self.artifacts = ArtifactStore()
+        # Document loads running in this process, keyed by CID
+        self._document_loads: Dict[str, asyncio.Future] = {}
+        # DAG layouts ('single-chunk', 'multi-chunk') for which Pinata has
+        # returned the locally computed CID; until then anchors wait for the pin
+        self._confirmed_cid_layouts: Set[str] = set()
+    
+    def _service(self, name: str, factory: Callable[[], Any], label: Optional[str] = None) -> Any:
+        """Get a service, building it once; failed builds are retried after SERVICE_RETRY_SECONDS."""
+        service = getattr(self, f"_{name}")
+        if service is not None:
+            return service
+        with self._service_locks[name]:
+            service = getattr(self, f"_{name}")
+            if service is not None:
+                return service
+            failure = self._init_failures.get(name)
+            if failure and time.monotonic() - failure[0] < SERVICE_RETRY_SECONDS:
+                raise Exception(failure[1])
+            try:
+                service = factory()
+            except Exception as e:
+                message = f"{label}: {str(e)}" if label else str(e)
+                self._init_failures[name] = (time.monotonic(), message)
+                raise Exception(message)
+            self._init_failures.pop(name, None)
+            setattr(self, f"_{name}", service)
+            return service
+    
+    def reset_service(self, name: str):
+        """Drop a service client (and any cached failure) so the next access rebuilds it."""
+        with self._service_locks[name]:
+            setattr(self, f"_{name}", None)
+            self._init_failures.pop(name, None)
     
     @property
     def pinata(self):
         """Lazy initialization of Pinata service."""
-        if self._pinata is None:
-            try:
-                self._pinata = PinataService()
-            except Exception as e:
-                raise Exception(f"Pinata service not configured: {str(e)}")
-        return self._pinata
+        return self._service('pinata', lambda: PinataService(), "Pinata service not configured")
     
     @property
     def blockchain(self):
         """Lazy initialization of Blockchain service."""
-        if self._blockchain is None:
-            try:
-                self._blockchain = BlockchainService()
-            except Exception as e:
-                raise Exception(f"Blockchain service not configured: {str(e)}")
-        return self._blockchain
+        return self._service('blockchain', lambda: BlockchainService(), "Blockchain service not configured")
     
     @property
     def db(self):
         """Lazy initialization of Database service."""
-        if self._db is None:
-            try:
-                self._db = DatabaseService()
-            except Exception as e:
-                raise Exception(f"Database service not configured: {str(e)}")
-        return self._db
+        return self._service('db', lambda: DatabaseService(), "Database service not configured")
     
     @property
     def email(self):
         """Lazy initialization of Email service."""
-        if self._email is None:
-            self._email = EmailService()
-        return self._email
+        return self._service('email', lambda: EmailService())
+    
+    def _probe_blockchain(self):
+        if not self.blockchain.w3.is_connected():
+            self.reset_service('blockchain')
+            raise ConnectionError("RPC node not reachable")
+    
+    def _probe_db(self):
+        try:
+            self.db.client.table('certificates').select('cert_id').limit(1).execute()
+        except Exception:
+            if self._db is not None:
+                self.reset_service('db')
+            raise
+    
+    async def check_health(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Probe the blockchain and database connections.
+        
+        Broken clients are dropped so the next request rebuilds them; services
+        that are not configured report their cached initialization error.
+        
+        Returns:
+            Dict of service name -> {'ok', 'latency_ms' or 'error'}
+        """
+        health = {}
+        for name, probe in (('blockchain', self._probe_blockchain), ('database', self._probe_db)):
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(probe)
+                health[name] = {'ok': True, 'latency_ms': round((time.perf_counter() - started) * 1000, 1)}
+            except Exception as e:
+                health[name] = {'ok': False, 'error': str(e)}
+        return health
+    
+    def _issuer_address(self) -> str:
+        """Issuer address from the blockchain signer, or ISSUER_ADDRESS if not configured."""
+        try:
+            return self.blockchain.issuer_address
+        except Exception as bc_error:
+            logger.warning(f"Using default issuer address (blockchain not configured: {bc_error})")
+            return os.getenv("ISSUER_ADDRESS", "0x0000000000000000000000000000000000000000")
+    
+    def _gateway_url(self, cid_doc: Optional[str]) -> Optional[str]:
+        """Build an IPFS gateway URL for a document CID."""
+        if not cid_doc or cid_doc.startswith('local://'):
+            # No gateway URL for local files
+            return None
+        if cid_doc.startswith('ipfs://'):
+            return f"{os.getenv('IPFS_GATEWAY_BASE', 'https://ipfs.io/ipfs/')}{cid_doc.replace('ipfs://', '')}"
+        if cid_doc.startswith('http'):
+            return cid_doc  # Already a full URL
+        # It's a CID - format as gateway URL
+        return f"{os.getenv('IPFS_GATEWAY_BASE', 'https://ipfs.io/ipfs/')}{cid_doc}"
+    
+    def _verify_url(self, cert_id: str) -> str:
+        return f"{os.getenv('VERIFY_BASE_URL', 'http://localhost:5173/verify')}?certId={cert_id}"
+    
+    def _proof_url(self, cid_proof: Optional[str], verify_url: str) -> str:
+        return f"{os.getenv('IPFS_GATEWAY_BASE', 'https://ipfs.io/ipfs/')}{cid_proof}" if cid_proof else verify_url
+    
+    def _existing_result(self, existing: Dict[str, Any]) -> Dict[str, Any]:
+        """Response for a learner/course that already has an issued certificate."""
+        verify_url = self._verify_url(existing['cert_id'])
+        return {
+            'status': 'already_issued',
+            'cert_id': existing['cert_id'],
+            'cid_doc': existing.get('cid_doc'),
+            'cid_proof': existing.get('cid_proof'),
+            'tx_hash': existing.get('tx_hash'),
+            'gateway_url': self._gateway_url(existing.get('cid_doc')),
+            'verify_url': verify_url,
+            'proof_url': self._proof_url(existing.get('cid_proof'), verify_url),
+            'issued_on': existing.get('issued_on'),
+            'message': 'Certificate already issued'
+        }
+    
+    def _certificate_record(self, cert_id: str, inputs: Dict[str, Any], progress: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Database record for an issued certificate.
+        
+        meta['render'] keeps the exact render inputs (so the PDF can be
+        rebuilt for downloads); a batch anchor's inclusion proof goes in
+        meta['merkle'].
+        """
+        meta = {**(inputs.get('metadata') or {})}
+        meta['render'] = {key: inputs.get(key) for key in _RENDER_INPUT_KEYS}
+        meta['render']['issued_on'] = inputs['issued_on'].isoformat()
+        if progress.get('merkle'):
+            meta['merkle'] = progress['merkle']
+        return {
+            'cert_id': cert_id,
+            'user_id': inputs['user_id'],
+            'course_id': inputs['course_id'],
+            'cid_doc': progress.get('cid_doc'),
+            'cid_proof': progress.get('cid_proof'),
+            'tx_hash': progress.get('tx_hash'),
+            'issuer_addr': inputs['issuer_address'] or "not-configured",
+            'issued_on': inputs['issued_on'],
+            'revoked': False,
+            'status': 'issued',
+            'meta': meta
+        }
+    
+    def _checkpoint_record(
+        self,
+        cert_id: str,
+        inputs: Dict[str, Any],
+        progress: Dict[str, Any],
+        status: str,
+        attempts: int,
+        error_message: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Database record for an issuance in progress ('pending') or 'failed'.
+        
+        Completed stage outputs are kept in cid_doc/tx_hash/cid_proof and the
+        inputs needed to resume in meta['issuance']. Once RESUME_MAX_ATTEMPTS
+        attempts have failed the inputs move to meta['abandoned_issuance'],
+        so the sweeper stops retrying.
+        """
+        record = self._certificate_record(cert_id, inputs, progress)
+        checkpoint = {key: inputs.get(key) for key in _RESUME_INPUT_KEYS}
+        checkpoint['attempts'] = attempts
+        # Exact canonical issue time, so a resumed render reproduces the same PDF and CID
+        checkpoint['issued_on'] = inputs['issued_on'].isoformat()
+        if progress.get('anchored_cid'):
+            checkpoint['anchored_cid'] = progress['anchored_cid']
+        meta = record['meta']
+        if error_message:
+            meta['error'] = error_message
+        if status == 'failed' and attempts >= RESUME_MAX_ATTEMPTS:
+            meta['abandoned_issuance'] = checkpoint
+        else:
+            meta['issuance'] = checkpoint
+        record.update(status=status, meta=meta)
+        return record
+    
+    def is_resumable(self, record: Optional[Dict[str, Any]], stale_seconds: Optional[float] = None) -> bool:
+        """
+        A failed row, or a pending row untouched for stale_seconds
+        (RESUME_STALE_SECONDS by default), with a checkpoint.
+        """
+        if not record or not (record.get('meta') or {}).get('issuance'):
+            return False
+        if record.get('status') == 'failed':
+            return True
+        if record.get('status') == 'pending':
+            stale_seconds = RESUME_STALE_SECONDS if stale_seconds is None else stale_seconds
+            updated = _timestamp(record.get('updated_at'))
+            return updated is not None and time.time() - updated >= stale_seconds
+        return False
+    
+    async def current_cert_id(self, user_id: str, course_id: str) -> Optional[str]:
+        """
+        The cert_id an issuance for this learner and course would return.
+        
+        That is the issued certificate, or a checkpointed row that would be
+        resumed; None if a new cert_id would be generated (or the DB is not
+        available).
+        """
+        try:
+            existing = await self.db.get_certificate_by_user_course(user_id, course_id)
+        except Exception as db_check_error:
+            logger.warning(f"Could not check existing certificate (DB not available): {db_check_error}")
+            return None
+        if existing and (existing.get('status') == 'issued' or self.is_resumable(existing, stale_seconds=0)):
+            return existing['cert_id']
+        return None
+    
+    async def _single_flight(
+        self,
+        user_id: str,
+        course_id: str,
+        run: Callable[[bool], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Run an issuance for a learner and course at most once at a time.
+        
+        A call made while the same (user_id, course_id) is already being
+        issued in this process waits for that run and gets its result.
+        Across processes the run holds the database issuance lease (see
+        _run_with_lease).
+        
+        Args:
+            user_id: User UUID
+            course_id: Course UUID
+            run: Issuance to run; called with whether the lease is held
+            
+        Returns:
+            Result of the run (a copy per caller)
+        """
+        key = (user_id, course_id)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            logger.info(f"Issuance for user {user_id}, course {course_id} already running; waiting for it")
+            current_span().set_attribute('coalesced', True)
+        else:
+            inflight = asyncio.ensure_future(self._run_with_lease(user_id, course_id, run))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so a cancelled caller does not cancel the run others wait on
+        return dict(await asyncio.shield(inflight))
+    
+    async def _run_with_lease(
+        self,
+        user_id: str,
+        course_id: str,
+        run: Callable[[bool], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Run an issuance while holding the database lease for (user_id, course_id).
+        
+        While another worker holds the lease, its certificate row is polled:
+        once it is issued that certificate is returned; after
+        ISSUE_LEASE_WAIT_SECONDS an 'in_progress' result is returned instead.
+        Without a database the issuance runs unleased.
+        """
+        holder = f"{_WORKER_ID}:{uuid.uuid4().hex[:8]}"
+        deadline = time.monotonic() + ISSUE_LEASE_WAIT_SECONDS
+        while True:
+            try:
+                acquired = await self.db.acquire_issuance_lease(user_id, course_id, holder, ISSUE_LEASE_SECONDS)
+            except Exception as e:
+                logger.warning(f"Could not take issuance lease (DB not available): {e}")
+                return await run(False)
+            if acquired:
+                break
+            
+            # Another worker is issuing this certificate
+            existing = None
+            try:
+                existing = await self.db.get_certificate_by_user_course(user_id, course_id)
+            except Exception as e:
+                logger.warning(f"Could not check certificate issued by another worker: {e}")
+            if existing and existing.get('status') == 'issued':
+                current_span().set_attributes(cert_id=existing['cert_id'], status='already_issued')
+                return self._existing_result(existing)
+            if time.monotonic() >= deadline:
+                return {
+                    'status': 'in_progress',
+                    'cert_id': existing.get('cert_id') if existing else None,
+                    'error': 'Certificate issuance for this learner and course is in progress on another worker'
+                }
+            await asyncio.sleep(ISSUE_LEASE_POLL_SECONDS)
+        
+        try:
+            return await run(True)
+        finally:
+            await self.db.release_issuance_lease(user_id, course_id, holder)
+    
+    def _add_artifact_stages(
+        self,
+        graph: StageGraph,
+        cert_id: str,
+        canonical_json: Dict[str, Any],
+        learner_name: str,
+        course_name: str,
+        issued_on: datetime,
+        owner_address: Optional[str],
+        progress: Dict[str, Any]
+    ) -> StageGraph:
+        """
+        Add the stages that render, pin and anchor one certificate (steps 2-6).
+        
+        Documents are rendered and pinned from memory; nothing touches disk.
+        The document CID is computed locally ('doc_cid'), so the on-chain
+        anchor runs concurrently with the upload; the CID Pinata returns
+        must match it. Until Pinata has returned a matching CID for a
+        document of the same DAG layout, the anchor waits for the pin and
+        stores the pinned CID, so a wrong local CID never goes on chain.
+        Stage results: 'pin_doc' (document CID), 'anchor'
+        (tx hash or None) and 'pin_proof' (proof page CID or None). Each
+        output is also recorded in progress as cid_doc, tx_hash and
+        cid_proof (plus anchored_cid, the CID the tx hash stored); outputs
+        already in progress (from an earlier attempt) are reused instead of
+        repeating the stage.
+        """
+        def render_certificate(_):
+            # Step 2: Render PDF (not needed when the document is already pinned)
+            if progress.get('cid_doc'):
+                return None
+            with span("render.certificate_pdf", cert_id=cert_id) as render_span:
+                pdf_bytes = self.cert_generator.render_pdf(canonical_json)
+                render_span.set_attribute('bytes', len(pdf_bytes))
+            return pdf_bytes
+        
+        def compute_doc_cid(inputs):
+            # Step 3a: CID the PDF will be pinned under, so the anchor need not wait for the upload
+            if progress.get('cid_doc'):
+                return progress['cid_doc']
+            with span("ipfs.compute_cid", cert_id=cert_id) as cid_span:
+                cid = compute_cid(inputs['render'], cid_version=PINATA_CID_VERSION)
+                cid_span.set_attribute('cid', cid)
+            return cid
+        
+        # Resolved with the pinned CID, or the pin's error, for an anchor that waits for it
+        pinned: Future = Future()
+        
+        def pin_certificate(inputs):
+            try:
+                cid = pin_document(inputs)
+            except Exception as e:
+                pinned.set_exception(e)
+                raise
+            pinned.set_result(cid)
+            return cid
+        
+        def pin_document(inputs):
+            # Step 3: Pin certificate PDF to IPFS (required for Pinata)
+            if progress.get('cid_doc'):
+                logger.info(f"Reusing pinned certificate PDF. CID: {progress['cid_doc']}")
+                return progress['cid_doc']
+            try:
+                logger.info(f"Pinning certificate PDF to IPFS via Pinata...")
+                pin_result = self.pinata.pin_bytes(inputs['render'], f"{cert_id}.pdf", cid=inputs['doc_cid'])
+            except Exception as pinata_error:
+                error_msg = str(pinata_error)
+                logger.error(f"✗ IPFS pinning failed: {error_msg}")
+                # Check if it's a configuration error
+                if "PINATA_JWT" in error_msg or "PINATA_API_KEY" in error_msg:
+                    logger.error("Pinata credentials not configured. Please add PINATA_JWT to backend/.env")
+                raise Exception(f"Failed to upload certificate to IPFS: {error_msg}. Please configure PINATA_JWT in backend/.env")
+            if pin_result['cid'] != inputs['doc_cid']:
+                # The anchor stores the local CID; a different pin would not resolve it
+                self._confirmed_cid_layouts.discard(_dag_layout(inputs['render']))
+                raise ValueError(
+                    f"Pinata returned CID {pin_result['cid']} but {inputs['doc_cid']} was computed locally "
+                    f"(check PINATA_CID_VERSION)"
+                )
+            logger.info(f"✓ Certificate PDF pinned to IPFS. CID: {pin_result['cid']}")
+            self._confirmed_cid_layouts.add(_dag_layout(inputs['render']))
+            # Downloads are served from the local copy instead of a gateway
+            self.artifacts.put(pin_result['cid'], inputs['render'])
+            progress['cid_doc'] = pin_result['cid']
+            return pin_result['cid']
+        
+        def cid_confirmed(inputs) -> bool:
+            # A pinned document, or one whose layout Pinata already hashed to the local CID
+            return bool(progress.get('cid_doc')) or _dag_layout(inputs['render']) in self._confirmed_cid_layouts
+        
+        def anchor_certificate(inputs):
+            # Step 4: Store on blockchain (optional - skip if not configured)
+            cid = inputs['doc_cid']
+            # A re-rendered document (after a failed upload) may have a new CID to anchor
+            if progress.get('tx_hash') and progress.get('anchored_cid', cid) == cid:
+                logger.info(f"Reusing on-chain anchor. TX: {progress['tx_hash']}")
+                return progress['tx_hash']
+            if not cid_confirmed(inputs):
+                logger.info("Waiting for the pinned CID before anchoring...")
+                try:
+                    cid = pinned.result()
+                except Exception:
+                    # The failed pin fails the issuance; nothing is anchored
+                    return None
+            try:
+                logger.info(f"Storing certificate on blockchain...")
+                tx_result = self.blockchain.store_certificate(
+                    cert_id=cert_id,
+                    cid=cid,
+                    owner_address=owner_address
+                )
+                if tx_result.get('status') == 'already_stored':
+                    logger.info("Certificate already stored on-chain")
+                    return None
+                logger.info(f"Certificate stored on-chain. TX: {tx_result.get('tx_hash')}")
+                progress['tx_hash'] = tx_result.get('tx_hash')
+                progress['anchored_cid'] = cid
+                progress.pop('merkle', None)
+                return tx_result.get('tx_hash')
+            except Exception as blockchain_error:
+                logger.warning(f"Blockchain storage not available: {blockchain_error}. Continuing without blockchain...")
+                return None
+        
+        async def anchor_in_batch(inputs):
+            # Step 4 with batching: wait (without holding a thread) for the Merkle root to be anchored
+            cid = inputs['doc_cid']
+            if progress.get('tx_hash') and progress.get('anchored_cid', cid) == cid:
+                logger.info(f"Reusing on-chain anchor. TX: {progress['tx_hash']}")
+                return progress['tx_hash']
+            if not cid_confirmed(inputs):
+                logger.info("Waiting for the pinned CID before anchoring...")
+                try:
+                    cid = await asyncio.wrap_future(pinned)
+                except Exception:
+                    return None
+            try:
+                logger.info("Adding certificate to the next Merkle anchor batch...")
+                batch_result = await asyncio.wrap_future(self.anchor_batcher.submit(cert_id, cid))
+            except Exception as blockchain_error:
+                logger.warning(f"Batch anchoring not available: {blockchain_error}. Continuing without blockchain...")
+                return None
+            logger.info(
+                f"Certificate anchored in a batch of {batch_result['size']} under Merkle root "
+                f"{batch_result['root']}. TX: {batch_result['tx_hash']}"
+            )
+            progress['tx_hash'] = batch_result['tx_hash']
+            progress['anchored_cid'] = cid
+            progress['merkle'] = {key: batch_result[key] for key in ('root', 'proof', 'index', 'size')}
+            return batch_result['tx_hash']
+        
+        def render_proof_html(inputs):
+            # Step 5: Generate proof page
+            logger.info("Generating proof page...")
+            with span("render.proof_html", cert_id=cert_id) as render_span:
+                proof_html = self.proof_generator.generate_html_proof_page(
+                    cert_id=cert_id,
+                    learner_name=learner_name,
+                    course_name=course_name,
+                    issued_on=issued_on.isoformat(),
+                    cid_doc=inputs['pin_doc'],
+                    tx_hash=inputs['anchor']
+                ).encode('utf-8')
+                render_span.set_attribute('bytes', len(proof_html))
+            return proof_html
+        
+        def render_proof_pdf(inputs):
+            # Generate proof PDF (optional - overlaps with pinning the proof page)
+            with span("render.proof_pdf", cert_id=cert_id) as render_span:
+                proof_pdf = self.proof_generator.generate_pdf_proof_page(
+                    cert_id=cert_id,
+                    learner_name=learner_name,
+                    course_name=course_name,
+                    issued_on=issued_on.isoformat(),
+                    cid_doc=inputs['pin_doc'],
+                    tx_hash=inputs['anchor']
+                )
+                render_span.set_attribute('bytes', len(proof_pdf))
+            return proof_pdf
+        
+        def pin_proof(inputs):
+            # Step 6: Pin proof page (optional)
+            if progress.get('cid_proof'):
+                return progress['cid_proof']
+            logger.info("Pinning proof page to IPFS...")
+            proof_pin_result = self.pinata.pin_bytes(
+                inputs['proof_html'],
+                f"{cert_id}_proof.html",
+                cid=compute_cid(inputs['proof_html'], cid_version=PINATA_CID_VERSION)
+            )
+            logger.info(f"Proof page pinned. CID: {proof_pin_result['cid']}")
+            progress['cid_proof'] = proof_pin_result['cid']
+            return proof_pin_result['cid']
+        
+        return (
+            graph
+            .add('render', render_certificate)
+            .add('doc_cid', compute_doc_cid, deps=['render'])
+            .add('pin_doc', pin_certificate, deps=['render', 'doc_cid'])
+            .add('anchor', anchor_in_batch if self.anchor_batcher is not None else anchor_certificate, deps=['render', 'doc_cid'])
+            .add('proof_html', render_proof_html, deps=['pin_doc', 'anchor'])
+            .add('proof_pdf', render_proof_pdf, deps=['pin_doc', 'anchor'], required=False)
+            .add('pin_proof', pin_proof, deps=['proof_html'], required=False)
+        )
     
+    @traced("certificate.issue")
     async def issue_certificate(
         self,
         user_id: str,
@@ -82,7 +646,8 @@ class CertificatePipeline:
         duration_hours: float,
         modules: int,
         metadata: Optional[Dict[str, Any]] = None,
-        owner_address: Optional[str] = None
+        owner_address: Optional[str] = None,
+        cert_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Complete certificate issuance pipeline.
@@ -97,6 +662,18 @@ class CertificatePipeline:
         7. Save record to database
         8. Send verification email to learner
         
+        Steps 2-8 run as a StageGraph: the proof PDF overlaps with pinning
+        the proof page, and the database save overlaps with the email.
+        The document CID and tx hash are checkpointed to the database as
+        soon as they exist. If the learner already has a failed (or stuck)
+        issuance for the course, it is resumed instead of starting over
+        (keeping its cert_id, even when another one was preassigned); a
+        failed row with no checkpoint is superseded.
+        
+        Concurrent calls for the same learner and course are collapsed into
+        one issuance, within this process and across workers, and all
+        callers get its result.
+        
         Args:
             user_id: User UUID
             course_id: Course UUID
@@ -107,276 +684,310 @@ class CertificatePipeline:
             modules: Number of modules completed
             metadata: Additional metadata
             owner_address: Optional owner wallet address
+            cert_id: Preassigned certificate ID (e.g. from the issuance queue);
+                generated when omitted
             
         Returns:
             Dict with certificate details and status
         """
-        cert_id = None
-        status = "pending"
-        error_message = None
+        current_span().set_attributes(user_id=user_id, course_id=course_id)
+        return await self._single_flight(
+            user_id,
+            course_id,
+            lambda leased: self._issue_or_resume(
+                user_id, course_id, course_name, learner_name, grade, duration_hours,
+                modules, metadata, owner_address, cert_id, leased
+            )
+        )
+    
+    async def _issue_or_resume(
+        self,
+        user_id: str,
+        course_id: str,
+        course_name: str,
+        learner_name: str,
+        grade: str,
+        duration_hours: float,
+        modules: int,
+        metadata: Optional[Dict[str, Any]],
+        owner_address: Optional[str],
+        cert_id: Optional[str],
+        leased: bool,
+        recipient_email: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Return the existing certificate, resume a failed issuance, or start a new one."""
+        issue_span = current_span()
         
         try:
             # Check if certificate already exists (idempotency) - optional if DB not configured
+            existing = None
             try:
                 existing = await self.db.get_certificate_by_user_course(user_id, course_id)
                 if existing and existing.get('status') == 'issued':
                     logger.info(f"Certificate already exists for user {user_id}, course {course_id}")
-                    # Return existing certificate data
-                    gateway_url = None
-                    cid_doc = existing.get('cid_doc')
-                    if cid_doc and not cid_doc.startswith('local://'):
-                        if cid_doc.startswith('ipfs://'):
-                            cid = cid_doc.replace('ipfs://', '')
-                        else:
-                            cid = cid_doc
-                        gateway_url = f"{os.getenv('IPFS_GATEWAY_BASE', 'https://ipfs.io/ipfs/')}{cid}"
-                    
-                    verify_url = f"{os.getenv('VERIFY_BASE_URL', 'http://localhost:5173/verify')}?certId={existing['cert_id']}"
-                    proof_url = f"{os.getenv('IPFS_GATEWAY_BASE', 'https://ipfs.io/ipfs/')}{existing.get('cid_proof')}" if existing.get('cid_proof') else verify_url
-                    
-                    return {
-                        'status': 'already_issued',
-                        'cert_id': existing['cert_id'],
-                        'cid_doc': cid_doc,
-                        'cid_proof': existing.get('cid_proof'),
-                        'tx_hash': existing.get('tx_hash'),
-                        'gateway_url': gateway_url,
-                        'verify_url': verify_url,
-                        'proof_url': proof_url,
-                        'issued_on': existing.get('issued_on'),
-                        'message': 'Certificate already issued'
-                    }
+                    issue_span.set_attributes(cert_id=existing['cert_id'], status='already_issued')
+                    return self._existing_result(existing)
             except Exception as db_check_error:
                 logger.warning(f"Could not check existing certificates (DB not available): {db_check_error}")
             
-            # Step 1: Generate certificate ID and canonical JSON
-            logger.info(f"Generating certificate for user {user_id}, course {course_id}")
-            cert_id = self.cert_generator.generate_cert_id()
-            issued_on = datetime.now()
+            # Under the lease no other attempt is running, so a pending row is never live
+            if self.is_resumable(existing, stale_seconds=0 if leased else None):
+                # The checkpointed cert_id wins over a preassigned one, so the
+                # learner never ends up with two certificates for the course
+                logger.info(f"Resuming certificate {existing['cert_id']} for user {user_id}, course {course_id}")
+                return await self._resume(existing, recipient_email)
+            await self._supersede_unresumable(existing, leased)
             
-            # Get issuer address (use default if blockchain not configured)
-            try:
-                issuer_address = self.blockchain.issuer_address
-            except Exception as bc_error:
-                issuer_address = os.getenv("ISSUER_ADDRESS", "0x0000000000000000000000000000000000000000")
-                logger.warning(f"Using default issuer address (blockchain not configured: {bc_error})")
+            # Step 1: Generate certificate ID
+            logger.info(f"Generating certificate for user {user_id}, course {course_id}")
+            cert_id = cert_id or self.cert_generator.generate_cert_id()
+            inputs = {
+                'user_id': user_id,
+                'course_id': course_id,
+                'course_name': course_name,
+                'learner_name': learner_name,
+                'grade': grade,
+                'duration_hours': duration_hours,
+                'modules': modules,
+                'metadata': metadata,
+                'owner_address': owner_address,
+                'recipient_email': recipient_email,
+                'issued_on': datetime.now(),
+                'issuer_address': self._issuer_address()
+            }
+        except Exception as e:
+            logger.error(f"Certificate issuance failed: {str(e)}", exc_info=True)
+            issue_span.record_error(e)
+            return {
+                'status': 'failed',
+                'cert_id': cert_id,
+                'error': str(e)
+            }
+        
+        return await self._issue(cert_id, inputs, {}, attempts=1)
+    
+    @traced("certificate.resume")
+    async def resume_certificate(self, cert_id: str) -> Dict[str, Any]:
+        """
+        Continue a failed or interrupted issuance from its last checkpoint.
+        
+        Stages whose output was checkpointed (document pin, on-chain anchor,
+        proof pin) are not repeated; the certificate keeps its cert_id and
+        issue date.
+        
+        Args:
+            cert_id: Certificate ID to resume
             
+        Returns:
+            Dict with certificate details and status (as issue_certificate);
+            status 'superseded' if the learner was issued another certificate
+            for the course in the meantime
+        """
+        current_span().set_attribute('cert_id', cert_id)
+        record = await self.db.get_certificate(cert_id)
+        if not record:
+            return {'status': 'failed', 'cert_id': cert_id, 'error': 'Certificate not found'}
+        if record.get('status') == 'issued':
+            return self._existing_result(record)
+        if not (record.get('meta') or {}).get('issuance'):
+            return {'status': 'failed', 'cert_id': cert_id, 'error': 'No checkpoint to resume from'}
+        return await self._single_flight(
+            record['user_id'],
+            record['course_id'],
+            lambda leased: self._resume_latest(cert_id)
+        )
+    
+    async def _resume_latest(self, cert_id: str) -> Dict[str, Any]:
+        """
+        Resume a certificate from its current row (it may have been issued
+        while waiting), unless the learner has since been issued another
+        certificate for the course, in which case the row is superseded.
+        """
+        record = await self.db.get_certificate(cert_id)
+        if not record:
+            return {'status': 'failed', 'cert_id': cert_id, 'error': 'Certificate not found'}
+        if record.get('status') == 'issued':
+            return self._existing_result(record)
+        if record.get('status') == 'superseded':
+            return {'status': 'superseded', 'cert_id': cert_id, 'error': 'Certificate was superseded'}
+        current = await self.db.get_certificate_by_user_course(record['user_id'], record['course_id'])
+        if current and current.get('status') == 'issued' and current['cert_id'] != cert_id:
+            await self._supersede(cert_id)
+            return {
+                'status': 'superseded',
+                'cert_id': cert_id,
+                'superseded_by': current['cert_id'],
+                'error': f"Certificate {current['cert_id']} was issued instead"
+            }
+        return await self._resume(record)
+    
+    async def _supersede_unresumable(self, existing: Optional[Dict[str, Any]], leased: bool):
+        """Retire a failed (or, under the lease, pending) row with nothing to resume from before issuing afresh."""
+        if existing and (existing.get('status') == 'failed' or (leased and existing.get('status') == 'pending')):
+            await self._supersede(existing['cert_id'])
+    
+    async def _supersede(self, cert_id: str):
+        """Retire an unfinished issuance so it is never resumed into a duplicate certificate."""
+        try:
+            if await self.db.supersede_certificate(cert_id):
+                logger.info(f"Superseded unfinished certificate {cert_id}")
+        except Exception as e:
+            logger.warning(f"Could not supersede certificate {cert_id}: {e}")
+    
+    async def _resume(self, record: Dict[str, Any], recipient_email: Optional[str] = None) -> Dict[str, Any]:
+        """Rebuild the issuance inputs and progress from a checkpointed row and run it."""
+        inputs, progress, attempts = self._resume_state(record)
+        inputs['recipient_email'] = recipient_email
+        return await self._issue(record['cert_id'], inputs, progress, attempts=attempts)
+    
+    def _resume_state(self, record: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], int]:
+        """Issuance inputs, completed outputs and the next attempt number from a checkpointed row."""
+        checkpoint = record['meta']['issuance']
+        issued_on = checkpoint.get('issued_on') or record.get('issued_on')
+        if isinstance(issued_on, str):
+            issued_on = datetime.fromisoformat(issued_on.replace('Z', '+00:00'))
+        inputs = {
+            'user_id': record['user_id'],
+            'course_id': record['course_id'],
+            **{key: checkpoint.get(key) for key in _RESUME_INPUT_KEYS},
+            'issued_on': issued_on or datetime.now(),
+            'issuer_address': record.get('issuer_addr') or self._issuer_address()
+        }
+        progress = {key: record[key] for key in ('cid_doc', 'tx_hash', 'cid_proof') if record.get(key)}
+        if checkpoint.get('anchored_cid'):
+            progress['anchored_cid'] = checkpoint['anchored_cid']
+        if record['meta'].get('merkle'):
+            progress['merkle'] = record['meta']['merkle']
+        return inputs, progress, checkpoint.get('attempts', 0) + 1
+    
+    async def _issue(
+        self,
+        cert_id: str,
+        inputs: Dict[str, Any],
+        progress: Dict[str, Any],
+        attempts: int
+    ) -> Dict[str, Any]:
+        """
+        Run steps 2-8 for one certificate, checkpointing stage outputs.
+        
+        Args:
+            cert_id: Certificate ID
+            inputs: Issuance inputs (learner, course, issued_on, issuer_address, ...)
+            progress: Outputs of earlier attempts (cid_doc, tx_hash, cid_proof)
+            attempts: Number of this attempt, starting at 1
+        """
+        issue_span = current_span()
+        issue_span.set_attributes(cert_id=cert_id, attempt=attempts)
+        issued_on = inputs['issued_on']
+        learner_name = inputs['learner_name']
+        course_name = inputs['course_name']
+        
+        try:
             canonical_json = self.cert_generator.create_canonical_json(
                 cert_id=cert_id,
                 name=learner_name,
-                learner_id=user_id,
-                course_id=course_id,
+                learner_id=inputs['user_id'],
+                course_id=inputs['course_id'],
                 course_name=course_name,
                 issued_on=issued_on,
-                issuer_address=issuer_address,
-                grade=grade,
-                duration_hours=duration_hours,
-                modules=modules,
-                metadata=metadata
+                issuer_address=inputs['issuer_address'],
+                grade=inputs['grade'],
+                duration_hours=inputs['duration_hours'],
+                modules=inputs['modules'],
+                metadata=inputs.get('metadata')
             )
             
-            # Step 2: Render PDF
-            cert_pdf_path = None
-            proof_html_path = None
-            proof_pdf_path = None
+            verify_url = self._verify_url(cert_id)
             
-            try:
-                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as cert_pdf:
-                    cert_pdf_path = cert_pdf.name
-                    self.cert_generator.render_pdf(canonical_json, cert_pdf_path)
-                
-                # Step 3: Pin certificate PDF to IPFS (required for Pinata)
-                cid_doc = None
-                try:
-                    logger.info(f"Pinning certificate PDF to IPFS via Pinata...")
-                    pin_result = self.pinata.pin_file(cert_pdf_path, f"{cert_id}.pdf")
-                    cid_doc = pin_result['cid']
-                    logger.info(f"✓ Certificate PDF pinned to IPFS. CID: {cid_doc}")
-                except Exception as pinata_error:
-                    error_msg = str(pinata_error)
-                    logger.error(f"✗ IPFS pinning failed: {error_msg}")
-                    # Check if it's a configuration error
-                    if "PINATA_JWT" in error_msg or "PINATA_API_KEY" in error_msg:
-                        logger.error("Pinata credentials not configured. Please add PINATA_JWT to backend/.env")
-                    raise Exception(f"Failed to upload certificate to IPFS: {error_msg}. Please configure PINATA_JWT in backend/.env")
-                
-                # Step 4: Store on blockchain (optional - skip if not configured)
-                tx_hash = None
-                try:
-                    logger.info(f"Storing certificate on blockchain...")
-                    tx_result = self.blockchain.store_certificate(
-                        cert_id=cert_id,
-                        cid=cid_doc or f"local-{cert_id}",
-                        owner_address=owner_address
+            checkpoint_lock = asyncio.Lock()
+            
+            async def checkpoint(_):
+                # Keep completed outputs so a failed attempt can be resumed; the
+                # pin and anchor finish in either order, so writes are serialized
+                # and each one snapshots everything completed so far
+                async with checkpoint_lock:
+                    await self.db.save_certificate(
+                        self._checkpoint_record(cert_id, inputs, progress, 'pending', attempts)
                     )
-                    tx_hash = tx_result.get('tx_hash')
-                    
-                    if tx_result.get('status') == 'already_stored':
-                        logger.info("Certificate already stored on-chain")
-                        tx_hash = None
-                    else:
-                        logger.info(f"Certificate stored on-chain. TX: {tx_hash}")
-                except Exception as blockchain_error:
-                    logger.warning(f"Blockchain storage not available: {blockchain_error}. Continuing without blockchain...")
-                
-                # Step 5: Generate proof page
-                logger.info("Generating proof page...")
-                proof_html = self.proof_generator.generate_html_proof_page(
-                    cert_id=cert_id,
-                    learner_name=learner_name,
-                    course_name=course_name,
-                    issued_on=issued_on.isoformat(),
-                    cid_doc=cid_doc,
-                    tx_hash=tx_hash
-                )
-                
-                # Save proof HTML
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as proof_html_file:
-                    proof_html_path = proof_html_file.name
-                    proof_html_file.write(proof_html)
-                
-                # Generate proof PDF (optional - skip if fails)
-                try:
-                    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as proof_pdf:
-                        proof_pdf_path = proof_pdf.name
-                        self.proof_generator.generate_pdf_proof_page(
-                            cert_id=cert_id,
-                            learner_name=learner_name,
-                            course_name=course_name,
-                            issued_on=issued_on.isoformat(),
-                            cid_doc=cid_doc,
-                            tx_hash=tx_hash,
-                            output_path=proof_pdf_path
-                        )
-                except Exception as pdf_error:
-                    logger.warning(f"Failed to generate proof PDF (non-critical): {pdf_error}")
-                    proof_pdf_path = None
-                
-                # Step 6: Pin proof page (optional)
-                cid_proof = None
-                try:
-                    logger.info("Pinning proof page to IPFS...")
-                    proof_pin_result = self.pinata.pin_file(proof_html_path, f"{cert_id}_proof.html")
-                    cid_proof = proof_pin_result['cid']
-                    logger.info(f"Proof page pinned. CID: {cid_proof}")
-                except Exception as e:
-                    logger.warning(f"Failed to pin proof page (non-critical): {str(e)}")
-                
+            
+            async def save_record(_):
                 # Step 7: Save to database (optional - skip if not configured)
                 try:
                     logger.info("Saving certificate record to database...")
-                    cert_record = {
-                        'cert_id': cert_id,
-                        'user_id': user_id,
-                        'course_id': course_id,
-                        'cid_doc': cid_doc,
-                        'cid_proof': cid_proof,
-                        'tx_hash': tx_hash,
-                        'issuer_addr': issuer_address or "not-configured",
-                        'issued_on': issued_on,
-                        'revoked': False,
-                        'status': 'issued',
-                        'meta': metadata or {}
-                    }
-                    
-                    await self.db.save_certificate(cert_record)
+                    await self.db.save_certificate(self._certificate_record(cert_id, inputs, progress))
                     logger.info("Certificate record saved to database")
                 except Exception as db_error:
                     logger.warning(f"Database not available: {db_error}. Continuing without database storage...")
-                
+            
+            async def send_email(stage_inputs):
                 # Step 8: Send verification email (optional)
-                try:
-                    verify_url = f"{os.getenv('VERIFY_BASE_URL', 'http://localhost:5173/verify')}?certId={cert_id}"
-                    proof_url = f"{os.getenv('IPFS_GATEWAY_BASE', 'https://ipfs.io/ipfs/')}{cid_proof}" if cid_proof else verify_url
-                    
-                    await self.email.send_certificate_email(
-                        recipient_email=None,  # Will need to fetch from user profile
-                        recipient_name=learner_name,
-                        cert_id=cert_id,
-                        course_name=course_name,
-                        verify_url=verify_url,
-                        proof_url=proof_url,
-                        tx_hash=tx_hash,
-                        cid_doc=cid_doc
-                    )
-                    logger.info("Verification email sent")
-                except Exception as e:
-                    logger.warning(f"Failed to send email (non-critical): {str(e)}")
-                
-                status = "issued"
-                
-                # Build IPFS gateway URL for easy access
-                gateway_url = None
-                if cid_doc:
-                    if cid_doc.startswith('local://'):
-                        # If Pinata failed, still generate a readable URL format
-                        gateway_url = None  # No gateway URL for local files
-                    elif cid_doc.startswith('ipfs://'):
-                        cid = cid_doc.replace('ipfs://', '')
-                        gateway_url = f"{os.getenv('IPFS_GATEWAY_BASE', 'https://ipfs.io/ipfs/')}{cid}"
-                    elif cid_doc.startswith('http'):
-                        gateway_url = cid_doc  # Already a full URL
-                    else:
-                        # It's a CID - format as gateway URL
-                        gateway_url = f"{os.getenv('IPFS_GATEWAY_BASE', 'https://ipfs.io/ipfs/')}{cid_doc}"
-                
-                return {
-                    'status': 'success',
-                    'cert_id': cert_id,
-                    'cid_doc': cid_doc,
-                    'cid_proof': cid_proof,
-                    'tx_hash': tx_hash,
-                    'gateway_url': gateway_url,  # Direct IPFS gateway link
-                    'verify_url': verify_url,
-                    'proof_url': proof_url,
-                    'issued_on': issued_on.isoformat()
+                await self.email.send_certificate_email(
+                    recipient_email=inputs.get('recipient_email'),  # None: fetched from the user profile
+                    recipient_name=learner_name,
+                    cert_id=cert_id,
+                    course_name=course_name,
+                    verify_url=verify_url,
+                    proof_url=self._proof_url(stage_inputs['pin_proof'], verify_url),
+                    tx_hash=stage_inputs['anchor'],
+                    cid_doc=stage_inputs['pin_doc']
+                )
+                logger.info("Verification email sent")
+            
+            graph = self._add_artifact_stages(
+                StageGraph(name=f"issue {cert_id}"),
+                cert_id, canonical_json, learner_name, course_name, issued_on,
+                inputs.get('owner_address'), progress
+            )
+            # Checkpoints overlap with the next stage; the final save waits for them
+            checkpoints = []
+            if not progress.get('cid_doc'):
+                graph.add('checkpoint_pin', checkpoint, deps=['pin_doc'], required=False)
+                checkpoints.append('checkpoint_pin')
+            if not progress.get('tx_hash') or not progress.get('cid_doc'):
+                graph.add('checkpoint_anchor', checkpoint, deps=['anchor'], required=False)
+                checkpoints.append('checkpoint_anchor')
+            graph.add('save_record', save_record, deps=['pin_doc', 'anchor', 'pin_proof', *checkpoints])
+            graph.add('send_email', send_email, deps=['pin_doc', 'anchor', 'pin_proof'], required=False)
+            
+            run = await graph.run()
+            
+            cid_doc = run['results']['pin_doc']
+            cid_proof = run['results']['pin_proof']
+            logger.info(
+                f"Certificate {cert_id} issued in {run['elapsed']:.2f}s "
+                f"(critical path {' -> '.join(run['critical_path'])}: {run['critical_path_seconds']:.2f}s)"
+            )
+            
+            return {
+                'status': 'success',
+                'cert_id': cert_id,
+                'cid_doc': cid_doc,
+                'cid_proof': cid_proof,
+                'tx_hash': run['results']['anchor'],
+                'gateway_url': self._gateway_url(cid_doc),  # Direct IPFS gateway link
+                'verify_url': verify_url,
+                'proof_url': self._proof_url(cid_proof, verify_url),
+                'issued_on': issued_on.isoformat(),
+                'timings': {
+                    'elapsed': run['elapsed'],
+                    'critical_path': run['critical_path'],
+                    'critical_path_seconds': run['critical_path_seconds'],
+                    'stages': run['timings']
                 }
-                
-            finally:
-                # Cleanup temporary files
-                for path in [cert_pdf_path, proof_html_path]:
-                    if path:
-                        try:
-                            if os.path.exists(path):
-                                os.unlink(path)
-                        except Exception as e:
-                            logger.warning(f"Failed to cleanup {path}: {e}")
-                if proof_pdf_path:
-                    try:
-                        if os.path.exists(proof_pdf_path):
-                            os.unlink(proof_pdf_path)
-                    except Exception as e:
-                        logger.warning(f"Failed to cleanup proof PDF: {e}")
+            }
         
         except Exception as e:
-            status = "failed"
             error_message = str(e)
-            logger.error(f"Certificate issuance failed: {str(e)}", exc_info=True)
+            logger.error(f"Certificate issuance failed: {error_message}", exc_info=True)
+            issue_span.record_error(e)
             
-            # Save failed record to database for retry (optional - skip if DB not available)
-            if cert_id:
-                try:
-                    issuer_addr = None
-                    try:
-                        issuer_addr = self.blockchain.issuer_address
-                    except Exception:
-                        issuer_addr = os.getenv("ISSUER_ADDRESS", "0x0000000000000000000000000000000000000000")
-                    
-                    await self.db.save_certificate({
-                        'cert_id': cert_id,
-                        'user_id': user_id,
-                        'course_id': course_id,
-                        'cid_doc': None,
-                        'cid_proof': None,
-                        'tx_hash': None,
-                        'issuer_addr': issuer_addr,
-                        'issued_on': datetime.now(),
-                        'revoked': False,
-                        'status': 'failed',
-                        'meta': {'error': error_message, **(metadata or {})}
-                    })
-                except Exception as db_error:
-                    logger.warning(f"Could not save failed certificate record (DB not available): {db_error}")
+            # Save failed record with the completed stages for resume (optional - skip if DB not available)
+            try:
+                await self.db.save_certificate(
+                    self._checkpoint_record(cert_id, inputs, progress, 'failed', attempts, error_message)
+                )
+            except Exception as db_error:
+                logger.warning(f"Could not save failed certificate record (DB not available): {db_error}")
             
             return {
                 'status': 'failed',
@@ -384,82 +995,432 @@ class CertificatePipeline:
                 'error': error_message
             }
     
+    async def issue_cohort(
+        self,
+        course_id: str,
+        course_name: str,
+        learners: List[Dict[str, Any]],
+        duration_hours: float = 0.0,
+        modules: int = 0,
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Issue certificates for a cohort of learners in one course.
+        
+        Existing certificates are looked up with one batched query; learners
+        found issued there are not touched again. The rest are issued with
+        bounded concurrency, each exactly as issue_certificate does: under
+        the single-flight and issuance lease, with its row read again (a
+        checkpointed row is resumed with its cert_id), pending checkpoints
+        written as the pin and anchor finish, and its record saved and
+        email sent before the lease is released.
+        
+        Args:
+            course_id: Course UUID
+            course_name: Course name
+            learners: Dicts with user_id, learner_name and grade, plus optional
+                metadata, owner_address, duration_hours and modules
+            duration_hours: Default course duration in hours
+            modules: Default number of modules completed
+            concurrency: Learners processed at once (defaults to BULK_ISSUE_CONCURRENCY)
+            
+        Returns:
+            Dict with 'results' (one entry per learner, in input order),
+            'summary' (counts per status) and 'elapsed'/'per_minute' throughput
+        """
+        started = time.perf_counter()
+        concurrency = concurrency or BULK_ISSUE_CONCURRENCY
+        results: List[Optional[Dict[str, Any]]] = [None] * len(learners)
+        
+        # One batched existence check instead of one query per learner
+        existing: Dict[str, Dict[str, Any]] = {}
+        try:
+            existing = await self.db.get_certificates_by_users(
+                list({learner['user_id'] for learner in learners}), course_id
+            )
+        except Exception as db_check_error:
+            logger.warning(f"Could not check existing certificates (DB not available): {db_check_error}")
+        
+        pending = []
+        seen = set()
+        for index, learner in enumerate(learners):
+            record = existing.get(learner['user_id'])
+            if record and record.get('status') == 'issued':
+                results[index] = {'user_id': learner['user_id'], **self._existing_result(record)}
+            elif learner['user_id'] in seen:
+                results[index] = {'user_id': learner['user_id'], 'status': 'failed', 'cert_id': None, 'error': 'Duplicate learner in request'}
+            else:
+                seen.add(learner['user_id'])
+                pending.append(index)
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def issue_one(index: int):
+            learner = learners[index]
+            user_id = learner['user_id']
+            # The semaphore bounds lease, lookup and stage work alike
+            async with semaphore:
+                with span("certificate.issue", user_id=user_id, course_id=course_id):
+                    result = await self._single_flight(
+                        user_id,
+                        course_id,
+                        lambda leased: self._issue_or_resume(
+                            user_id, course_id, course_name, learner['learner_name'], learner['grade'],
+                            learner.get('duration_hours', duration_hours), learner.get('modules', modules),
+                            learner.get('metadata'), learner.get('owner_address'), None, leased,
+                            recipient_email=learner.get('email')
+                        )
+                    )
+            result.pop('timings', None)
+            results[index] = {'user_id': user_id, **result}
+        
+        await asyncio.gather(*(issue_one(index) for index in pending))
+        
+        elapsed = time.perf_counter() - started
+        issued = sum(1 for result in results if result['status'] == 'success')
+        summary = {
+            'total': len(learners),
+            'issued': issued,
+            'already_issued': sum(1 for result in results if result['status'] == 'already_issued'),
+            'in_progress': sum(1 for result in results if result['status'] == 'in_progress'),
+            'failed': sum(1 for result in results if result['status'] == 'failed')
+        }
+        logger.info(f"Cohort issuance for course {course_id}: {summary} in {elapsed:.1f}s")
+        return {
+            'course_id': course_id,
+            'summary': summary,
+            'elapsed': round(elapsed, 3),
+            'per_minute': round(issued / elapsed * 60, 1) if elapsed > 0 else 0.0,
+            'results': results
+        }
+    
+    @traced("certificate.verify")
     async def verify_certificate(self, cert_id: str) -> Dict[str, Any]:
         """
         Verify a certificate by checking on-chain CID against database.
         
+        The database record is read on every call, so revocation and
+        re-issuance by any worker show at once. Only the on-chain lookup is
+        cached, keyed by the record's cid_doc (and Merkle root): a confirmed
+        anchor for VERIFY_CACHE_TTL_SECONDS, a missing or different one for
+        VERIFY_CACHE_NEGATIVE_TTL_SECONDS. Errors are not cached.
+        
         Args:
             cert_id: Certificate ID to verify
             
         Returns:
             Verification result with status and details
         """
+        verify_span = current_span()
+        verify_span.set_attribute('cert_id', cert_id)
         try:
             # Get certificate from database
             cert_record = await self.db.get_certificate(cert_id)
             
-            if not cert_record:
-                return {
-                    'verified': False,
-                    'status': 'not_found',
-                    'message': 'Certificate not found in database'
-                }
-            
-            if cert_record.get('revoked'):
-                return {
-                    'verified': False,
-                    'status': 'revoked',
-                    'message': 'Certificate has been revoked'
-                }
+            on_chain_cid = None
+            if _verifiable(cert_record):
+                cached = self.verification_cache.get(_chain_cache_key(cert_id, cert_record))
+                verify_span.set_attribute('cache_hit', cached is not None)
+                if cached is not None:
+                    on_chain_cid = cached[0]
+                else:
+                    if _merkle_proof(cert_record):
+                        on_chain_cid = self._merkle_cids({cert_id: cert_record})[cert_id]
+                    else:
+                        # Check on-chain CID (local event index first)
+                        found, _ = self._indexed_cids({cert_id: cert_record})
+                        on_chain_cid = found[cert_id] if cert_id in found else self.blockchain.get_certificate_cid(cert_id)
+                    self._cache_chain_cid(cert_id, cert_record, on_chain_cid)
             
-            db_cid = cert_record.get('cid_doc')
-            if not db_cid:
-                return {
-                    'verified': False,
-                    'status': 'incomplete',
-                    'message': 'Certificate document not available'
-                }
+            return self._verification_result(cert_id, cert_record, on_chain_cid)
+                
+        except Exception as e:
+            logger.error(f"Verification error: {str(e)}", exc_info=True)
+            return {
+                'verified': False,
+                'status': 'error',
+                'message': str(e)
+            }
+    
+    async def find_certificate_document(self, cert_id: str) -> Dict[str, Any]:
+        """
+        Look up the document of an issued certificate.
+        
+        Args:
+            cert_id: Certificate ID
             
-            # Check on-chain CID
-            on_chain_cid = self.blockchain.get_certificate_cid(cert_id)
+        Returns:
+            {'status': 'ok', 'cid_doc', 'record'}, or status 'not_found'
+            (no record, issuance not completed or no pinned document) or 'revoked'
+        """
+        record = await self.db.get_certificate(cert_id)
+        # A pending or failed row may have a pinned document, but no certificate yet
+        if not record or record.get('status') != 'issued' or not record.get('cid_doc'):
+            return {'status': 'not_found'}
+        if record.get('revoked'):
+            return {'status': 'revoked', 'cid_doc': record['cid_doc']}
+        return {'status': 'ok', 'cid_doc': record['cid_doc'], 'record': record}
+    
+    async def load_certificate_document(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Get a certificate's PDF, verified against its cid_doc.
+        
+        Served from the local artifact store; on a miss the PDF is rendered
+        again from meta['render'] or fetched from an IPFS gateway, checked
+        against the CID and stored. Concurrent loads of one document share
+        a single fill.
+        
+        Args:
+            record: Certificate record (from find_certificate_document)
             
-            if not on_chain_cid:
-                return {
-                    'verified': False,
-                    'status': 'not_on_chain',
-                    'message': 'Certificate not found on blockchain',
-                    'db_cid': db_cid
-                }
+        Returns:
+            {'content': PDF bytes, 'source': 'cache' | 'render' | 'gateway'},
+            or None if the document could not be obtained
+        """
+        cid = record['cid_doc']
+        future = self._document_loads.get(cid)
+        if future is None:
+            future = asyncio.ensure_future(self._load_document(record))
+            self._document_loads[cid] = future
+            future.add_done_callback(lambda _: self._document_loads.pop(cid, None))
+        return await asyncio.shield(future)
+    
+    @traced("certificate.load_document")
+    async def _load_document(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        load_span = current_span()
+        cid = record['cid_doc']
+        load_span.set_attributes(cert_id=record['cert_id'], cid=cid)
+        
+        content = await asyncio.to_thread(self.artifacts.get, cid)
+        source = 'cache'
+        if content is None and (record.get('meta') or {}).get('render'):
+            # Rendering is deterministic and local, so it is tried before the gateways
+            try:
+                content = await asyncio.to_thread(self._rerender_document, record)
+                source = 'render'
+            except Exception as e:
+                logger.warning(f"Could not render {record['cert_id']} again: {e}")
+        if content is None:
+            content = await asyncio.to_thread(self.artifacts.fetch, cid)
+            source = 'gateway'
+        
+        load_span.set_attribute('source', source if content is not None else None)
+        if content is None:
+            return None
+        return {'content': content, 'source': source}
+    
+    def _rerender_document(self, record: Dict[str, Any]) -> Optional[bytes]:
+        """Render a certificate PDF from its record; None if it no longer matches cid_doc."""
+        render_inputs = record['meta']['render']
+        canonical_json = self.cert_generator.create_canonical_json(
+            cert_id=record['cert_id'],
+            name=render_inputs['learner_name'],
+            learner_id=record['user_id'],
+            course_id=record['course_id'],
+            course_name=render_inputs['course_name'],
+            issued_on=datetime.fromisoformat(render_inputs['issued_on']),
+            issuer_address=render_inputs['issuer_address'],
+            grade=render_inputs['grade'],
+            duration_hours=render_inputs['duration_hours'],
+            modules=render_inputs['modules'],
+            metadata=render_inputs.get('metadata')
+        )
+        pdf_bytes = self.cert_generator.render_pdf(canonical_json)
+        if not self.artifacts.put(record['cid_doc'], pdf_bytes):
+            # Renderer or output settings changed since issuance
+            logger.warning(f"Re-rendered {record['cert_id']} does not match {record['cid_doc']}")
+            return None
+        return pdf_bytes
+    
+    async def revoke_certificate(self, cert_id: str, reason: Optional[str] = None) -> bool:
+        """
+        Revoke a certificate (verification reads the revocation from the database).
+        
+        Args:
+            cert_id: Certificate ID to revoke
+            reason: Optional revocation reason
             
-            # Compare CIDs
-            verified = on_chain_cid.strip() == db_cid.strip()
+        Returns:
+            True if the certificate was found and revoked
+        """
+        return await self.db.revoke_certificate(cert_id, reason)
+    
+    def _cache_chain_cid(self, cert_id: str, record: Dict[str, Any], on_chain_cid: Optional[str]):
+        """Cache an on-chain lookup; anchors are immutable, so a confirmed one is kept longer."""
+        ttl = VERIFY_CACHE_TTL_SECONDS if on_chain_cid == record['cid_doc'] else VERIFY_CACHE_NEGATIVE_TTL_SECONDS
+        self.verification_cache.set(_chain_cache_key(cert_id, record), (on_chain_cid,), ttl)
+    
+    @traced("certificate.verify_batch")
+    async def verify_certificates(self, cert_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Verify many certificates with batched database and chain reads.
+        
+        Records are fetched with one database query per DB_BATCH_SIZE IDs.
+        Cached on-chain lookups are reused (see verify_certificate); the rest
+        are read with one JSON-RPC batch per CHAIN_BATCH_SIZE IDs.
+        
+        Args:
+            cert_ids: Certificate IDs to verify (duplicates are verified once)
             
-            if verified:
-                return {
-                    'verified': True,
-                    'status': 'verified',
-                    'cert_id': cert_id,
-                    'on_chain_cid': on_chain_cid,
-                    'db_cid': db_cid,
-                    'tx_hash': cert_record.get('tx_hash'),
-                    'issued_on': cert_record.get('issued_on'),
-                    'proof_url': f"{os.getenv('IPFS_GATEWAY_BASE', 'https://ipfs.io/ipfs/')}{db_cid}",
-                    'verify_url': f"{os.getenv('VERIFY_BASE_URL', 'https://learnova.org/verify')}?certId={cert_id}"
-                }
-            else:
-                return {
+        Returns:
+            Dict of cert_id -> verification result (same shape as
+            verify_certificate), in request order
+        """
+        batch_span = current_span()
+        unique_ids = list(dict.fromkeys(cert_ids))
+        batch_span.set_attribute('certs', len(unique_ids))
+        try:
+            records = await self.db.get_certificates(unique_ids)
+            on_chain: Dict[str, Optional[str]] = {}
+            to_check = {}
+            for cert_id in unique_ids:
+                record = records.get(cert_id)
+                if not _verifiable(record):
+                    continue
+                cached = self.verification_cache.get(_chain_cache_key(cert_id, record))
+                if cached is not None:
+                    on_chain[cert_id] = cached[0]
+                else:
+                    to_check[cert_id] = record
+            batch_span.set_attribute('cache_hits', len(on_chain))
+            if to_check:
+                found = await asyncio.to_thread(self._on_chain_cids, to_check)
+                for cert_id, record in to_check.items():
+                    on_chain[cert_id] = found.get(cert_id)
+                    self._cache_chain_cid(cert_id, record, on_chain[cert_id])
+            return {
+                cert_id: self._verification_result(cert_id, records.get(cert_id), on_chain.get(cert_id))
+                for cert_id in unique_ids
+            }
+        except Exception as e:
+            logger.error(f"Batch verification error: {str(e)}", exc_info=True)
+            batch_span.record_error(e)
+            return {
+                cert_id: {
                     'verified': False,
-                    'status': 'mismatch',
-                    'message': 'CID mismatch between database and blockchain',
-                    'on_chain_cid': on_chain_cid,
-                    'db_cid': db_cid
+                    'status': 'error',
+                    'message': str(e)
                 }
-                
+                for cert_id in unique_ids
+            }
+    
+    def _indexed_cids(self, records: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, Optional[str]], List[str]]:
+        """
+        Resolve on-chain CIDs from the local CertStored index.
+        
+        A certificate missing from the index is reported as not on chain only
+        if the index has synced past its anchor window; otherwise it is left
+        for a contract read.
+        
+        Returns:
+            (cert_id -> CID or None for the resolved certificates, IDs still to read on chain)
+        """
+        if self.chain_index is None:
+            return {}, list(records)
+        try:
+            indexed = self.chain_index.lookup_many(list(records))
         except Exception as e:
-            logger.error(f"Verification error: {str(e)}", exc_info=True)
+            logger.warning(f"CertStored index not available: {e}")
+            return {}, list(records)
+        
+        found: Dict[str, Optional[str]] = {}
+        remaining = []
+        for cert_id, record in records.items():
+            if cert_id in indexed:
+                found[cert_id] = indexed[cert_id]
+            elif self.chain_index.covers(record.get('issued_on')):
+                found[cert_id] = None
+            else:
+                remaining.append(cert_id)
+        return found, remaining
+    
+    def _on_chain_cids(self, records: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[str]]:
+        """Resolve on-chain CIDs from the index, batching contract reads for the rest."""
+        batched = {cert_id: record for cert_id, record in records.items() if _merkle_proof(record)}
+        found, remaining = self._indexed_cids(
+            {cert_id: record for cert_id, record in records.items() if cert_id not in batched}
+        )
+        if remaining:
+            found.update(self.blockchain.get_certificate_cids(remaining))
+        if batched:
+            found.update(self._merkle_cids(batched))
+        return found
+    
+    def _merkle_cids(self, records: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[str]]:
+        """
+        Resolve batch-anchored certificates from their inclusion proofs.
+        
+        A certificate's document CID counts as on chain if its proof leads
+        from (cert_id, cid_doc) to an anchored Merkle root.
+        """
+        return {
+            cert_id: record['cid_doc'] if self.blockchain.verify_merkle_inclusion(
+                cert_id, record['cid_doc'], _merkle_proof(record)
+            ) else None
+            for cert_id, record in records.items()
+        }
+    
+    def _verification_result(
+        self,
+        cert_id: str,
+        cert_record: Optional[Dict[str, Any]],
+        on_chain_cid: Optional[str]
+    ) -> Dict[str, Any]:
+        """Compare a database record with the on-chain CID."""
+        if not cert_record:
             return {
                 'verified': False,
-                'status': 'error',
-                'message': str(e)
+                'status': 'not_found',
+                'message': 'Certificate not found in database'
+            }
+        
+        if cert_record.get('revoked'):
+            return {
+                'verified': False,
+                'status': 'revoked',
+                'message': 'Certificate has been revoked'
+            }
+        
+        db_cid = cert_record.get('cid_doc')
+        # Pending and failed checkpoint rows may already hold a CID and tx hash
+        if cert_record.get('status') != 'issued' or not db_cid:
+            return {
+                'verified': False,
+                'status': 'incomplete',
+                'message': 'Certificate issuance has not completed' if db_cid else 'Certificate document not available'
+            }
+        
+        if not on_chain_cid:
+            return {
+                'verified': False,
+                'status': 'not_on_chain',
+                'message': 'Certificate not found on blockchain',
+                'db_cid': db_cid
+            }
+        
+        # Compare CIDs
+        verified = on_chain_cid.strip() == db_cid.strip()
+        
+        if verified:
+            result = {
+                'verified': True,
+                'status': 'verified',
+                'cert_id': cert_id,
+                'on_chain_cid': on_chain_cid,
+                'db_cid': db_cid,
+                'tx_hash': cert_record.get('tx_hash'),
+                'issued_on': cert_record.get('issued_on'),
+                'proof_url': f"{os.getenv('IPFS_GATEWAY_BASE', 'https://ipfs.io/ipfs/')}{db_cid}",
+                'verify_url': f"{os.getenv('VERIFY_BASE_URL', 'https://learnova.org/verify')}?certId={cert_id}"
+            }
+            if _merkle_proof(cert_record):
+                result['merkle_root'] = _merkle_proof(cert_record).get('root')
+            return result
+        else:
+            return {
+                'verified': False,
+                'status': 'mismatch',
+                'message': 'CID mismatch between database and blockchain',
+                'on_chain_cid': on_chain_cid,
+                'db_cid': db_cid
             }
-
@@ -0,0 +1,190 @@
+"""
+Template-stamping certificate renderer.
+Records the content stream of the static parts of the certificate once and,
+per certificate, replays it as a form XObject and stamps only the learner's
+fields on top.
+"""
+
+from io import BytesIO
+from typing import Any, Dict, List, Tuple
+
+import reportlab
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+
+_TITLE_COLOR = colors.HexColor('#1a56db')
+_HEADING_COLOR = colors.HexColor('#374151')
+_TEXT_COLOR = colors.HexColor('#1f2937')
+_FOOTER_COLOR = colors.HexColor('#6b7280')
+_LABEL_BACKGROUND = colors.HexColor('#f3f4f6')
+
+_MARGIN = 72
+_LABEL_WIDTH = 2.5 * inch
+_VALUE_WIDTH = 4 * inch
+_ROW_HEIGHT = 26
+_CELL_PADDING = 6
+
+# Details table rows: label and canonical JSON field
+_DETAIL_ROWS = [
+    ('Certificate ID:', 'certId'),
+    ('Course ID:', 'courseId'),
+    ('Grade:', 'grade'),
+    ('Duration:', 'durationHours'),
+    ('Modules Completed:', 'modules'),
+    ('Issued On:', 'issuedOn'),
+    ('Issuer:', 'issuer'),
+]
+
+
+def _fit_font_size(text: str, font: str, size: float, min_size: float, width: float) -> float:
+    """Largest font size from size down to min_size at which text fits width."""
+    while size > min_size and stringWidth(text, font, size) > width:
+        size -= 1
+    return size
+
+
+class StampedCertificateRenderer:
+    """
+    Certificate renderer that stamps fields onto a precomputed layout.
+
+    Text positions and table geometry are computed, and the static layout
+    drawn, once in the constructor; its content stream operators are kept.
+    Rendering a certificate only copies that stream into a form XObject and
+    places the learner's name, course, grade, dates and IDs. The output
+    matches the flowable renderer's content and styling, at a fixed layout.
+    """
+
+    def __init__(self, pagesize: Tuple[float, float] = A4):
+        self.width, self.height = pagesize
+        self.content_width = self.width - 2 * _MARGIN
+        self.center_x = self.width / 2
+
+        y = self.height - _MARGIN
+        self.title_y = y - 28
+        self.intro_y = self.title_y - 0.5 * inch - 20
+        self.name_y = self.intro_y - 34
+        self.completed_y = self.name_y - 28
+        self.course_y = self.completed_y - 36
+        # Room for a second line of course name above the table
+        self.table_top = self.course_y - 22 - 0.3 * inch - 22
+
+        self.table_x = self.center_x - (_LABEL_WIDTH + _VALUE_WIDTH) / 2
+        self.value_x = self.table_x + _LABEL_WIDTH + _CELL_PADDING
+        self.row_baselines: List[float] = [
+            self.table_top - (index + 1) * _ROW_HEIGHT + 12
+            for index in range(len(_DETAIL_ROWS))
+        ]
+        self.table_bottom = self.table_top - len(_DETAIL_ROWS) * _ROW_HEIGHT
+        self.footer_y = self.table_bottom - 0.3 * inch - 30
+        self._layout_fonts, self._layout_code = self._record_layout()
+
+    def _record_layout(self) -> Tuple[List[str], List[str]]:
+        """
+        Draw the layout form once on a scratch canvas.
+
+        Returns:
+            The fonts the document had registered, in order (their internal
+            names, /F1, /F2..., appear in the stream), and the form's
+            content stream operators
+        """
+        canvas = Canvas(BytesIO(), pagesize=(self.width, self.height), invariant=1)
+        # Replaying relies on reportlab internals (tested with the version in requirements.txt)
+        if not isinstance(getattr(canvas, '_code', None), list) or not isinstance(
+            getattr(getattr(canvas, '_doc', None), 'fontMapping', None), dict
+        ):
+            raise RuntimeError(
+                f"reportlab {reportlab.Version} has no Canvas._code or _doc.fontMapping, which the stamped "
+                "renderer replays; install the reportlab version from requirements.txt or use CERT_RENDERER=flowable"
+            )
+        canvas.beginForm('layout')
+        self._draw_layout(canvas)
+        return list(canvas._doc.fontMapping), list(canvas._code)
+
+    def _draw_layout(self, canvas: Canvas):
+        """Draw everything that is the same on every certificate."""
+        canvas.setFillColor(_TITLE_COLOR)
+        canvas.setFont('Helvetica-Bold', 28)
+        canvas.drawCentredString(self.center_x, self.title_y, "Certificate of Completion")
+
+        canvas.setFillColor(_TEXT_COLOR)
+        canvas.setFont('Helvetica', 12)
+        canvas.drawCentredString(self.center_x, self.intro_y, "This certifies that")
+        canvas.drawCentredString(self.center_x, self.completed_y, "has successfully completed the course:")
+
+        table_height = len(_DETAIL_ROWS) * _ROW_HEIGHT
+        canvas.setFillColor(_LABEL_BACKGROUND)
+        canvas.rect(self.table_x, self.table_bottom, _LABEL_WIDTH, table_height, stroke=0, fill=1)
+        canvas.setStrokeColor(colors.grey)
+        canvas.setLineWidth(1)
+        canvas.grid(
+            [self.table_x, self.table_x + _LABEL_WIDTH, self.table_x + _LABEL_WIDTH + _VALUE_WIDTH],
+            [self.table_top - index * _ROW_HEIGHT for index in range(len(_DETAIL_ROWS) + 1)]
+        )
+        canvas.setFillColor(colors.black)
+        canvas.setFont('Helvetica-Bold', 11)
+        for (label, _), baseline in zip(_DETAIL_ROWS, self.row_baselines):
+            canvas.drawString(self.table_x + _CELL_PADDING, baseline, label)
+
+        canvas.setFillColor(_FOOTER_COLOR)
+        canvas.setFont('Helvetica', 10)
+        canvas.drawCentredString(
+            self.center_x, self.footer_y,
+            "This certificate is issued by Learnova and anchored on the blockchain."
+        )
+
+    def _stamp_fields(self, canvas: Canvas, certificate_data: Dict[str, Any]):
+        """Draw the learner-specific fields."""
+        name = str(certificate_data['name'])
+        canvas.setFillColor(_TEXT_COLOR)
+        size = _fit_font_size(name, 'Helvetica-Bold', 22, 12, self.content_width)
+        canvas.setFont('Helvetica-Bold', size)
+        canvas.drawCentredString(self.center_x, self.name_y, name)
+
+        course = str(certificate_data['courseName'])
+        size = _fit_font_size(course, 'Helvetica-Bold', 18, 12, self.content_width)
+        lines = simpleSplit(course, 'Helvetica-Bold', size, self.content_width)[:2]
+        canvas.setFillColor(_HEADING_COLOR)
+        canvas.setFont('Helvetica-Bold', size)
+        for index, line in enumerate(lines):
+            canvas.drawCentredString(self.center_x, self.course_y - index * (size + 4), line)
+
+        canvas.setFillColor(colors.black)
+        value_width = _VALUE_WIDTH - 2 * _CELL_PADDING
+        for (_, field), baseline in zip(_DETAIL_ROWS, self.row_baselines):
+            value = certificate_data[field]
+            value = f"{value} hours" if field == 'durationHours' else str(value)
+            canvas.setFont('Helvetica', _fit_font_size(value, 'Helvetica', 11, 6, value_width))
+            canvas.drawString(self.value_x, baseline, value)
+
+    def render(self, certificate_data: Dict[str, Any]) -> bytes:
+        """
+        Render a certificate PDF.
+
+        Args:
+            certificate_data: Canonical certificate JSON
+
+        Returns:
+            PDF bytes (identical for identical input)
+        """
+        buffer = BytesIO()
+        canvas = Canvas(buffer, pagesize=(self.width, self.height), invariant=1, pageCompression=1)
+        canvas.setTitle(f"Certificate {certificate_data['certId']}")
+        canvas.setAuthor(certificate_data['issuer'])
+        canvas.setCreator(certificate_data['issuer'])
+
+        # Register the fonts in recording order so the stream's font names resolve
+        for font in self._layout_fonts:
+            canvas._doc.getInternalFontName(font)
+        canvas.beginForm('layout')
+        canvas._code.extend(self._layout_code)
+        canvas.endForm()
+        canvas.doForm('layout')
+
+        self._stamp_fields(canvas, certificate_data)
+        canvas.showPage()
+        canvas.save()
+        return buffer.getvalue()
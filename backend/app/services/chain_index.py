@@ -0,0 +1,348 @@
+"""
+Local index of on-chain CertStored events.
+Syncs the registry contract's CertStored logs into a SQLite database so
+certificates can be verified without a contract call.
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+CHAIN_INDEX_ENABLED = os.getenv("CHAIN_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+CHAIN_INDEX_PATH = os.getenv(
+    "CHAIN_INDEX_PATH",
+    os.path.join(os.path.dirname(__file__), "../../.cache/chain_index.sqlite3")
+)
+# Block the registry contract was deployed in (nothing earlier is scanned)
+CHAIN_INDEX_START_BLOCK = int(os.getenv("CHAIN_INDEX_START_BLOCK", "0"))
+# Blocks per eth_getLogs request (halved automatically if the node rejects the range)
+CHAIN_INDEX_BATCH_BLOCKS = int(os.getenv("CHAIN_INDEX_BATCH_BLOCKS", "2000"))
+# Blocks dropped and re-synced when the last synced block was reorganized away
+CHAIN_INDEX_REORG_DEPTH = int(os.getenv("CHAIN_INDEX_REORG_DEPTH", "12"))
+CHAIN_INDEX_POLL_SECONDS = float(os.getenv("CHAIN_INDEX_POLL_SECONDS", "15"))
+# Longest time between a certificate's issued_on and its anchor being mined;
+# a certificate missing from the index is only trusted as "not on chain"
+# once the index has synced this far past its issue time
+CHAIN_INDEX_ANCHOR_GRACE_SECONDS = float(os.getenv("CHAIN_INDEX_ANCHOR_GRACE_SECONDS", "600"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cert_events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    cert_id TEXT NOT NULL,
+    cid TEXT NOT NULL,
+    owner TEXT,
+    block_hash TEXT NOT NULL,
+    tx_hash TEXT,
+    timestamp INTEGER,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS idx_cert_events_cert_id ON cert_events (cert_id, block_number);
+CREATE TABLE IF NOT EXISTS sync_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    contract TEXT,
+    block_number INTEGER,
+    block_hash TEXT,
+    block_timestamp INTEGER,
+    updated_at REAL
+);
+"""
+
+
+def _to_timestamp(value: Union[str, datetime, None]) -> Optional[float]:
+    """Convert an issued_on value (ISO string or datetime) to a Unix timestamp."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return value.timestamp()
+
+
+class CertEventIndex:
+    """
+    SQLite store of CertStored events and the last synced block.
+
+    Every event is kept, so rewinding after a reorg is a delete of the
+    blocks above the rewind point; the latest event per certificate wins on
+    lookup, matching getCertCID.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (and create if needed) the index database.
+
+        Args:
+            path: SQLite file (defaults to CHAIN_INDEX_PATH)
+        """
+        self.path = path or CHAIN_INDEX_PATH
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection in autocommit mode (transactions are explicit)."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def state(self) -> Dict[str, Any]:
+        """
+        Get the sync position.
+
+        Returns:
+            Dict with contract, block_number, block_hash and block_timestamp
+            (all None before the first sync)
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM sync_state WHERE id = 1").fetchone()
+        if row is None:
+            return {'contract': None, 'block_number': None, 'block_hash': None, 'block_timestamp': None}
+        return {
+            'contract': row['contract'],
+            'block_number': row['block_number'],
+            'block_hash': row['block_hash'],
+            'block_timestamp': row['block_timestamp']
+        }
+
+    def apply(self, contract: str, events: List[Dict[str, Any]], block: Dict[str, Any]):
+        """
+        Store the events of a synced block range and advance the sync position.
+
+        Args:
+            contract: Registry contract address the events came from
+            events: Event dicts from BlockchainService.get_cert_stored_events
+            block: Header (number, hash, timestamp) of the last block in the range
+        """
+        with self._transaction() as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO cert_events
+                    (block_number, log_index, cert_id, cid, owner, block_hash, tx_hash, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        event['block_number'], event['log_index'], event['cert_id'], event['cid'],
+                        event.get('owner'), event['block_hash'], event.get('tx_hash'), event.get('timestamp')
+                    )
+                    for event in events
+                ]
+            )
+            self._set_state(conn, contract, block)
+
+    def rewind(self, contract: str, block: Optional[Dict[str, Any]]):
+        """
+        Drop everything synced after a block.
+
+        Args:
+            contract: Registry contract address
+            block: Header of the block to rewind to, or None to start over
+        """
+        with self._transaction() as conn:
+            if block is None:
+                conn.execute("DELETE FROM cert_events")
+                conn.execute("DELETE FROM sync_state")
+            else:
+                conn.execute("DELETE FROM cert_events WHERE block_number > ?", (block['number'],))
+                self._set_state(conn, contract, block)
+
+    def _set_state(self, conn: sqlite3.Connection, contract: str, block: Dict[str, Any]):
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO sync_state (id, contract, block_number, block_hash, block_timestamp, updated_at)
+            VALUES (1, ?, ?, ?, ?, ?)
+            """,
+            (contract, block['number'], block['hash'], block['timestamp'], time.time())
+        )
+
+    def lookup(self, cert_id: str) -> Optional[str]:
+        """Get the latest indexed CID of a certificate, or None if not indexed."""
+        return self.lookup_many([cert_id]).get(cert_id)
+
+    def lookup_many(self, cert_ids: List[str]) -> Dict[str, str]:
+        """
+        Get the latest indexed CIDs of many certificates.
+
+        Returns:
+            Dict of cert_id -> CID for the certificates found in the index
+        """
+        found: Dict[str, str] = {}
+        with self._connect() as conn:
+            # SQLite limits bound parameters per statement
+            for start in range(0, len(cert_ids), 500):
+                chunk = cert_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"""
+                    SELECT cert_id, cid FROM cert_events
+                    WHERE cert_id IN ({placeholders})
+                    ORDER BY block_number, log_index
+                    """,
+                    chunk
+                ).fetchall()
+                for row in rows:
+                    found[row['cert_id']] = row['cid']
+        return found
+
+    def covers(self, issued_on: Union[str, datetime, None]) -> bool:
+        """
+        Whether a certificate issued at issued_on would already be indexed.
+
+        True once the index has synced CHAIN_INDEX_ANCHOR_GRACE_SECONDS past
+        the issue time; a certificate missing from the index is then known
+        not to be on chain.
+        """
+        issued_ts = _to_timestamp(issued_on)
+        synced_ts = self.state()['block_timestamp']
+        if issued_ts is None or synced_ts is None:
+            return False
+        return synced_ts >= issued_ts + CHAIN_INDEX_ANCHOR_GRACE_SECONDS
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the number of indexed events and the sync position."""
+        with self._connect() as conn:
+            events = conn.execute("SELECT COUNT(*) FROM cert_events").fetchone()[0]
+        state = self.state()
+        return {
+            'events': events,
+            'synced_block': state['block_number'],
+            'synced_block_time': (
+                datetime.fromtimestamp(state['block_timestamp']).isoformat()
+                if state['block_timestamp'] else None
+            )
+        }
+
+
+class CertEventIndexer:
+    """
+    Background task that keeps a CertEventIndex in sync with the chain.
+
+    Each pass checks that the last synced block is still canonical (rewinding
+    reorg_depth blocks if not), then fetches CertStored logs from there to the
+    chain head in ranges of batch_blocks.
+    """
+
+    def __init__(
+        self,
+        index: CertEventIndex,
+        blockchain_factory: Callable[[], Any],
+        start_block: Optional[int] = None,
+        batch_blocks: Optional[int] = None,
+        reorg_depth: Optional[int] = None,
+        poll_seconds: Optional[float] = None
+    ):
+        self.index = index
+        self.blockchain_factory = blockchain_factory
+        self.start_block = CHAIN_INDEX_START_BLOCK if start_block is None else start_block
+        self.batch_blocks = CHAIN_INDEX_BATCH_BLOCKS if batch_blocks is None else batch_blocks
+        self.reorg_depth = CHAIN_INDEX_REORG_DEPTH if reorg_depth is None else reorg_depth
+        self.poll_seconds = CHAIN_INDEX_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.head_block: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start syncing on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="cert-event-indexer")
+            logger.info(f"Started CertStored indexer from block {self.start_block}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sync)
+            except Exception as e:
+                logger.warning(f"CertStored index sync failed: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def sync(self) -> int:
+        """
+        Sync the index up to the current chain head.
+
+        Returns:
+            Number of events stored
+        """
+        chain = self.blockchain_factory()
+        contract = chain.contract_address
+        state = self.index.state()
+
+        if state['contract'] is not None and state['contract'] != contract:
+            logger.warning(f"Registry contract changed to {contract}; rebuilding CertStored index")
+            self.index.rewind(contract, None)
+            state = self.index.state()
+
+        synced = state['block_number']
+        if synced is not None and chain.get_block_header(synced)['hash'] != state['block_hash']:
+            rewind_to = synced - self.reorg_depth
+            logger.warning(f"Block {synced} was reorganized; rewinding CertStored index to block {rewind_to}")
+            self.index.rewind(contract, chain.get_block_header(rewind_to) if rewind_to >= self.start_block else None)
+            state = self.index.state()
+            synced = state['block_number']
+
+        head = chain.get_block_header('latest')
+        self.head_block = head['number']
+        from_block = self.start_block if synced is None else synced + 1
+        batch_blocks = self.batch_blocks
+        stored = 0
+
+        while from_block <= head['number']:
+            to_block = min(from_block + batch_blocks - 1, head['number'])
+            try:
+                events = chain.get_cert_stored_events(from_block, to_block)
+            except Exception:
+                if batch_blocks == 1:
+                    raise
+                # Providers cap the range or result size of eth_getLogs
+                batch_blocks = max(1, batch_blocks // 2)
+                continue
+            block = head if to_block == head['number'] else chain.get_block_header(to_block)
+            self.index.apply(contract, events, block)
+            stored += len(events)
+            from_block = to_block + 1
+
+        if stored:
+            logger.info(f"Indexed {stored} CertStored events up to block {head['number']}")
+        return stored
+
+    def stats(self) -> Dict[str, Any]:
+        """Index stats plus the last seen head block and how far behind the index is."""
+        stats = self.index.stats()
+        stats['head_block'] = self.head_block
+        stats['lag_blocks'] = (
+            self.head_block - stats['synced_block']
+            if self.head_block is not None and stats['synced_block'] is not None else None
+        )
+        return stats
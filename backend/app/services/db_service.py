@@ -5,12 +5,18 @@ Uses Supabase for database operations.
 
 import os
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from supabase import create_client, Client
-from datetime import datetime
+from postgrest.exceptions import APIError
+from datetime import datetime, timedelta, timezone
+
+from app.services.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Rows per request for batched reads and upserts (keeps query strings and payloads bounded)
+DB_BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "500"))
+
 class DatabaseService:
     """Service for database operations related to certificates."""
     
@@ -42,10 +48,11 @@ class DatabaseService:
                 data['issued_on'] = data['issued_on'].isoformat()
             
             # Upsert (insert or update if exists)
-            result = self.client.table('certificates').upsert(
-                data,
-                on_conflict='cert_id'
-            ).execute()
+            with span("db.save_certificate", cert_id=data.get('cert_id')):
+                result = self.client.table('certificates').upsert(
+                    data,
+                    on_conflict='cert_id'
+                ).execute()
             
             if result.data:
                 logger.info(f"Certificate {cert_data.get('cert_id')} saved to database")
@@ -57,6 +64,32 @@ class DatabaseService:
             logger.error(f"Error saving certificate: {str(e)}")
             raise
     
+    async def get_certificates_by_users(self, user_ids: List[str], course_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the certificates of many users for one course.
+        
+        Args:
+            user_ids: User UUIDs
+            course_id: Course UUID
+            
+        Returns:
+            Dict of user_id -> certificate record (issued records preferred)
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(user_ids), DB_BATCH_SIZE):
+            chunk = user_ids[start:start + DB_BATCH_SIZE]
+            try:
+                with span("db.get_certificates_by_users", course_id=course_id, users=len(chunk)):
+                    result = self.client.table('certificates').select('*').eq('course_id', course_id).in_('user_id', chunk).execute()
+            except Exception as e:
+                logger.error(f"Error fetching certificates by users: {str(e)}")
+                raise
+            for record in result.data or []:
+                current = found.get(record['user_id'])
+                if current is None or (current.get('status') != 'issued' and record.get('status') == 'issued'):
+                    found[record['user_id']] = record
+        return found
+    
     async def get_certificate(self, cert_id: str) -> Optional[Dict[str, Any]]:
         """
         Get certificate by ID.
@@ -68,7 +101,8 @@ class DatabaseService:
             Certificate record or None
         """
         try:
-            result = self.client.table('certificates').select('*').eq('cert_id', cert_id).execute()
+            with span("db.get_certificate", cert_id=cert_id):
+                result = self.client.table('certificates').select('*').eq('cert_id', cert_id).execute()
             
             if result.data and len(result.data) > 0:
                 return result.data[0]
@@ -78,6 +112,29 @@ class DatabaseService:
             logger.error(f"Error fetching certificate: {str(e)}")
             return None
     
+    async def get_certificates(self, cert_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get many certificates by ID.
+        
+        Args:
+            cert_ids: Certificate IDs
+            
+        Returns:
+            Dict of cert_id -> certificate record (missing IDs are absent)
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(cert_ids), DB_BATCH_SIZE):
+            chunk = cert_ids[start:start + DB_BATCH_SIZE]
+            try:
+                with span("db.get_certificates", certs=len(chunk)):
+                    result = self.client.table('certificates').select('*').in_('cert_id', chunk).execute()
+            except Exception as e:
+                logger.error(f"Error fetching certificates: {str(e)}")
+                raise
+            for record in result.data or []:
+                found[record['cert_id']] = record
+        return found
+    
     async def get_certificate_by_user_course(self, user_id: str, course_id: str) -> Optional[Dict[str, Any]]:
         """
         Get certificate by user ID and course ID.
@@ -87,19 +144,136 @@ class DatabaseService:
             course_id: Course UUID
             
         Returns:
-            Certificate record or None
+            Certificate record (issued records preferred) or None
         """
         try:
-            result = self.client.table('certificates').select('*').eq('user_id', user_id).eq('course_id', course_id).execute()
+            with span("db.get_certificate_by_user_course", course_id=course_id):
+                result = self.client.table('certificates').select('*').eq('user_id', user_id).eq('course_id', course_id).execute()
             
-            if result.data and len(result.data) > 0:
-                return result.data[0]
+            # Earlier failed attempts may exist alongside the issued certificate
+            records = [record for record in result.data or [] if record.get('status') != 'superseded']
+            if records:
+                issued = [record for record in records if record.get('status') == 'issued']
+                return (issued or records)[0]
             return None
             
         except Exception as e:
             logger.error(f"Error fetching certificate by user/course: {str(e)}")
             return None
     
+    async def get_resumable_certificates(self, updated_before: datetime, limit: int) -> List[Dict[str, Any]]:
+        """
+        Get failed or pending certificates that have a resume checkpoint.
+        
+        Args:
+            updated_before: Only rows not updated since this time
+            limit: Maximum number of rows, oldest first
+            
+        Returns:
+            List of certificate records
+        """
+        try:
+            with span("db.get_resumable_certificates", limit=limit):
+                result = (
+                    self.client.table('certificates')
+                    .select('*')
+                    .in_('status', ['failed', 'pending'])
+                    .lt('updated_at', updated_before.isoformat())
+                    .not_.is_('meta->issuance', 'null')
+                    .order('updated_at')
+                    .limit(limit)
+                    .execute()
+                )
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Error fetching resumable certificates: {str(e)}")
+            raise
+    
+    async def supersede_certificate(self, cert_id: str) -> bool:
+        """
+        Retire an unfinished issuance the learner no longer needs.
+        
+        Only failed and pending rows are changed, so an issued certificate
+        is never superseded.
+        
+        Args:
+            cert_id: Certificate ID
+            
+        Returns:
+            True if the row was superseded
+        """
+        with span("db.supersede_certificate", cert_id=cert_id):
+            result = (
+                self.client.table('certificates')
+                .update({'status': 'superseded'})
+                .eq('cert_id', cert_id)
+                .in_('status', ['failed', 'pending'])
+                .execute()
+            )
+        if result.data:
+            logger.info(f"Certificate {cert_id} superseded")
+            return True
+        return False
+    
+    async def acquire_issuance_lease(self, user_id: str, course_id: str, holder: str, ttl_seconds: float) -> bool:
+        """
+        Take the issuance lease for a learner and course.
+        
+        The lease is a row keyed by (user_id, course_id); an expired lease
+        left by a crashed worker is replaced.
+        
+        Args:
+            user_id: User UUID
+            course_id: Course UUID
+            holder: Unique ID of the caller
+            ttl_seconds: Lease lifetime
+            
+        Returns:
+            True if the lease was taken, False if another holder has it
+        """
+        now = datetime.now(timezone.utc)
+        lease = {
+            'user_id': user_id,
+            'course_id': course_id,
+            'holder': holder,
+            'expires_at': (now + timedelta(seconds=ttl_seconds)).isoformat()
+        }
+        if self._insert_lease(lease):
+            return True
+        
+        # Held: take it over only if it has expired
+        with span("db.expire_issuance_lease", course_id=course_id):
+            expired = (
+                self.client.table('certificate_issuance_leases')
+                .delete()
+                .eq('user_id', user_id)
+                .eq('course_id', course_id)
+                .lt('expires_at', now.isoformat())
+                .execute()
+            )
+        # Another worker may take over the expired lease first
+        return bool(expired.data) and self._insert_lease(lease)
+    
+    def _insert_lease(self, lease: Dict[str, Any]) -> bool:
+        """Insert a lease row; False if one exists (unique violation)."""
+        try:
+            with span("db.acquire_issuance_lease", course_id=lease['course_id']):
+                self.client.table('certificate_issuance_leases').insert(lease).execute()
+            return True
+        except APIError as e:
+            if e.code == '23505':
+                return False
+            raise
+    
+    async def release_issuance_lease(self, user_id: str, course_id: str, holder: str):
+        """Release an issuance lease if the caller still holds it."""
+        try:
+            with span("db.release_issuance_lease", course_id=course_id):
+                self.client.table('certificate_issuance_leases').delete().eq('user_id', user_id).eq('course_id', course_id).eq('holder', holder).execute()
+        except Exception as e:
+            # The lease expires on its own
+            logger.warning(f"Could not release issuance lease: {str(e)}")
+    
     async def get_user_certificates(self, user_id: str) -> list:
         """
         Get all certificates for a user.
@@ -135,7 +309,8 @@ class DatabaseService:
             if reason:
                 update_data['meta'] = {'revocation_reason': reason}
             
-            result = self.client.table('certificates').update(update_data).eq('cert_id', cert_id).execute()
+            with span("db.revoke_certificate", cert_id=cert_id):
+                result = self.client.table('certificates').update(update_data).eq('cert_id', cert_id).execute()
             
             if result.data:
                 logger.info(f"Certificate {cert_id} revoked")
@@ -10,6 +10,8 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+from app.services.tracing import span
+
 logger = logging.getLogger(__name__)
 
 class EmailService:
@@ -95,7 +97,7 @@ class EmailService:
             msg.attach(MIMEText(html_body, 'html'))
             
             # Send email
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
+            with span("email.send", cert_id=cert_id), smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
                 server.starttls()
                 server.login(self.smtp_user, self.smtp_password)
                 server.send_message(msg)
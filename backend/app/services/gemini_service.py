@@ -25,13 +25,14 @@ def init_gemini():
     except Exception as e:
         raise Exception(f"Failed to initialize Gemini: {str(e)}")
 
-def generate_questionnaire(lesson_name: str, lesson_content: str) -> List[Dict[str, Any]]:
+def generate_questionnaire(lesson_name: str, lesson_content: str, is_excerpt: bool = False) -> List[Dict[str, Any]]:
     """
     Generate a questionnaire based on lesson name and content using Gemini
     
     Args:
         lesson_name: Name of the lesson
         lesson_content: Content of the lesson
+        is_excerpt: Whether the content is pages sampled from a longer document
         
     Returns:
         List of questions with options and correct answers
@@ -40,13 +41,15 @@ def generate_questionnaire(lesson_name: str, lesson_content: str) -> List[Dict[s
         # Initialize the model
         model = init_gemini()
         
+        content_label = "Lesson Content (excerpts sampled from across the full document)" if is_excerpt else "Lesson Content"
+        
         # Create the prompt
         prompt = f"""
         You are an expert educator creating a multiple-choice questionnaire to test understanding of a lesson.
         
         Lesson Title: {lesson_name}
         
-        Lesson Content:
+        {content_label}:
         {lesson_content}
         
         Please create 10 high-quality multiple-choice questions that test key concepts from this lesson.
@@ -0,0 +1,353 @@
+"""
+Durable certificate issuance queue.
+Records issuance requests in a local SQLite database and runs them through
+the certificate pipeline with a pool of background workers.
+"""
+
+import os
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.certificate_generator import CertificateGenerator
+
+logger = logging.getLogger(__name__)
+
+ISSUANCE_QUEUE_PATH = os.getenv(
+    "ISSUANCE_QUEUE_PATH",
+    os.path.join(os.path.dirname(__file__), "../../.cache/issuance_queue.sqlite3")
+)
+ISSUANCE_WORKERS = int(os.getenv("ISSUANCE_WORKERS", "2"))
+ISSUANCE_POLL_SECONDS = float(os.getenv("ISSUANCE_POLL_SECONDS", "1.0"))
+ISSUANCE_MAX_ATTEMPTS = int(os.getenv("ISSUANCE_MAX_ATTEMPTS", "3"))
+# A running job whose lease expires (worker crashed or was restarted) is picked up again
+ISSUANCE_LEASE_SECONDS = float(os.getenv("ISSUANCE_LEASE_SECONDS", "600"))
+ISSUANCE_RETRY_BASE_SECONDS = float(os.getenv("ISSUANCE_RETRY_BASE_SECONDS", "30"))
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+ISSUED = "issued"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS issuance_jobs (
+    cert_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_issuance_jobs_ready ON issuance_jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS idx_issuance_jobs_learner ON issuance_jobs (user_id, course_id);
+"""
+
+
+def _timestamp(value: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(value).isoformat() if value else None
+
+
+class IssuanceQueue:
+    """
+    SQLite-backed queue of certificate issuance jobs keyed by cert_id.
+
+    The certificate ID is assigned when the job is enqueued, so callers can
+    poll for it immediately. Jobs are claimed under a lease: if a worker dies
+    mid-issuance the job becomes claimable again once the lease expires.
+    Failed attempts are retried with exponential backoff up to max_attempts.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        retry_base_seconds: Optional[float] = None,
+        cert_id_factory: Optional[Callable[[], str]] = None
+    ):
+        """
+        Open (and create if needed) the queue database.
+
+        Args:
+            path: SQLite file (defaults to ISSUANCE_QUEUE_PATH)
+            max_attempts: Attempts before a job is marked failed
+            lease_seconds: How long a claimed job stays reserved for its worker
+            retry_base_seconds: Backoff before the first retry (doubles per attempt)
+            cert_id_factory: Allocates certificate IDs (defaults to CertificateGenerator)
+        """
+        self.path = path or ISSUANCE_QUEUE_PATH
+        self.max_attempts = ISSUANCE_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        self.lease_seconds = ISSUANCE_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self.retry_base_seconds = ISSUANCE_RETRY_BASE_SECONDS if retry_base_seconds is None else retry_base_seconds
+        self._cert_id_factory = cert_id_factory or (lambda: CertificateGenerator().generate_cert_id())
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection in autocommit mode (transactions are explicit)."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Run statements in a write transaction that serializes concurrent claimers."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, payload: Dict[str, Any], cert_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Record an issuance request.
+
+        A learner/course pair that already has a queued, running or issued
+        job is not enqueued twice; the existing job is returned instead.
+
+        Args:
+            payload: Keyword arguments for CertificatePipeline.issue_certificate
+                (must include user_id and course_id)
+            cert_id: The learner's existing certificate ID (an issued or
+                resumable row); a new one is allocated if not given. A failed
+                job under the same ID is queued again.
+
+        Returns:
+            Job dict (see get()) with an extra 'created' flag
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            existing = conn.execute(
+                "SELECT * FROM issuance_jobs WHERE user_id = ? AND course_id = ? AND status != ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (payload['user_id'], payload['course_id'], FAILED)
+            ).fetchone()
+            if existing is not None:
+                return {**self._to_job(existing), 'created': False}
+
+            cert_id = cert_id or self._cert_id_factory()
+            conn.execute(
+                "INSERT INTO issuance_jobs (cert_id, user_id, course_id, payload, status, attempts, "
+                "available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?) "
+                "ON CONFLICT (cert_id) DO UPDATE SET payload = excluded.payload, status = excluded.status, "
+                "attempts = 0, available_at = excluded.available_at, lease_expires = NULL, result = NULL, "
+                "error = NULL, updated_at = excluded.updated_at",
+                (cert_id, payload['user_id'], payload['course_id'], json.dumps(payload), QUEUED, now, now, now)
+            )
+            row = conn.execute("SELECT * FROM issuance_jobs WHERE cert_id = ?", (cert_id,)).fetchone()
+
+        logger.info(f"Queued certificate issuance {cert_id} for user {payload['user_id']}, course {payload['course_id']}")
+        return {**self._to_job(row), 'created': True}
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Reserve the oldest ready job for a worker.
+
+        Returns:
+            Job dict including 'payload', or None if nothing is ready
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM issuance_jobs "
+                "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?) "
+                "ORDER BY available_at LIMIT 1",
+                (QUEUED, now, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE issuance_jobs SET status = ?, attempts = attempts + 1, lease_expires = ?, updated_at = ? "
+                "WHERE cert_id = ?",
+                (RUNNING, now + self.lease_seconds, now, row['cert_id'])
+            )
+            row = conn.execute("SELECT * FROM issuance_jobs WHERE cert_id = ?", (row['cert_id'],)).fetchone()
+
+        job = self._to_job(row)
+        job['payload'] = json.loads(row['payload'])
+        return job
+
+    def complete(self, cert_id: str, result: Dict[str, Any]):
+        """Mark a job as issued and store the pipeline result."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE issuance_jobs SET status = ?, result = ?, error = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE cert_id = ?",
+                (ISSUED, json.dumps(result, default=str), time.time(), cert_id)
+            )
+
+    def fail(self, cert_id: str, error: str) -> str:
+        """
+        Record a failed attempt, scheduling a retry if attempts remain.
+
+        Returns:
+            New job status ('queued' for a retry, otherwise 'failed')
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts FROM issuance_jobs WHERE cert_id = ?", (cert_id,)).fetchone()
+            if row is None:
+                return FAILED
+            attempts = row['attempts']
+            if attempts < self.max_attempts:
+                # Exponential backoff with jitter so a burst of failures does not retry in lockstep
+                delay = self.retry_base_seconds * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+                status, available_at = QUEUED, now + delay
+            else:
+                status, available_at = FAILED, now
+            conn.execute(
+                "UPDATE issuance_jobs SET status = ?, error = ?, available_at = ?, lease_expires = NULL, updated_at = ? "
+                "WHERE cert_id = ?",
+                (status, error, available_at, now, cert_id)
+            )
+
+        if status == QUEUED:
+            logger.warning(f"Issuance {cert_id} attempt {attempts} failed, retrying: {error}")
+        else:
+            logger.error(f"Issuance {cert_id} failed after {attempts} attempts: {error}")
+        return status
+
+    def get(self, cert_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's state.
+
+        Returns:
+            Dict with cert_id, status, attempts, result, error and timestamps,
+            or None if the job does not exist. Once issued, cert_id is the
+            certificate the pipeline returned, which differs from the job's
+            if the learner's certificate was started elsewhere meanwhile.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM issuance_jobs WHERE cert_id = ?", (cert_id,)).fetchone()
+        return self._to_job(row) if row is not None else None
+
+    def stats(self) -> Dict[str, int]:
+        """Count jobs per status."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS count FROM issuance_jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, ISSUED: 0, FAILED: 0}
+        counts.update({row['status']: row['count'] for row in rows})
+        return counts
+
+    def _to_job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        result = json.loads(row['result']) if row['result'] else None
+        return {
+            'cert_id': (result or {}).get('cert_id') or row['cert_id'],
+            'user_id': row['user_id'],
+            'course_id': row['course_id'],
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'result': result,
+            'error': row['error'],
+            'created_at': _timestamp(row['created_at']),
+            'updated_at': _timestamp(row['updated_at'])
+        }
+
+
+class IssuanceWorkerPool:
+    """
+    Background asyncio workers that drain the issuance queue.
+
+    Each worker claims a job, runs it through the CertificatePipeline from
+    pipeline_factory and records the outcome. The service shares its one
+    pipeline with the workers, so queued jobs and direct requests share the
+    in-process single-flight and caches. Workers poll the queue and are
+    woken early by notify() when a new job is enqueued.
+    """
+
+    def __init__(
+        self,
+        queue: IssuanceQueue,
+        pipeline_factory: Callable[[], Any],
+        workers: Optional[int] = None,
+        poll_seconds: Optional[float] = None
+    ):
+        self.queue = queue
+        self.pipeline_factory = pipeline_factory
+        self.workers = ISSUANCE_WORKERS if workers is None else workers
+        self.poll_seconds = ISSUANCE_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def start(self):
+        """Start the worker tasks on the running event loop."""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run(index), name=f"issuance-worker-{index}")
+            for index in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} certificate issuance workers")
+
+    async def stop(self):
+        """Cancel the workers; in-flight jobs are picked up again after their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers after a job was enqueued."""
+        self._wakeup.set()
+
+    async def _run(self, index: int):
+        while True:
+            try:
+                job = await asyncio.to_thread(self.queue.claim)
+            except Exception as e:
+                logger.error(f"Issuance worker {index} could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            await self.process(job)
+
+    async def process(self, job: Dict[str, Any]) -> str:
+        """
+        Run one claimed job through the pipeline and record the outcome.
+
+        Returns:
+            Final job status after this attempt
+        """
+        cert_id = job['cert_id']
+        try:
+            pipeline = self.pipeline_factory()
+            result = await pipeline.issue_certificate(cert_id=cert_id, **job['payload'])
+        except Exception as e:
+            logger.error(f"Issuance {cert_id} raised: {e}", exc_info=True)
+            return await asyncio.to_thread(self.queue.fail, cert_id, str(e))
+
+        if result.get('status') in ('success', 'already_issued'):
+            await asyncio.to_thread(self.queue.complete, cert_id, result)
+            return ISSUED
+        return await asyncio.to_thread(self.queue.fail, cert_id, result.get('error') or 'Issuance failed')
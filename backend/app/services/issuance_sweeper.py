@@ -0,0 +1,91 @@
+"""
+Background resumption of failed and interrupted certificate issuances.
+Periodically finds certificate rows left failed or pending with a resume
+checkpoint and continues them through the pipeline.
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RESUME_SWEEP_ENABLED = os.getenv("RESUME_SWEEP_ENABLED", "true").lower() in ("1", "true", "yes")
+RESUME_SWEEP_SECONDS = float(os.getenv("RESUME_SWEEP_SECONDS", "60"))
+RESUME_SWEEP_BATCH = int(os.getenv("RESUME_SWEEP_BATCH", "20"))
+# Minimum time between attempts at the same certificate
+RESUME_RETRY_SECONDS = float(os.getenv("RESUME_RETRY_SECONDS", "300"))
+
+
+class IssuanceSweeper:
+    """
+    Background task that resumes failed and stuck issuances.
+
+    A failed row is retried once it has not been updated for retry_seconds;
+    a pending row only once the pipeline considers it stale (its attempt
+    crashed). Rows are resumed one at a time so the sweeper never competes
+    with live traffic for more than one pipeline run.
+    """
+
+    def __init__(
+        self,
+        pipeline: Any,
+        interval_seconds: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        retry_seconds: Optional[float] = None
+    ):
+        self.pipeline = pipeline
+        self.interval_seconds = RESUME_SWEEP_SECONDS if interval_seconds is None else interval_seconds
+        self.batch_size = RESUME_SWEEP_BATCH if batch_size is None else batch_size
+        self.retry_seconds = RESUME_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sweeping on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="issuance-sweeper")
+            logger.info(f"Started issuance sweeper (every {self.interval_seconds:.0f}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"Issuance sweep failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def sweep(self) -> Dict[str, int]:
+        """
+        Resume one batch of failed or stuck issuances.
+
+        Returns:
+            Dict with counts of 'resumed' (issued now), 'superseded' (the
+            learner already has another certificate) and 'failed' attempts
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retry_seconds)
+        records = await self.pipeline.db.get_resumable_certificates(cutoff, self.batch_size)
+        counts = {'resumed': 0, 'superseded': 0, 'failed': 0}
+        for record in records:
+            if not self.pipeline.is_resumable(record):
+                continue
+            result = await self.pipeline.resume_certificate(record['cert_id'])
+            if result.get('status') in ('success', 'already_issued'):
+                counts['resumed'] += 1
+            elif result.get('status') == 'superseded':
+                counts['superseded'] += 1
+            else:
+                counts['failed'] += 1
+        if any(counts.values()):
+            logger.info(
+                f"Issuance sweep: {counts['resumed']} resumed, {counts['superseded']} superseded, "
+                f"{counts['failed']} still failing"
+            )
+        return counts
@@ -4,13 +4,23 @@ Handles upload and pinning of certificate documents and proof pages.
 """
 
 import os
+import json
 import logging
 import time
 import requests
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, BinaryIO, Union
+
+from app.services.tracing import Span, span
+from app.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# CID version Pinata is asked to produce (and the pipeline computes locally)
+PINATA_CID_VERSION = int(os.getenv("PINATA_CID_VERSION", "0"))
+# CIDs this process has pinned, remembered so identical content is not uploaded again
+PINNED_CID_TTL_SECONDS = float(os.getenv("PINNED_CID_TTL_SECONDS", "86400"))
+PINNED_CID_MAX_ENTRIES = int(os.getenv("PINNED_CID_MAX_ENTRIES", "10000"))
+
 class PinataService:
     """Service for interacting with Pinata IPFS pinning service."""
     
@@ -26,6 +36,8 @@ class PinataService:
         self.base_url = "https://api.pinata.cloud"
         self.max_retries = 3
         self.retry_delay = 2  # seconds
+        self.cid_version = PINATA_CID_VERSION
+        self._pinned = TTLCache(PINNED_CID_MAX_ENTRIES)
     
     def _get_headers(self) -> dict:
         """Get headers for Pinata API requests."""
@@ -56,46 +68,126 @@ class PinataService:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        file_name = file_name or os.path.basename(file_path)
+        with open(file_path, 'rb') as f:
+            return self._pin(f, file_name or os.path.basename(file_path))
+    
+    def pin_bytes(self, content: Union[bytes, memoryview], file_name: str, cid: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Pin in-memory content to IPFS via Pinata without touching disk.
+        
+        Args:
+            content: Bytes (or a memoryview over them) to pin
+            file_name: Name for the file
+            cid: CID of the content computed locally (app.utils.ipfs_cid),
+                if known; content already pinned under it is not uploaded again
+            
+        Returns:
+            Dict containing 'cid' and URL information
+        """
+        return self._pin(content, file_name, cid)
+    
+    def _pin_result(self, cid: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return {
+            'cid': cid,
+            'ipfs_url': f"ipfs://{cid}",
+            'gateway_url': f"{os.getenv('IPFS_GATEWAY_BASE', 'https://ipfs.io/ipfs/')}{cid}",
+            'metadata': metadata
+        }
+    
+    def is_pinned(self, cid: str) -> bool:
+        """
+        Check whether content is pinned on this Pinata account.
+        
+        Args:
+            cid: Content CID
+            
+        Returns:
+            True if a pin for the CID exists
+        """
+        if self._pinned.get(cid):
+            return True
+        with span("pinata.pin_list", cid=cid) as request_span:
+            response = requests.get(
+                f"{self.base_url}/data/pinList",
+                params={'cid': cid, 'status': 'pinned', 'pageLimit': 1},
+                headers=self._get_headers(),
+                timeout=30
+            )
+            request_span.set_attribute('status_code', response.status_code)
+        response.raise_for_status()
+        pinned = response.json().get('count', 0) > 0
+        if pinned:
+            self._pinned.set(cid, True, PINNED_CID_TTL_SECONDS)
+        return pinned
+    
+    def _pin(self, content: Union[bytes, memoryview, BinaryIO], file_name: str, cid: Optional[str] = None) -> Dict[str, Any]:
+        """Upload content (bytes or an open binary file) with retries, traced as one span."""
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            size = len(content)
+        else:
+            size = os.fstat(content.fileno()).st_size
         
+        with span("pinata.pin", file_name=file_name, bytes=size) as pin_span:
+            if cid and self._pinned.get(cid):
+                logger.info(f"Content already pinned, skipping upload. CID: {cid}")
+                pin_span.set_attributes(cid=cid, skipped=True)
+                return self._pin_result(cid)
+            result = self._pin_with_retries(content, file_name, pin_span, cid)
+            self._pinned.set(result['cid'], True, PINNED_CID_TTL_SECONDS)
+            pin_span.set_attribute('cid', result['cid'])
+            return result
+    
+    def _pin_with_retries(
+        self,
+        content: Union[bytes, memoryview, BinaryIO],
+        file_name: str,
+        pin_span: Span,
+        cid: Optional[str] = None
+    ) -> Dict[str, Any]:
         for attempt in range(1, self.max_retries + 1):
+            pin_span.set_attribute('retries', attempt - 1)
             try:
+                if attempt > 1 and cid and self.is_pinned(cid):
+                    # The failed attempt may have been pinned before its response was lost
+                    logger.info(f"Content pinned by an earlier attempt. CID: {cid}")
+                    return self._pin_result(cid)
+                
                 logger.info(f"Pinning file to IPFS (attempt {attempt}/{self.max_retries}): {file_name}")
                 
                 url = f"{self.base_url}/pinning/pinFileToIPFS"
                 headers = self._get_headers()
                 
-                import json as json_lib
-                with open(file_path, 'rb') as f:
-                    files = {'file': (file_name, f, 'application/octet-stream')}
-                    
-                    # Optional pinata metadata
-                    pinata_metadata = {
-                        'name': file_name
-                    }
-                    
-                    # Pinata expects pinataMetadata as a JSON string in the form data
-                    data = {'pinataMetadata': json_lib.dumps(pinata_metadata)}
-                    
+                if hasattr(content, 'seek'):
+                    # Rewind file objects consumed by a previous attempt
+                    content.seek(0)
+                files = {'file': (file_name, content, 'application/octet-stream')}
+                
+                # Optional pinata metadata
+                pinata_metadata = {
+                    'name': file_name
+                }
+                
+                # Pinata expects pinataMetadata and pinataOptions as JSON strings in the form data
+                data = {
+                    'pinataMetadata': json.dumps(pinata_metadata),
+                    'pinataOptions': json.dumps({'cidVersion': self.cid_version})
+                }
+                
+                with span("pinata.request", attempt=attempt) as request_span:
                     response = requests.post(
                         url,
                         files=files,
                         headers=headers,
                         data=data
                     )
-                    
-                    response.raise_for_status()
-                    result = response.json()
+                    request_span.set_attribute('status_code', response.status_code)
+                
+                response.raise_for_status()
+                result = response.json()
                 
                 if 'IpfsHash' in result:
-                    cid = result['IpfsHash']
-                    logger.info(f"Successfully pinned file to IPFS. CID: {cid}")
-                    return {
-                        'cid': cid,
-                        'ipfs_url': f"ipfs://{cid}",
-                        'gateway_url': f"{os.getenv('IPFS_GATEWAY_BASE', 'https://ipfs.io/ipfs/')}{cid}",
-                        'metadata': result
-                    }
+                    logger.info(f"Successfully pinned file to IPFS. CID: {result['IpfsHash']}")
+                    return self._pin_result(result['IpfsHash'], result)
                 else:
                     raise ValueError(f"Unexpected response from Pinata: {result}")
                     
@@ -125,18 +217,8 @@ class PinataService:
         Returns:
             Dict containing 'cid' and URL information
         """
-        import tempfile
-        import json
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as tmp_file:
-            json.dump(json_data, tmp_file, indent=2, ensure_ascii=False, sort_keys=True)
-            tmp_path = tmp_file.name
-        
-        try:
-            return self.pin_file(tmp_path, file_name)
-        finally:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+        content = json.dumps(json_data, indent=2, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        return self.pin_bytes(content, file_name)
     
     def pin_buffer(self, file_buffer: bytes, file_name: str) -> Dict[str, Any]:
         """
@@ -149,15 +231,4 @@ class PinataService:
         Returns:
             Dict containing 'cid' and URL information
         """
-        import tempfile
-        
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as tmp_file:
-            tmp_file.write(file_buffer)
-            tmp_path = tmp_file.name
-        
-        try:
-            return self.pin_file(tmp_path, file_name)
-        finally:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-
+        return self.pin_bytes(file_buffer, file_name)
@@ -11,8 +11,19 @@ import qrcode
 from io import BytesIO
 import base64
 
+from app.services.certificate_generator import PDF_COMPACT, compact_output
+
 logger = logging.getLogger(__name__)
 
+# weasyprint output options for PDF_COMPACT: compressed streams, subsetted
+# fonts without hinting, recompressed images
+_WEASYPRINT_COMPACT_OPTIONS = {
+    'uncompressed_pdf': False,
+    'full_fonts': False,
+    'hinting': False,
+    'optimize_images': True
+}
+
 class ProofGenerator:
     """Service for generating proof pages (HTML/PDF) with verification information."""
     
@@ -22,6 +33,8 @@ class ProofGenerator:
         self.ipfs_gateway_base = os.getenv("IPFS_GATEWAY_BASE", "https://ipfs.io/ipfs/")
         self.contract_address = os.getenv("CONTRACT_ADDRESS", "")
         self.network_name = os.getenv("NETWORK_NAME", "Polygon Mumbai")
+        # RenderPool that renders in worker processes (set at application startup)
+        self.render_pool = None
     
     def generate_qr_code(self, url: str) -> str:
         """
@@ -344,6 +357,20 @@ class ProofGenerator:
         Returns:
             PDF bytes
         """
+        if self.render_pool is not None:
+            pdf_bytes = self.render_pool.render_proof(
+                cert_id=cert_id,
+                learner_name=learner_name,
+                course_name=course_name,
+                issued_on=issued_on,
+                cid_doc=cid_doc,
+                tx_hash=tx_hash
+            )
+            if output_path:
+                with open(output_path, 'wb') as f:
+                    f.write(pdf_bytes)
+            return pdf_bytes
+        
         try:
             # Try weasyprint first
             try:
@@ -358,7 +385,7 @@ class ProofGenerator:
                     tx_hash=tx_hash
                 )
                 
-                pdf_bytes = HTML(string=html_content).write_pdf()
+                pdf_bytes = HTML(string=html_content).write_pdf(**(_WEASYPRINT_COMPACT_OPTIONS if PDF_COMPACT else {}))
                 
                 if output_path:
                     with open(output_path, 'wb') as f:
@@ -399,7 +426,7 @@ class ProofGenerator:
         from io import BytesIO
         
         buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        doc = SimpleDocTemplate(buffer, pagesize=A4, pageCompression=1)
         
         styles = getSampleStyleSheet()
         
@@ -439,7 +466,8 @@ class ProofGenerator:
         verify_url = f"{self.verify_base_url}?certId={cert_id}"
         story.append(Paragraph(f"<b>Verify at:</b> {verify_url}", content_style))
         
-        doc.build(story)
+        with compact_output():
+            doc.build(story)
         pdf_bytes = buffer.getvalue()
         
         if output_path:
@@ -0,0 +1,175 @@
+"""
+Process pool for CPU-bound PDF rendering.
+Renders certificate PDFs and proof pages in worker processes so concurrent
+issuances are not serialized by the GIL.
+"""
+
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for rendering; 0 renders in the calling thread
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "0"))
+# Longest wait for one render, including time queued behind other renders
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "60"))
+
+# Per-process generators, built once by the pool initializer
+_certificate_generators: Dict[str, Any] = {}
+_proof_generator = None
+
+
+def _certificate_generator(renderer: str):
+    from app.services.certificate_generator import CertificateGenerator
+
+    generator = _certificate_generators.get(renderer)
+    if generator is None:
+        generator = _certificate_generators[renderer] = CertificateGenerator(renderer)
+    return generator
+
+
+def _init_worker(renderer: str):
+    """Load fonts, layouts and proof templates once per worker process."""
+    global _proof_generator
+    from app.services.proof_generator import ProofGenerator
+
+    generator = _certificate_generator(renderer)
+    _proof_generator = ProofGenerator()
+    try:
+        import weasyprint  # noqa: F401 - loads pango/cairo before the first proof
+    except (ImportError, OSError):
+        pass
+    # A throwaway render loads reportlab's font metrics and encoders
+    generator._build_pdf(generator.create_canonical_json(
+        cert_id="LEARNOVA-0000-000000",
+        name="Warm Up",
+        learner_id="warm-up",
+        course_id="warm-up",
+        course_name="Warm Up",
+        issued_on=datetime(2000, 1, 1),
+        issuer_address="",
+        grade="Pass",
+        duration_hours=0,
+        modules=0
+    ))
+
+
+def _render_certificate(renderer: str, certificate_data: Dict[str, Any]) -> bytes:
+    return _certificate_generator(renderer)._build_pdf(certificate_data)
+
+
+def _render_proof(kwargs: Dict[str, Any]) -> bytes:
+    return _proof_generator.generate_pdf_proof_page(**kwargs)
+
+
+class RenderPool:
+    """
+    Pool of worker processes rendering certificate and proof PDFs.
+
+    Callers block until their PDF is rendered (they already run in worker
+    threads of the stage graph) and get the bytes back. A worker that
+    crashes breaks the executor; it is replaced on the next render.
+    """
+
+    def __init__(self, workers: Optional[int] = None, renderer: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Start the worker processes.
+
+        Args:
+            workers: Number of processes (defaults to RENDER_WORKERS)
+            renderer: Certificate renderer preloaded by workers (defaults to CERT_RENDERER)
+            timeout: Seconds to wait for one render (defaults to RENDER_TIMEOUT)
+        """
+        from app.services.certificate_generator import CERT_RENDERER
+
+        self.workers = max(1, RENDER_WORKERS if workers is None else workers)
+        self.renderer = renderer or CERT_RENDERER
+        self.timeout = RENDER_TIMEOUT if timeout is None else timeout
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._executor = self._start()
+
+    def _start(self) -> ProcessPoolExecutor:
+        # Spawned rather than forked: the server process runs threads and an event loop
+        logger.info(f"Starting render pool with {self.workers} worker processes")
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.renderer,)
+        )
+
+    def _run(self, func, *args) -> bytes:
+        with self._lock:
+            executor = self._executor
+            self.pending += 1
+        try:
+            pdf_bytes = executor.submit(func, *args).result(timeout=self.timeout)
+        except BrokenProcessPool:
+            with self._lock:
+                self.failed += 1
+                if self._executor is executor:
+                    logger.warning("Render pool worker died; restarting the pool")
+                    self._executor = self._start()
+            raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.pending -= 1
+        with self._lock:
+            self.completed += 1
+        return pdf_bytes
+
+    def render_certificate(self, renderer: str, certificate_data: Dict[str, Any]) -> bytes:
+        """
+        Render a certificate PDF in a worker process.
+
+        Args:
+            renderer: Certificate renderer name ("flowable" or "stamped")
+            certificate_data: Canonical certificate JSON
+
+        Returns:
+            PDF bytes
+        """
+        return self._run(_render_certificate, renderer, certificate_data)
+
+    def render_proof(self, **kwargs: Any) -> bytes:
+        """
+        Render a proof page PDF in a worker process.
+
+        Args:
+            **kwargs: Arguments of ProofGenerator.generate_pdf_proof_page
+                (without output_path)
+
+        Returns:
+            PDF bytes
+        """
+        return self._run(_render_proof, kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Worker count, renders in flight, queue depth and outcome counters."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'pending': self.pending,
+                'queue_depth': max(0, self.pending - self.workers),
+                'completed': self.completed,
+                'failed': self.failed
+            }
+
+    def shutdown(self):
+        """Stop the worker processes (renders already queued are cancelled)."""
+        with self._lock:
+            executor = self._executor
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,122 @@
+"""
+Certificate serial number allocation.
+Leases blocks of serials from a shared counter file under an exclusive file
+lock, so several worker processes never hand out the same serial, and
+serves them from memory.
+"""
+
+import os
+import json
+import logging
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: serials are only unique within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CERT_SERIAL_FILE = os.getenv(
+    "CERT_SERIAL_FILE",
+    os.path.join(os.path.dirname(__file__), "../../.cert_serial")
+)
+# Serials leased per file access; unused serials of a block are skipped when
+# the process exits, so IDs stay unique but may have gaps
+CERT_SERIAL_BLOCK_SIZE = int(os.getenv("CERT_SERIAL_BLOCK_SIZE", "50"))
+
+
+class SerialAllocator:
+    """
+    Per-year serial counter shared between processes.
+
+    The counter file holds the last leased serial of each year as JSON
+    ({"2025": 1200}); serials restart at 1 every year. A legacy file holding
+    a single number (the old global counter) is read as the counter of the
+    year it is first leased for.
+    """
+
+    def __init__(self, path: Optional[str] = None, block_size: Optional[int] = None):
+        """
+        Initialize the allocator.
+
+        Args:
+            path: Counter file (defaults to CERT_SERIAL_FILE)
+            block_size: Serials leased at once (defaults to CERT_SERIAL_BLOCK_SIZE)
+        """
+        self.path = os.path.abspath(path or CERT_SERIAL_FILE)
+        self.block_size = max(1, block_size or CERT_SERIAL_BLOCK_SIZE)
+        # year -> (next serial, last serial of the leased block)
+        self._blocks: Dict[int, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        if fcntl is None:
+            logger.warning("File locking unavailable; certificate serials are only unique within this process")
+
+    def next(self, year: int) -> int:
+        """
+        Get the next serial for a year.
+
+        Only touches the counter file when the current block is used up.
+
+        Args:
+            year: Certificate year
+
+        Returns:
+            Serial number, starting at 1 each year
+        """
+        with self._lock:
+            serial, last = self._blocks.get(year, (1, 0))
+            if serial > last:
+                serial, last = self._lease(year)
+            self._blocks[year] = (serial + 1, last)
+            return serial
+
+    def _lease(self, year: int) -> Tuple[int, int]:
+        """Reserve the next block of serials for a year in the counter file."""
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        # The lock lives in its own file because the counter file is replaced on write
+        with open(self.path + ".lock", 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                counters = self._read(year)
+                first = counters.get(str(year), 0) + 1
+                last = first + self.block_size - 1
+                counters[str(year)] = last
+                self._write(counters)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        logger.debug(f"Leased certificate serials {first}-{last} for {year}")
+        return first, last
+
+    def _read(self, year: int) -> Dict[str, int]:
+        """Read the counters; a legacy single-number file becomes the counter of year."""
+        try:
+            with open(self.path, 'r') as f:
+                content = f.read().strip()
+        except FileNotFoundError:
+            return {}
+        if not content:
+            return {}
+        value = json.loads(content)
+        if isinstance(value, int):
+            return {str(year): value}
+        return {key: int(counter) for key, counter in value.items()}
+
+    def _write(self, counters: Dict[str, int]):
+        """Replace the counter file atomically (a crash never leaves it half written)."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".cert_serial-")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(counters, f, sort_keys=True)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
@@ -0,0 +1,157 @@
+"""
+Stage graph execution.
+Runs a set of dependent stages, starting each stage as soon as the stages it
+depends on have finished, and records per-stage timings and the critical path.
+Each stage runs inside a tracing span.
+"""
+
+import time
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """A named unit of work with dependencies on other stages."""
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: Sequence[str], required: bool):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.required = required
+
+
+class StageGraph:
+    """
+    Dependency graph of pipeline stages.
+
+    Each stage function receives a dict of the results of the stages it
+    depends on. Coroutine functions are awaited; plain functions are run in a
+    worker thread so blocking I/O (HTTP uploads, RPC calls, PDF rendering)
+    does not stall the event loop. A failing optional stage is logged and
+    yields None; a failing required stage cancels the run and re-raises once
+    the stages already running in worker threads (which cannot be
+    interrupted) have returned, so their side effects are complete.
+    """
+
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self._stages: Dict[str, Stage] = {}
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Any],
+        deps: Sequence[str] = (),
+        required: bool = True
+    ) -> "StageGraph":
+        """
+        Add a stage.
+
+        Dependencies must already have been added, which keeps the graph acyclic.
+
+        Args:
+            name: Unique stage name
+            func: Callable taking the results of the dependencies
+            deps: Names of stages that must finish first
+            required: Whether a failure aborts the whole run
+
+        Returns:
+            The graph, for chaining
+        """
+        if name in self._stages:
+            raise ValueError(f"Stage '{name}' already added")
+        missing = [dep for dep in deps if dep not in self._stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {', '.join(missing)}")
+        self._stages[name] = Stage(name, func, deps, required)
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run all stages, each as soon as its dependencies are done.
+
+        Returns:
+            Dict with 'results' (stage name -> return value), 'failed'
+            (optional stages that raised), 'timings' (start/end/duration in
+            seconds from the start of the run), 'critical_path' (stage names),
+            'critical_path_seconds' and 'elapsed'
+
+        Raises:
+            Exception: The error of the first required stage that failed
+        """
+        started = time.perf_counter()
+        results: Dict[str, Any] = {}
+        timings: Dict[str, Dict[str, float]] = {}
+        failed: List[str] = []
+        tasks: Dict[str, asyncio.Task] = {}
+        threads: List[asyncio.Future] = []
+
+        async def run_stage(stage: Stage):
+            if stage.deps:
+                await asyncio.gather(*(tasks[dep] for dep in stage.deps))
+            inputs = {dep: results[dep] for dep in stage.deps}
+            stage_start = time.perf_counter() - started
+            with span(f"stage.{stage.name}", graph=self.name) as stage_span:
+                try:
+                    if inspect.iscoroutinefunction(stage.func):
+                        value = await stage.func(inputs)
+                    else:
+                        # to_thread copies the context, so spans in the stage nest under stage_span
+                        thread = asyncio.ensure_future(asyncio.to_thread(stage.func, inputs))
+                        threads.append(thread)
+                        value = await asyncio.shield(thread)
+                except Exception as e:
+                    if stage.required:
+                        raise
+                    logger.warning(f"{self.name}: optional stage '{stage.name}' failed: {e}")
+                    stage_span.record_error(e)
+                    failed.append(stage.name)
+                    value = None
+                finally:
+                    stage_end = time.perf_counter() - started
+                    timings[stage.name] = {
+                        'start': round(stage_start, 4),
+                        'end': round(stage_end, 4),
+                        'duration': round(stage_end - stage_start, 4)
+                    }
+            results[stage.name] = value
+
+        # Stages were added in dependency order, so every dependency's task exists first
+        for stage in self._stages.values():
+            tasks[stage.name] = asyncio.create_task(run_stage(stage), name=f"{self.name}:{stage.name}")
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), *threads, return_exceptions=True)
+            raise
+
+        critical_path = self._critical_path(timings)
+        return {
+            'results': results,
+            'failed': failed,
+            'timings': timings,
+            'critical_path': critical_path,
+            'critical_path_seconds': round(sum(timings[name]['duration'] for name in critical_path), 4),
+            'elapsed': round(time.perf_counter() - started, 4)
+        }
+
+    def _critical_path(self, timings: Dict[str, Dict[str, float]]) -> List[str]:
+        """Walk back from the last stage to finish through its latest-finishing dependency."""
+        if not timings:
+            return []
+        path = []
+        current: Optional[str] = max(timings, key=lambda name: timings[name]['end'])
+        while current is not None:
+            path.append(current)
+            deps = self._stages[current].deps
+            current = max(deps, key=lambda name: timings[name]['end']) if deps else None
+        return list(reversed(path))
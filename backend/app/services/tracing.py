@@ -0,0 +1,212 @@
+"""
+Lightweight span tracing.
+Records timed, nested spans with attributes and hands finished spans to a
+pluggable exporter (JSON-lines file, log, or a custom class).
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import inspect
+import functools
+import importlib
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# none | log | jsonl | package.module:ExporterClass
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+TRACE_FILE = os.getenv(
+    "TRACE_FILE",
+    os.path.join(os.path.dirname(__file__), "../../.cache/traces.jsonl")
+)
+
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def set_attribute(self, key: str, value: Any):
+        """Attach an attribute (e.g. cert_id, bytes, retries)."""
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException):
+        """Mark the span as failed (also for errors that were handled)."""
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self, error: Optional[BaseException] = None):
+        """Stop the timer and record an error if the span failed."""
+        self.duration = time.perf_counter() - self._started
+        if error is not None:
+            self.record_error(error)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start_time,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+
+class SpanExporter:
+    """Base exporter; receives every finished span."""
+
+    def export(self, span: Span):
+        raise NotImplementedError
+
+
+class NullExporter(SpanExporter):
+    """Discards spans (tracing disabled)."""
+
+    def export(self, span: Span):
+        pass
+
+
+class LoggingExporter(SpanExporter):
+    """Logs one line per finished span."""
+
+    def export(self, span: Span):
+        logger.info(
+            f"span {span.name} {span.duration * 1000:.1f}ms status={span.status} "
+            f"trace={span.trace_id} {span.attributes}"
+        )
+
+
+class JsonLinesExporter(SpanExporter):
+    """Appends finished spans as JSON lines to a file for offline analysis."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or TRACE_FILE
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+
+_exporter: Optional[SpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def _exporter_from_env(name: str) -> SpanExporter:
+    """Build the exporter named by TRACE_EXPORTER."""
+    name = name.strip()
+    if name.lower() in ("", "none", "off"):
+        return NullExporter()
+    if name.lower() == "log":
+        return LoggingExporter()
+    if name.lower() == "jsonl":
+        return JsonLinesExporter()
+    module_name, _, class_name = name.partition(":")
+    try:
+        return getattr(importlib.import_module(module_name), class_name)()
+    except Exception as e:
+        logger.warning(f"Could not load trace exporter '{name}': {e}. Tracing disabled.")
+        return NullExporter()
+
+
+def get_exporter() -> SpanExporter:
+    """Get the active exporter (configured from TRACE_EXPORTER on first use)."""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = _exporter_from_env(TRACE_EXPORTER)
+    return _exporter
+
+
+def set_exporter(exporter: Optional[SpanExporter]):
+    """Replace the active exporter (None re-reads TRACE_EXPORTER on next use)."""
+    global _exporter
+    _exporter = exporter
+
+
+def current_span() -> Optional[Span]:
+    """The innermost open span in this context, if any."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a block as a span nested under the current span.
+
+    Works in sync and async code; worker threads started with
+    asyncio.to_thread inherit the caller's current span.
+
+    Args:
+        name: Span name, e.g. 'pinata.pin'
+        **attributes: Initial attributes
+
+    Yields:
+        The open Span, for adding attributes
+    """
+    current = Span(name, parent=_current_span.get(), attributes=attributes)
+    token = _current_span.set(current)
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end(error)
+        try:
+            get_exporter().export(current)
+        except Exception as e:
+            logger.debug(f"Failed to export span {name}: {e}")
+
+
+def traced(name: str, **attributes: Any) -> Callable:
+    """
+    Decorator that runs a sync or async function inside a span.
+
+    The function can add attributes with current_span().set_attribute().
+    """
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
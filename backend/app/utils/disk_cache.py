@@ -0,0 +1,162 @@
+"""
+Disk-backed LRU cache.
+Stores byte values as files in a directory and evicts least recently used
+entries once the total size exceeds a budget.
+"""
+
+import os
+import re
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+_SAFE_KEY = re.compile(r'^[A-Za-z0-9._-]{1,128}$')
+
+
+class DiskLRUCache:
+    """
+    Size-bounded cache of byte values stored as one file per key.
+
+    Recency is tracked in memory and mirrored to file mtimes, so the LRU
+    order survives restarts. Several processes may share a directory; an
+    entry evicted by another process is simply treated as a miss.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ".bin"):
+        """
+        Initialize the cache and index existing entries.
+
+        Args:
+            directory: Directory holding the cache files (created if missing)
+            max_bytes: Total size budget for all entries
+            suffix: File suffix for entries
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Index existing entries, oldest first."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(self.suffix):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-len(self.suffix)], stat.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._total_bytes += size
+
+    def _file_name(self, key: str) -> str:
+        """Map a key to a filesystem-safe name."""
+        if _SAFE_KEY.match(key):
+            return key
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name + self.suffix)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a cached value and mark it as recently used.
+
+        Returns:
+            Cached bytes or None on a miss
+        """
+        name = self._file_name(key)
+        path = self._path(name)
+        try:
+            with open(path, 'rb') as f:
+                value = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                self._forget(name)
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if name not in self._index:
+                self._index[name] = len(value)
+                self._total_bytes += len(value)
+            self._index.move_to_end(name)
+        return value
+
+    def set(self, key: str, value: bytes):
+        """Store a value atomically and evict old entries over the size budget."""
+        if len(value) > self.max_bytes:
+            logger.debug(f"Not caching {key}: {len(value)} bytes exceeds cache budget")
+            return
+
+        name = self._file_name(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(name))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            self._forget(name)
+            self._index[name] = len(value)
+            self._total_bytes += len(value)
+            self._evict()
+
+    def delete(self, key: str):
+        """Remove an entry if present."""
+        name = self._file_name(key)
+        with self._lock:
+            self._forget(name)
+        try:
+            os.unlink(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._path(self._file_name(key)))
+
+    def _forget(self, name: str):
+        """Drop an entry from the index (lock must be held)."""
+        size = self._index.pop(name, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        """Delete least recently used entries until under budget (lock must be held)."""
+        while self._total_bytes > self.max_bytes and self._index:
+            name, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.unlink(self._path(name))
+            except FileNotFoundError:
+                pass
+            logger.debug(f"Evicted cache entry {name} ({size} bytes)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits / lookups) if lookups else 0.0
+            }
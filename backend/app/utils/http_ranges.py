@@ -0,0 +1,76 @@
+"""
+HTTP conditional and range request helpers.
+Parses If-None-Match and single byte ranges (RFC 9110) for endpoints that
+serve immutable content.
+"""
+
+import re
+from typing import Optional, Tuple
+
+_BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised when a byte range lies entirely outside the content."""
+
+    def __init__(self, size: int):
+        super().__init__(f"Range not satisfiable for {size} bytes")
+        self.size = size
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    True if an If-None-Match header matches an entity tag.
+
+    Uses the weak comparison If-None-Match calls for: W/"x" matches "x".
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def parse_byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a Range header against content of a given size.
+
+    Only a single range is served; multiple ranges and malformed headers
+    are ignored (the full content is sent), as RFC 9110 allows.
+
+    Args:
+        range_header: Value of the Range header
+        size: Content length
+
+    Returns:
+        (first, last) byte positions, inclusive, or None to send everything
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end of the content
+    """
+    if not range_header:
+        return None
+    match = _BYTE_RANGE.match(range_header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(size)
+        return max(0, size - length), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise RangeNotSatisfiable(size)
+    return first, min(int(last), size - 1) if last else size - 1
@@ -0,0 +1,154 @@
+"""
+Local IPFS CID computation.
+Computes the CID IPFS (and Pinata) assign to a file added with the default
+importer settings, without uploading it: UnixFS dag-pb, fixed-size 256 KiB
+chunks and a balanced DAG of at most 174 links per node.
+"""
+
+import hashlib
+from typing import List, Tuple, Union
+
+# Importer defaults of `ipfs add` (and Pinata's pinFileToIPFS)
+CHUNK_SIZE = 262144
+MAX_LINKS = 174
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BASE32_ALPHABET = "abcdefghijklmnopqrstuvwxyz234567"
+
+# Multicodec codes used in CIDv1
+_DAG_PB = 0x70
+_RAW = 0x55
+_SHA2_256 = 0x12
+
+# UnixFS Data.DataType.File
+_UNIXFS_FILE = 2
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _bytes_field(number: int, value: bytes) -> bytes:
+    """Protobuf length-delimited field."""
+    return _varint(number << 3 | 2) + _varint(len(value)) + value
+
+
+def _varint_field(number: int, value: int) -> bytes:
+    return _varint(number << 3) + _varint(value)
+
+
+def _unixfs_file(data: bytes, filesize: int, blocksizes: List[int]) -> bytes:
+    """Encode a UnixFS Data message of type File."""
+    message = _varint_field(1, _UNIXFS_FILE)
+    if data:
+        message += _bytes_field(2, data)
+    message += _varint_field(3, filesize)
+    for size in blocksizes:
+        message += _varint_field(4, size)
+    return message
+
+
+def _dag_pb_node(data: bytes, links: List[Tuple[bytes, int]]) -> bytes:
+    """Encode a dag-pb PBNode (links before data, as go-ipfs serializes it)."""
+    node = b""
+    for cid_bytes, tsize in links:
+        node += _bytes_field(2, _bytes_field(1, cid_bytes) + _bytes_field(2, b"") + _varint_field(3, tsize))
+    return node + _bytes_field(1, data)
+
+
+def _cid_bytes(block: bytes, codec: int, cid_version: int) -> bytes:
+    multihash = bytes([_SHA2_256, 32]) + hashlib.sha256(block).digest()
+    if cid_version == 0:
+        return multihash
+    return _varint(1) + _varint(codec) + multihash
+
+
+def _base58(data: bytes) -> str:
+    number = int.from_bytes(data, 'big')
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = _BASE58_ALPHABET[remainder] + encoded
+    leading_zeros = len(data) - len(data.lstrip(b"\0"))
+    return _BASE58_ALPHABET[0] * leading_zeros + encoded
+
+
+def _base32(data: bytes) -> str:
+    """RFC 4648 base32, lowercase and unpadded (multibase 'b')."""
+    bits = int.from_bytes(data, 'big')
+    bit_count = len(data) * 8
+    padding = -bit_count % 5
+    bits <<= padding
+    bit_count += padding
+    return "".join(
+        _BASE32_ALPHABET[(bits >> shift) & 0x1F]
+        for shift in range(bit_count - 5, -1, -5)
+    )
+
+
+def compute_cid(
+    content: Union[bytes, memoryview],
+    cid_version: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+    max_links: int = MAX_LINKS
+) -> str:
+    """
+    Compute the IPFS CID of a file's content.
+
+    CIDv0 uses dag-pb leaves (as `ipfs add`); CIDv1 uses raw leaves (as
+    `ipfs add --cid-version=1`), so a single-chunk file is a raw block.
+    Every dag-pb leaf is a UnixFS File node, the first as well as the rest:
+    kubo's balanced importer does not mark them Raw.
+
+    Args:
+        content: File content
+        cid_version: 0 (Qm... base58) or 1 (bafy.../bafk... base32)
+        chunk_size: Bytes per leaf block
+        max_links: Most children per DAG node
+
+    Returns:
+        The CID string
+    """
+    if cid_version not in (0, 1):
+        raise ValueError(f"Unsupported CID version: {cid_version}")
+    content = bytes(content)
+    raw_leaves = cid_version == 1
+
+    # Each level holds (cid bytes, cumulative block size, file bytes) per node
+    level = []
+    for start in range(0, max(len(content), 1), chunk_size):
+        chunk = content[start:start + chunk_size]
+        if raw_leaves:
+            level.append((_cid_bytes(chunk, _RAW, cid_version), len(chunk), len(chunk)))
+        else:
+            block = _dag_pb_node(_unixfs_file(chunk, len(chunk), []), [])
+            level.append((_cid_bytes(block, _DAG_PB, cid_version), len(block), len(chunk)))
+
+    while len(level) > 1:
+        parents = []
+        for start in range(0, len(level), max_links):
+            children = level[start:start + max_links]
+            filesize = sum(child[2] for child in children)
+            block = _dag_pb_node(
+                _unixfs_file(b"", filesize, [child[2] for child in children]),
+                [(child[0], child[1]) for child in children]
+            )
+            tsize = len(block) + sum(child[1] for child in children)
+            parents.append((_cid_bytes(block, _DAG_PB, cid_version), tsize, filesize))
+        level = parents
+
+    root = level[0][0]
+    return _base58(root) if cid_version == 0 else "b" + _base32(root)
+
+
+def cid_version(cid: str) -> int:
+    """CID version of a CID string: 0 for base58 "Qm..." CIDs, 1 otherwise."""
+    return 0 if len(cid) == 46 and cid.startswith("Qm") else 1
@@ -0,0 +1,93 @@
+"""
+Merkle trees over certificate anchors.
+Builds the tree whose root is anchored on chain for a batch of certificates,
+the inclusion proof of each certificate, and verifies proofs against a root.
+
+Hashes are SHA-256 with domain separation (0x00 prefix for leaves, 0x01 for
+inner nodes, so a leaf can never pass for an inner node). Sibling pairs are
+sorted before hashing, so a proof is just the list of sibling hashes, with
+no left/right flags. A level with an odd number of nodes promotes its last
+node unchanged.
+"""
+
+import hashlib
+from typing import List, Sequence
+
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+def leaf_hash(cert_id: str, cid: str) -> bytes:
+    """Leaf for a certificate: its ID and the document CID it anchors."""
+    return hashlib.sha256(
+        _LEAF_PREFIX + cert_id.encode('utf-8') + b"\x00" + cid.encode('utf-8')
+    ).digest()
+
+
+def _node_hash(a: bytes, b: bytes) -> bytes:
+    if b < a:
+        a, b = b, a
+    return hashlib.sha256(_NODE_PREFIX + a + b).digest()
+
+
+def build_tree(leaves: Sequence[bytes]) -> List[List[bytes]]:
+    """
+    Build a Merkle tree.
+
+    Args:
+        leaves: Leaf hashes, in batch order
+
+    Returns:
+        The levels of the tree, leaves first; the last level holds the root
+    """
+    if not leaves:
+        raise ValueError("A Merkle tree needs at least one leaf")
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [_node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def inclusion_proof(levels: List[List[bytes]], index: int) -> List[bytes]:
+    """
+    Sibling hashes from the leaf at index up to the root.
+
+    Args:
+        levels: Tree from build_tree
+        index: Position of the leaf
+
+    Returns:
+        Proof (empty for a single-leaf tree)
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(level[sibling])
+        index //= 2
+    return proof
+
+
+def root_from_proof(leaf: bytes, proof: Sequence[bytes]) -> bytes:
+    """Recompute the root a leaf and its inclusion proof lead to."""
+    node = leaf
+    for sibling in proof:
+        node = _node_hash(node, sibling)
+    return node
+
+
+def verify_proof(leaf: bytes, proof: Sequence[bytes], root: bytes) -> bool:
+    """True if the proof shows leaf is included under root."""
+    return root_from_proof(leaf, proof) == root
+
+
+def to_hex(value: bytes) -> str:
+    return "0x" + value.hex()
+
+
+def from_hex(value: str) -> bytes:
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
@@ -0,0 +1,238 @@
+"""
+PDF text extraction backends.
+PyPDF2 is always available; faster libraries are used when installed.
+"""
+
+import io
+import os
+import mmap
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Backend used when PDF_EXTRACT_BACKEND is not set
+DEFAULT_BACKEND = "pypdf2"
+# Preference order for PDF_EXTRACT_BACKEND=auto (fastest first)
+AUTO_BACKEND_ORDER = ["pymupdf", "pypdfium2", "pypdf", "pypdf2"]
+
+# PDF content as raw bytes or a path to a file on disk
+PdfSource = Union[bytes, str]
+
+
+@contextmanager
+def open_pdf_stream(source: PdfSource):
+    """
+    Open PDF content as a seekable stream without copying it.
+
+    Bytes are wrapped in a BytesIO (which shares the buffer); files are
+    memory-mapped where possible so pages are read straight from the page cache.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+        return
+
+    with open(source, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and some filesystems cannot be mapped
+            yield f
+            return
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+class PdfBackend:
+    """
+    Base class for extraction backends.
+
+    Subclasses implement open() as a context manager yielding a document
+    handle, plus page_count() and page_text() on that handle. Backends that
+    can read the document outline override outline_page_indices().
+    """
+
+    name = ""
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """Whether the backend's library can be imported."""
+        return True
+
+    def open(self, source: PdfSource):
+        raise NotImplementedError
+
+    def page_count(self, document: Any) -> int:
+        raise NotImplementedError
+
+    def page_text(self, document: Any, index: int) -> str:
+        raise NotImplementedError
+
+    def outline_page_indices(self, document: Any) -> List[int]:
+        """0-based start pages of the top-level outline entries (chapters)."""
+        return []
+
+
+class PyPDF2Backend(PdfBackend):
+    """Pure-Python extraction with PyPDF2 (default)."""
+
+    name = "pypdf2"
+
+    @contextmanager
+    def open(self, source: PdfSource):
+        from PyPDF2 import PdfReader
+        with open_pdf_stream(source) as stream:
+            yield PdfReader(stream)
+
+    def page_count(self, document: Any) -> int:
+        return len(document.pages)
+
+    def page_text(self, document: Any, index: int) -> str:
+        return document.pages[index].extract_text() or ""
+
+    def outline_page_indices(self, document: Any) -> List[int]:
+        try:
+            # Nested lists hold child entries; only top-level destinations are chapters
+            return [
+                document.get_destination_page_number(item)
+                for item in document.outline
+                if not isinstance(item, list)
+            ]
+        except Exception as e:
+            logger.debug(f"Could not read PDF outline: {e}")
+            return []
+
+
+class PypdfBackend(PyPDF2Backend):
+    """Extraction with pypdf, the maintained successor of PyPDF2."""
+
+    name = "pypdf"
+
+    @classmethod
+    def is_available(cls) -> bool:
+        try:
+            import pypdf  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @contextmanager
+    def open(self, source: PdfSource):
+        from pypdf import PdfReader
+        with open_pdf_stream(source) as stream:
+            yield PdfReader(stream)
+
+
+class PyMuPDFBackend(PdfBackend):
+    """Native extraction with PyMuPDF (MuPDF bindings)."""
+
+    name = "pymupdf"
+
+    @classmethod
+    def is_available(cls) -> bool:
+        try:
+            import fitz  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @contextmanager
+    def open(self, source: PdfSource):
+        import fitz
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            document = fitz.open(stream=source, filetype="pdf")
+        else:
+            document = fitz.open(source)
+        try:
+            yield document
+        finally:
+            document.close()
+
+    def page_count(self, document: Any) -> int:
+        return document.page_count
+
+    def page_text(self, document: Any, index: int) -> str:
+        return document.load_page(index).get_text("text") or ""
+
+    def outline_page_indices(self, document: Any) -> List[int]:
+        try:
+            return [page - 1 for level, _, page in document.get_toc(simple=True) if level == 1 and page > 0]
+        except Exception as e:
+            logger.debug(f"Could not read PDF outline: {e}")
+            return []
+
+
+class PdfiumBackend(PdfBackend):
+    """Native extraction with pypdfium2 (PDFium bindings)."""
+
+    name = "pypdfium2"
+
+    @classmethod
+    def is_available(cls) -> bool:
+        try:
+            import pypdfium2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @contextmanager
+    def open(self, source: PdfSource):
+        import pypdfium2
+        document = pypdfium2.PdfDocument(bytes(source) if isinstance(source, (bytearray, memoryview)) else source)
+        try:
+            yield document
+        finally:
+            document.close()
+
+    def page_count(self, document: Any) -> int:
+        return len(document)
+
+    def page_text(self, document: Any, index: int) -> str:
+        page = document[index]
+        try:
+            text_page = page.get_textpage()
+            try:
+                return text_page.get_text_range() or ""
+            finally:
+                text_page.close()
+        finally:
+            page.close()
+
+
+BACKENDS: Dict[str, PdfBackend] = {
+    backend.name: backend
+    for backend in (PyPDF2Backend(), PypdfBackend(), PyMuPDFBackend(), PdfiumBackend())
+}
+
+
+def available_backends() -> List[str]:
+    """Names of the backends whose libraries are installed."""
+    return [name for name, backend in BACKENDS.items() if backend.is_available()]
+
+
+def get_backend(name: Optional[str] = None) -> PdfBackend:
+    """
+    Resolve an extraction backend.
+
+    Args:
+        name: Backend name, 'auto' for the fastest installed backend,
+            or None to use PDF_EXTRACT_BACKEND (default: pypdf2)
+
+    Returns:
+        PdfBackend instance (falls back to PyPDF2 if the requested one is unavailable)
+    """
+    name = (name or os.getenv("PDF_EXTRACT_BACKEND", DEFAULT_BACKEND)).lower()
+
+    if name == "auto":
+        for candidate in AUTO_BACKEND_ORDER:
+            if BACKENDS[candidate].is_available():
+                return BACKENDS[candidate]
+
+    backend = BACKENDS.get(name)
+    if backend is None or not backend.is_available():
+        logger.warning(f"PDF backend '{name}' not available, using {DEFAULT_BACKEND}")
+        return BACKENDS[DEFAULT_BACKEND]
+    return backend
@@ -1,32 +1,484 @@
-from PyPDF2 import PdfReader
-from typing import Optional
-import io
+from typing import Optional, List, Dict, Any, Tuple, Union
+from contextlib import contextmanager
+import os
+import json
+import time
+import logging
+import threading
+import multiprocessing
+from app.utils.disk_cache import DiskLRUCache
+from app.utils.pdf_backends import BACKENDS, PdfBackend, PdfSource, get_backend
+from app.utils.text_normalizer import normalize_pages
 
-def extract_text_from_pdf(file_content: bytes) -> str:
+logger = logging.getLogger(__name__)
+
+# Parallel extraction settings
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "50"))
+EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACT_TIMEOUT = float(os.getenv("PDF_EXTRACT_TIMEOUT", "60"))
+MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "1000"))
+SLOW_PAGE_SECONDS = float(os.getenv("PDF_SLOW_PAGE_SECONDS", "1.0"))
+
+# Extracted-text cache keyed by the SHA-256 of the uploaded PDF
+TEXT_CACHE_ENABLED = os.getenv("PDF_TEXT_CACHE_ENABLED", "true").lower() == "true"
+TEXT_CACHE_DIR = os.getenv(
+    "PDF_TEXT_CACHE_DIR",
+    os.path.join(os.path.dirname(__file__), "../../.cache/pdf_text")
+)
+TEXT_CACHE_MAX_BYTES = int(os.getenv("PDF_TEXT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Questionnaires only need a representative view of large documents
+SAMPLE_PAGE_THRESHOLD = int(os.getenv("QUESTIONNAIRE_SAMPLE_THRESHOLD", "40"))
+SAMPLE_PAGES = int(os.getenv("QUESTIONNAIRE_SAMPLE_PAGES", "12"))
+SAMPLE_MAX_CHARS = int(os.getenv("QUESTIONNAIRE_MAX_CHARS", "24000"))
+
+# Strip running headers/footers and redundant whitespace before prompting
+NORMALIZE_TEXT = os.getenv("PDF_NORMALIZE_TEXT", "true").lower() == "true"
+
+_text_cache: Optional[DiskLRUCache] = None
+_text_cache_lock = threading.Lock()
+
+
+def _extract_page_range(
+    backend_name: str,
+    source: PdfSource,
+    start: int,
+    end: int
+) -> List[Tuple[int, str, float]]:
     """
-    Extract text from PDF file content
-    
+    Extract text from pages [start, end) of a PDF.
+
+    Runs inside a worker process, so it re-opens the document itself.
+
+    Returns:
+        List of (page_index, text, seconds) tuples
+    """
+    backend = BACKENDS[backend_name]
+    with backend.open(source) as document:
+        results = []
+        for index in range(start, end):
+            started = time.perf_counter()
+            text = backend.page_text(document, index)
+            results.append((index, text, time.perf_counter() - started))
+        return results
+
+
+def _page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Split pages into contiguous ranges, a few per worker for load balancing."""
+    chunk_count = max(1, min(page_count, workers * 4))
+    chunk_size = -(-page_count // chunk_count)
+    return [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+
+
+def extract_pdf_pages(
+    source: PdfSource,
+    parallel: Optional[bool] = None,
+    max_pages: Optional[int] = None,
+    timeout: Optional[float] = None,
+    workers: Optional[int] = None,
+    backend: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Extract text page by page, optionally across a process pool.
+
     Args:
-        file_content: Binary content of the PDF file
-        
+        source: Binary content of the PDF file, or a path to it
+        parallel: Force parallel (True) or sequential (False) extraction.
+            Defaults to parallel for documents above PDF_PARALLEL_PAGE_THRESHOLD pages.
+        max_pages: Maximum number of pages to extract (defaults to PDF_MAX_PAGES)
+        timeout: Per-document timeout in seconds (defaults to PDF_EXTRACT_TIMEOUT)
+        workers: Number of worker processes (defaults to PDF_EXTRACT_WORKERS)
+        backend: Extraction backend name (defaults to PDF_EXTRACT_BACKEND)
+
     Returns:
-        Extracted text from the PDF
+        Dict with 'pages' (text per page, in page order), 'page_count',
+        'truncated', 'page_timings' (seconds per extracted page) and 'backend'
     """
+    max_pages = MAX_PAGES if max_pages is None else max_pages
+    timeout = EXTRACT_TIMEOUT if timeout is None else timeout
+    workers = EXTRACT_WORKERS if workers is None else workers
+    pdf_backend = get_backend(backend)
+
+    try:
+        with pdf_backend.open(source) as document:
+            page_count = pdf_backend.page_count(document)
+            return _extract_pages(source, pdf_backend, document, page_count, parallel, max_pages, timeout, workers)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+
+
+def _extract_pages(
+    source: PdfSource,
+    pdf_backend: PdfBackend,
+    document: Any,
+    page_count: int,
+    parallel: Optional[bool],
+    max_pages: int,
+    timeout: float,
+    workers: int
+) -> Dict[str, Any]:
+    """Run extraction for an opened document and collect timings."""
+    pages_to_extract = min(page_count, max_pages)
+    if pages_to_extract < page_count:
+        logger.warning(f"PDF has {page_count} pages; extracting only the first {pages_to_extract}")
+
+    if parallel is None:
+        parallel = pages_to_extract >= PARALLEL_PAGE_THRESHOLD and workers > 1
+
+    started = time.perf_counter()
     try:
-        # Create a file-like object from bytes
-        pdf_file = io.BytesIO(file_content)
-        
-        # Create a PDF reader object
-        reader = PdfReader(pdf_file)
-        
-        # Extract text from each page
-        text_parts = []
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                text_parts.append(text)
-                
-        return "\n".join(text_parts)
-        
+        if parallel and pages_to_extract > 1:
+            results = _extract_parallel(pdf_backend, source, pages_to_extract, workers, timeout)
+        else:
+            results = _extract_sequential(pdf_backend, document, list(range(pages_to_extract)), timeout)
+    except ValueError:
+        raise
     except Exception as e:
         raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+
+    results.sort(key=lambda item: item[0])
+    page_timings = [seconds for _, _, seconds in results]
+    for index, _, seconds in results:
+        if seconds >= SLOW_PAGE_SECONDS:
+            logger.warning(f"Slow PDF page {index + 1}/{page_count}: {seconds:.2f}s")
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Extracted {pages_to_extract} pages in {elapsed:.2f}s "
+        f"({pdf_backend.name}, {'parallel' if parallel else 'sequential'}, "
+        f"slowest page {max(page_timings, default=0):.2f}s)"
+    )
+
+    return {
+        'pages': [text for _, text, _ in results],
+        'page_count': page_count,
+        'truncated': pages_to_extract < page_count,
+        'page_timings': page_timings,
+        'elapsed': elapsed,
+        'backend': pdf_backend.name
+    }
+
+
+def _extract_sequential(
+    pdf_backend: PdfBackend,
+    document: Any,
+    indices: List[int],
+    timeout: float
+) -> List[Tuple[int, str, float]]:
+    """Extract the given pages on the calling thread, enforcing the document timeout between pages."""
+    deadline = time.monotonic() + timeout
+    results = []
+    for done, index in enumerate(indices):
+        if time.monotonic() > deadline:
+            raise ValueError(f"PDF extraction timed out after {timeout:.0f}s ({done}/{len(indices)} pages)")
+        started = time.perf_counter()
+        text = pdf_backend.page_text(document, index)
+        results.append((index, text, time.perf_counter() - started))
+    return results
+
+
+def _extract_parallel(
+    pdf_backend: PdfBackend,
+    source: PdfSource,
+    page_count: int,
+    workers: int,
+    timeout: float
+) -> List[Tuple[int, str, float]]:
+    """Extract page ranges across a process pool, terminating it on timeout."""
+    ranges = _page_ranges(page_count, workers)
+    deadline = time.monotonic() + timeout
+    results = []
+
+    # Leaving the context manager terminates the workers, so a pathological
+    # page cannot keep burning CPU after the request has given up on it.
+    with multiprocessing.Pool(processes=min(workers, len(ranges))) as pool:
+        pending = [pool.apply_async(_extract_page_range, (pdf_backend.name, source, start, end)) for start, end in ranges]
+        for async_result in pending:
+            remaining = max(0.0, deadline - time.monotonic())
+            try:
+                results.extend(async_result.get(timeout=remaining))
+            except multiprocessing.TimeoutError:
+                raise ValueError(f"PDF extraction timed out after {timeout:.0f}s")
+
+    return results
+
+
+def extract_text_from_pdf(
+    file_content: PdfSource,
+    parallel: Optional[bool] = None,
+    backend: Optional[str] = None
+) -> str:
+    """
+    Extract text from PDF file content
+
+    Args:
+        file_content: Binary content of the PDF file, or a path to it
+        parallel: Force parallel or sequential extraction (auto by page count if None)
+        backend: Extraction backend name (defaults to PDF_EXTRACT_BACKEND)
+
+    Returns:
+        Extracted text from the PDF
+    """
+    result = extract_pdf_pages(file_content, parallel=parallel, backend=backend)
+    return _join_pages(result['pages'])[0]
+
+
+def _join_pages(pages: List[str]) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Join non-empty pages with newlines, recording each page's span in the text.
+
+    Returns:
+        Tuple of (text, [(start, end), ...] per page)
+    """
+    parts = []
+    offsets = []
+    position = 0
+    for text in pages:
+        if text:
+            if parts:
+                position += 1
+            parts.append(text)
+            offsets.append((position, position + len(text)))
+            position += len(text)
+        else:
+            offsets.append((position, position))
+    return "\n".join(parts), offsets
+
+
+def get_text_cache() -> Optional[DiskLRUCache]:
+    """Get the shared extracted-text cache, or None if disabled or unavailable."""
+    global _text_cache
+    if not TEXT_CACHE_ENABLED:
+        return None
+    if _text_cache is None:
+        with _text_cache_lock:
+            if _text_cache is None:
+                try:
+                    _text_cache = DiskLRUCache(TEXT_CACHE_DIR, TEXT_CACHE_MAX_BYTES, suffix=".json")
+                except OSError as e:
+                    logger.warning(f"PDF text cache unavailable: {e}")
+                    return None
+    return _text_cache
+
+
+def _split_pages(text: str, offsets: List[Tuple[int, int]]) -> List[str]:
+    """Recover per-page text from joined text and page offsets."""
+    return [text[start:end] for start, end in offsets]
+
+
+def _read_cached_entry(upload, pdf_backend: PdfBackend) -> Optional[Dict[str, Any]]:
+    """Look up the cached extraction for an upload, discarding corrupt entries."""
+    cache = get_text_cache()
+    if cache is None:
+        return None
+
+    cache_key = f"{upload.sha256}-{pdf_backend.name}"
+    cached = cache.get(cache_key)
+    if cached is None:
+        return None
+    try:
+        entry = json.loads(cached)
+        logger.info(f"PDF text cache hit for {cache_key[:12]} ({entry['page_count']} pages)")
+        return entry
+    except (ValueError, KeyError) as e:
+        logger.warning(f"Discarding corrupt PDF text cache entry {cache_key[:12]}: {e}")
+        cache.delete(cache_key)
+        return None
+
+
+def _load_or_extract(upload, pdf_backend: PdfBackend) -> Tuple[Dict[str, Any], bool]:
+    """
+    Get the full extraction for an upload from the cache, or parse and cache it.
+
+    Returns:
+        Tuple of (cache entry with 'text', 'page_offsets', 'page_count',
+        'truncated'; whether it came from the cache)
+    """
+    entry = _read_cached_entry(upload, pdf_backend)
+    if entry is not None:
+        return entry, True
+
+    result = extract_pdf_pages(upload.source, backend=pdf_backend.name)
+    text, offsets = _join_pages(result['pages'])
+    entry = {
+        'text': text,
+        'page_offsets': offsets,
+        'page_count': result['page_count'],
+        'truncated': result['truncated']
+    }
+
+    cache = get_text_cache()
+    if cache is not None:
+        try:
+            cache.set(f"{upload.sha256}-{pdf_backend.name}", json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"Failed to cache extracted PDF text: {e}")
+
+    return entry, False
+
+
+def _prepare_pages(pages: List[str], normalize: bool) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Join pages into prompt text, normalizing when enabled."""
+    if not normalize:
+        return _join_pages(pages)[0], None
+    normalized = normalize_pages(pages)
+    return normalized['text'], normalized['stats']
+
+
+def extract_text_from_upload(upload, normalize: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Extract text from a spooled PDF upload, reusing cached text for repeat uploads.
+
+    The cache key is the SHA-256 computed while the upload streamed in (plus
+    the backend name, since backends produce different text), so a hit skips
+    parsing entirely. The cache holds raw text; normalization runs afterwards.
+
+    Args:
+        upload: SpooledUpload holding the PDF
+        normalize: Strip headers/footers and whitespace before returning
+            (defaults to PDF_NORMALIZE_TEXT)
+
+    Returns:
+        Dict with 'text', 'page_count', 'cached' and 'normalization'
+        (before/after character and token counts, or None if disabled)
+    """
+    normalize = NORMALIZE_TEXT if normalize is None else normalize
+    entry, cached = _load_or_extract(upload, get_backend())
+
+    if normalize:
+        text, normalization = _prepare_pages(_split_pages(entry['text'], entry['page_offsets']), True)
+    else:
+        text, normalization = entry['text'], None
+
+    return {
+        'text': text,
+        'page_count': entry['page_count'],
+        'cached': cached,
+        'normalization': normalization
+    }
+
+
+def sample_page_indices(page_count: int, sample_size: int, section_starts: Optional[List[int]] = None) -> List[int]:
+    """
+    Pick a stratified sample of page indices.
+
+    When the document outline gives section start pages, one page is taken
+    from the start of each section (skipping the title page where possible)
+    and the rest of the budget is spread evenly. Otherwise the document is
+    split into equal strata and the middle page of each is taken.
+
+    Args:
+        page_count: Number of pages in the document
+        sample_size: Number of pages to sample
+        section_starts: Optional 0-based start pages of top-level sections
+
+    Returns:
+        Sorted 0-based page indices
+    """
+    if page_count <= sample_size:
+        return list(range(page_count))
+
+    chosen = set()
+    starts = sorted({start for start in (section_starts or []) if 0 <= start < page_count})
+    if starts:
+        # Spread the section picks evenly if there are more sections than budget
+        step = max(1, -(-len(starts) // max(1, sample_size // 2)))
+        bounds = starts + [page_count]
+        for position in range(0, len(starts), step):
+            start, end = bounds[position], bounds[position + 1]
+            chosen.add(start + 1 if end - start > 1 else start)
+
+    remaining = sample_size - len(chosen)
+    for stratum in range(remaining):
+        index = int((stratum + 0.5) * page_count / remaining)
+        while index in chosen and index + 1 < page_count:
+            index += 1
+        chosen.add(index)
+
+    return sorted(chosen)[:sample_size]
+
+
+def _budget_pages(pages: List[str], max_chars: int) -> List[str]:
+    """Trim pages to an equal share of a character budget."""
+    total = sum(len(page) for page in pages)
+    if total <= max_chars or not pages:
+        return pages
+    share = max_chars // len(pages)
+    return [page[:share] for page in pages]
+
+
+def extract_sample_from_upload(
+    upload,
+    threshold: Optional[int] = None,
+    sample_size: Optional[int] = None,
+    max_chars: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Extract a bounded, representative view of a PDF upload for questionnaires.
+
+    Documents up to the page threshold are extracted in full (through the
+    text cache). Larger documents are opened lazily and only a stratified
+    sample of pages is extracted, unless the full text is already cached.
+    Either way the text is trimmed to a character budget, so prompt size and
+    extraction time do not grow with page count.
+
+    Args:
+        upload: SpooledUpload holding the PDF
+        threshold: Page count above which sampling kicks in (QUESTIONNAIRE_SAMPLE_THRESHOLD)
+        sample_size: Pages to sample (QUESTIONNAIRE_SAMPLE_PAGES)
+        max_chars: Character budget for the returned text (QUESTIONNAIRE_MAX_CHARS)
+
+    Returns:
+        Dict with 'text', 'page_count', 'sampled', 'sampled_pages' (1-based),
+        'cached' and 'normalization'
+    """
+    threshold = SAMPLE_PAGE_THRESHOLD if threshold is None else threshold
+    sample_size = SAMPLE_PAGES if sample_size is None else sample_size
+    max_chars = SAMPLE_MAX_CHARS if max_chars is None else max_chars
+    pdf_backend = get_backend()
+
+    entry = _read_cached_entry(upload, pdf_backend)
+    cached = entry is not None
+
+    if entry is None:
+        try:
+            with pdf_backend.open(upload.source) as document:
+                page_count = pdf_backend.page_count(document)
+                if page_count > threshold:
+                    section_starts = pdf_backend.outline_page_indices(document)
+                    indices = sample_page_indices(page_count, sample_size, section_starts)
+                    results = _extract_sequential(pdf_backend, document, indices, EXTRACT_TIMEOUT)
+                    pages = [text for _, text, _ in results]
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+
+        if page_count <= threshold:
+            # Small document: full extraction, which also fills the cache
+            entry, cached = _load_or_extract(upload, pdf_backend)
+
+    if entry is not None:
+        all_pages = _split_pages(entry['text'], entry['page_offsets'])
+        page_count = entry['page_count']
+        if page_count > threshold:
+            indices = sample_page_indices(len(all_pages), sample_size)
+        else:
+            indices = list(range(len(all_pages)))
+        pages = [all_pages[index] for index in indices]
+
+    if len(indices) < page_count:
+        logger.info(f"Sampled {len(indices)} of {page_count} pages for questionnaire")
+
+    text, normalization = _prepare_pages(_budget_pages(pages, max_chars), NORMALIZE_TEXT)
+
+    return {
+        'text': text,
+        'page_count': page_count,
+        'sampled': len(indices) < page_count,
+        'sampled_pages': [index + 1 for index in indices],
+        'cached': cached,
+        'normalization': normalization
+    }
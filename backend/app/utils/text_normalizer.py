@@ -0,0 +1,132 @@
+"""
+Text normalization for extracted PDF text.
+Removes running headers/footers, page numbers, hyphenated line breaks and
+redundant whitespace before the text is sent to the model.
+"""
+
+import re
+import math
+from collections import Counter
+from typing import Dict, Any, List
+
+# Lines considered for header/footer detection at each end of a page
+EDGE_LINES = 3
+# A line repeated on at least this share of pages is treated as a running header/footer
+REPEAT_PAGE_RATIO = 0.5
+# Documents with fewer pages than this are too short to detect repetition reliably
+MIN_PAGES_FOR_REPEATS = 3
+# Average characters per token for English text with the Gemini tokenizer
+CHARS_PER_TOKEN = 4
+
+_ROMAN = r'(?=[ivxlcdm])m{0,3}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})'
+_PAGE_NUMBER = re.compile(rf'^[-–\s]*(page\s*)?(\d{{1,5}}|{_ROMAN})(\s*(of|/)\s*\d{{1,5}})?[-–\s]*$', re.IGNORECASE)
+_DIGITS = re.compile(r'\d+')
+_HYPHENATED_BREAK = re.compile(r'(\w)-\n[ \t]*([a-z])')
+_INLINE_SPACE = re.compile(r'[ \t\u00a0\f\v]+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of prompt tokens for a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _line_key(line: str) -> str:
+    """Normalize a line so headers that differ only by page number compare equal."""
+    return _DIGITS.sub('#', _INLINE_SPACE.sub(' ', line.strip().lower()))
+
+
+def _edge_indices(lines: List[str]) -> List[int]:
+    """Indices of the first and last few non-empty lines of a page."""
+    non_empty = [i for i, line in enumerate(lines) if line.strip()]
+    # Short pages get a narrower edge zone so body text is never treated as a header
+    edge = min(EDGE_LINES, max(1, len(non_empty) // 4))
+    return sorted(set(non_empty[:edge] + non_empty[-edge:]))
+
+
+def _is_edge_noise(line: str, repeated: set) -> bool:
+    """Whether a line is a running header/footer or a bare page number."""
+    stripped = line.strip()
+    return _line_key(stripped) in repeated or bool(_PAGE_NUMBER.match(stripped))
+
+
+def _strip_edges(lines: List[str], repeated: set) -> List[str]:
+    """Peel header/footer noise off the top and bottom of a page."""
+    kept = list(lines)
+    for _ in range(2 * EDGE_LINES):
+        while kept and not kept[0].strip():
+            kept.pop(0)
+        while kept and not kept[-1].strip():
+            kept.pop()
+        if kept and _is_edge_noise(kept[0], repeated):
+            kept.pop(0)
+        elif kept and _is_edge_noise(kept[-1], repeated):
+            kept.pop()
+        else:
+            break
+    return kept
+
+
+def normalize_text(text: str) -> str:
+    """
+    Rejoin hyphenated line breaks and collapse whitespace.
+
+    Args:
+        text: Raw text
+
+    Returns:
+        Normalized text
+    """
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = _HYPHENATED_BREAK.sub(r'\1\2', text)
+    lines = [_INLINE_SPACE.sub(' ', line).strip() for line in text.split('\n')]
+    return _BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+
+def normalize_pages(pages: List[str]) -> Dict[str, Any]:
+    """
+    Normalize extracted pages into prompt-ready text.
+
+    Lines that appear at the top or bottom of many pages (running headers and
+    footers) and standalone page numbers are dropped, then hyphenated words
+    are rejoined and whitespace collapsed.
+
+    Args:
+        pages: Extracted text per page, in page order
+
+    Returns:
+        Dict with 'text' and 'stats' (characters and estimated tokens
+        before/after, removed line count)
+    """
+    raw_text = "\n".join(page for page in pages if page)
+    page_lines = [page.replace('\r\n', '\n').split('\n') for page in pages]
+
+    repeated = set()
+    content_pages = sum(1 for page in pages if page.strip())
+    if content_pages >= MIN_PAGES_FOR_REPEATS:
+        counts = Counter()
+        for lines in page_lines:
+            counts.update({_line_key(lines[i]) for i in _edge_indices(lines)})
+        threshold = max(2, math.ceil(content_pages * REPEAT_PAGE_RATIO))
+        repeated = {key for key, count in counts.items() if count >= threshold and key}
+
+    removed_lines = 0
+    cleaned_pages = []
+    for lines in page_lines:
+        kept = _strip_edges(lines, repeated)
+        removed_lines += sum(1 for line in lines if line.strip()) - sum(1 for line in kept if line.strip())
+        if kept:
+            cleaned_pages.append("\n".join(kept))
+
+    text = normalize_text("\n".join(cleaned_pages))
+
+    return {
+        'text': text,
+        'stats': {
+            'chars_before': len(raw_text),
+            'chars_after': len(text),
+            'tokens_before': estimate_tokens(raw_text),
+            'tokens_after': estimate_tokens(text),
+            'removed_lines': removed_lines
+        }
+    }
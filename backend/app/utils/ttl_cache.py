@@ -0,0 +1,100 @@
+"""
+In-memory TTL cache.
+Stores values with a per-entry time to live and evicts least recently used
+entries once the entry limit is reached.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Thread-safe, entry-bounded cache whose entries expire after a TTL.
+
+    Expired entries are dropped lazily on lookup, or evicted first when the
+    cache is full.
+    """
+
+    def __init__(self, max_entries: int):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Largest number of entries kept at once
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a live value and mark it as recently used.
+
+        Returns:
+            Cached value or None on a miss or expired entry
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        """Store a value for ttl seconds (a ttl of 0 or less stores nothing)."""
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires_at, value)
+            self._evict()
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove an entry; returns whether one was present."""
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+            if removed:
+                self.invalidations += 1
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones, until within the limit (lock must be held)."""
+        if len(self._entries) <= self.max_entries:
+            return
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': (self.hits / lookups) if lookups else 0.0
+            }
@@ -0,0 +1,181 @@
+"""
+Upload spooling utilities.
+Streams uploaded files into a bounded spool instead of reading them into memory.
+"""
+
+import io
+import os
+import hashlib
+import logging
+import tempfile
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_SPOOL_MEMORY_BYTES = int(os.getenv("UPLOAD_SPOOL_MEMORY_BYTES", str(2 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# PDF files must start with this marker within the first kilobyte
+PDF_MAGIC = b"%PDF-"
+PDF_MAGIC_WINDOW = 1024
+
+
+class UploadRejectedError(ValueError):
+    """Raised when an upload is rejected before it is fully processed."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SpooledUpload:
+    """
+    Upload content held in memory while small and rolled over to a named
+    temporary file once it grows past the spool threshold.
+
+    The on-disk file has a path, so extraction can memory-map it and worker
+    processes can open it themselves instead of receiving a copy of the bytes.
+    A SHA-256 digest is computed as chunks arrive, so content can be looked
+    up in caches without a second pass over the file.
+    """
+
+    def __init__(self, filename: Optional[str] = None, spool_memory_bytes: Optional[int] = None):
+        self.filename = filename
+        self.spool_memory_bytes = UPLOAD_SPOOL_MEMORY_BYTES if spool_memory_bytes is None else spool_memory_bytes
+        self.size = 0
+        self.path: Optional[str] = None
+        self._buffer: Optional[io.BytesIO] = io.BytesIO()
+        # In-memory content as bytes, copied out of the buffer once
+        self._content: Optional[bytes] = None
+        self._file = None
+        self._digest = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        """Hex SHA-256 digest of the content written so far."""
+        return self._digest.hexdigest()
+
+    @property
+    def in_memory(self) -> bool:
+        """Whether the content is still held in memory."""
+        return self._buffer is not None
+
+    def write(self, chunk: bytes):
+        """Append a chunk, rolling over to disk when the spool threshold is crossed."""
+        if self._buffer is not None and self.size + len(chunk) > self.spool_memory_bytes:
+            self._rollover()
+        if self._buffer is not None:
+            self._buffer.write(chunk)
+            self._content = None
+        else:
+            self._file.write(chunk)
+        self._digest.update(chunk)
+        self.size += len(chunk)
+
+    def _rollover(self):
+        """Move buffered content into a named temporary file."""
+        self._file = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".spool", delete=False)
+        self.path = self._file.name
+        self._file.write(self._buffer.getbuffer())
+        self._buffer = None
+        logger.debug(f"Upload spooled to disk: {self.path}")
+
+    def finish(self):
+        """Flush pending writes so the content can be read back."""
+        if self._file is not None:
+            self._file.flush()
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """Content for extraction: a file path when on disk, otherwise the bytes."""
+        if self._buffer is not None:
+            return self._memory_content()
+        return self.path
+
+    def _memory_content(self) -> bytes:
+        if self._content is None:
+            self._content = self._buffer.getvalue()
+        return self._content
+
+    def read_bytes(self) -> bytes:
+        """Read the whole content (for small text uploads)."""
+        if self._buffer is not None:
+            return self._memory_content()
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def close(self):
+        """Release the buffer and delete the spool file."""
+        self._buffer = None
+        self._content = None
+        if self._file is not None:
+            try:
+                self._file.close()
+                if os.path.exists(self.path):
+                    os.unlink(self.path)
+            except Exception as e:
+                logger.warning(f"Failed to cleanup upload spool {self.path}: {e}")
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+async def spool_upload(
+    file,
+    max_bytes: Optional[int] = None,
+    require_pdf: bool = False,
+    spool_memory_bytes: Optional[int] = None
+) -> SpooledUpload:
+    """
+    Stream an UploadFile into a SpooledUpload in fixed-size chunks.
+
+    Args:
+        file: FastAPI UploadFile
+        max_bytes: Maximum accepted size (defaults to MAX_UPLOAD_BYTES)
+        require_pdf: Reject content that does not carry the PDF magic bytes
+        spool_memory_bytes: Size above which content rolls over to disk
+            (defaults to UPLOAD_SPOOL_MEMORY_BYTES)
+
+    Returns:
+        SpooledUpload positioned for reading
+
+    Raises:
+        UploadRejectedError: If the upload is too large or not a PDF
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+
+    if file.size is not None and file.size > max_bytes:
+        raise UploadRejectedError(
+            f"File too large: {file.size} bytes (maximum {max_bytes} bytes)", status_code=413
+        )
+
+    upload = SpooledUpload(filename=file.filename, spool_memory_bytes=spool_memory_bytes)
+    head = b""
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            if upload.size + len(chunk) > max_bytes:
+                raise UploadRejectedError(
+                    f"File too large: exceeds maximum of {max_bytes} bytes", status_code=413
+                )
+            if require_pdf and len(head) < PDF_MAGIC_WINDOW:
+                head += chunk[:PDF_MAGIC_WINDOW - len(head)]
+                if len(head) >= PDF_MAGIC_WINDOW and PDF_MAGIC not in head:
+                    raise UploadRejectedError("Uploaded file is not a valid PDF", status_code=415)
+            upload.write(chunk)
+
+        if require_pdf and PDF_MAGIC not in head:
+            raise UploadRejectedError("Uploaded file is not a valid PDF", status_code=415)
+
+        upload.finish()
+        return upload
+    except Exception:
+        upload.close()
+        raise
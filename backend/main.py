@@ -1,20 +1,30 @@
 from fastapi import FastAPI, Request, HTTPException, Depends, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
 import os
 import json
+import asyncio
 import tempfile
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from app.services.gemini_service import generate_questionnaire, generate_study_materials
-from app.utils.pdf_utils import extract_text_from_pdf
+from app.utils.pdf_utils import extract_text_from_upload, extract_sample_from_upload
+from app.utils.upload_utils import spool_upload, UploadRejectedError, MAX_UPLOAD_BYTES
+from app.utils.http_ranges import etag_matches, parse_byte_range, RangeNotSatisfiable
 from app.routes import proctor
 
 # Import certificate pipeline lazily to avoid errors if dependencies are missing
 try:
     from app.services.certificate_pipeline import CertificatePipeline
+    from app.services.certificate_generator import get_render_cache
+    from app.services.issuance_queue import IssuanceQueue, IssuanceWorkerPool, ISSUANCE_WORKERS
+    from app.services.chain_index import CertEventIndex, CertEventIndexer, CHAIN_INDEX_ENABLED
+    from app.services.issuance_sweeper import IssuanceSweeper, RESUME_SWEEP_ENABLED
+    from app.services.render_pool import RenderPool, RENDER_WORKERS
     CERTIFICATE_PIPELINE_AVAILABLE = True
 except ImportError as e:
     CERTIFICATE_PIPELINE_AVAILABLE = False
@@ -23,6 +33,9 @@ except ImportError as e:
 # Load environment variables
 load_dotenv()
 
+# Seconds between background probes of the blockchain and database connections
+SERVICE_HEALTH_INTERVAL = float(os.getenv("SERVICE_HEALTH_INTERVAL", "60"))
+
 # Request models
 class LessonData(BaseModel):
     name: str
@@ -74,12 +87,98 @@ class TextStudyMaterialsRequest(BaseModel):
     description: str
     user_responses: List[UserResponse]
 
+async def refresh_service_health(app: FastAPI):
+    """Probe the certificate services periodically so broken clients are rebuilt."""
+    while True:
+        try:
+            app.state.service_health = await app.state.pipeline.check_health()
+        except Exception as e:
+            print(f"Warning: Service health check failed: {e}")
+        await asyncio.sleep(SERVICE_HEALTH_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build the certificate services once for the lifetime of the application.
+    The pipeline (and its Web3 and Supabase clients) is shared by all
+    requests and the issuance workers; unfinished queued jobs resume after
+    restart.
+    """
+    app.state.pipeline = None
+    app.state.service_health = {}
+    app.state.issuance_queue = None
+    app.state.issuance_workers = None
+    app.state.chain_indexer = None
+    app.state.issuance_sweeper = None
+    app.state.render_pool = None
+    health_task = None
+    
+    if CERTIFICATE_PIPELINE_AVAILABLE:
+        try:
+            app.state.pipeline = CertificatePipeline()
+        except Exception as e:
+            print(f"Warning: Certificate pipeline not configured: {e}")
+    
+    pipeline = app.state.pipeline
+    if pipeline is not None:
+        health_task = asyncio.create_task(refresh_service_health(app))
+        if RENDER_WORKERS > 0:
+            try:
+                # Certificate and proof PDFs render in worker processes, in parallel across cores
+                app.state.render_pool = RenderPool(renderer=pipeline.cert_generator.renderer)
+                pipeline.cert_generator.render_pool = app.state.render_pool
+                pipeline.proof_generator.render_pool = app.state.render_pool
+            except Exception as e:
+                print(f"Warning: Render pool not available: {e}")
+        try:
+            # Share the pipeline's serial counter so queued and direct issuance never collide
+            app.state.issuance_queue = IssuanceQueue(cert_id_factory=pipeline.cert_generator.generate_cert_id)
+        except Exception as e:
+            print(f"Warning: Issuance queue not available: {e}")
+        if app.state.issuance_queue is not None and ISSUANCE_WORKERS > 0:
+            app.state.issuance_workers = IssuanceWorkerPool(app.state.issuance_queue, lambda: pipeline)
+            app.state.issuance_workers.start()
+        if CHAIN_INDEX_ENABLED:
+            try:
+                # Verification reads CertStored events from the local index before the contract
+                pipeline.chain_index = CertEventIndex()
+                app.state.chain_indexer = CertEventIndexer(pipeline.chain_index, lambda: pipeline.blockchain)
+                app.state.chain_indexer.start()
+            except Exception as e:
+                print(f"Warning: CertStored index not available: {e}")
+        if RESUME_SWEEP_ENABLED:
+            app.state.issuance_sweeper = IssuanceSweeper(pipeline)
+            app.state.issuance_sweeper.start()
+    
+    try:
+        yield
+    finally:
+        if health_task is not None:
+            health_task.cancel()
+            await asyncio.gather(health_task, return_exceptions=True)
+        if app.state.issuance_workers is not None:
+            await app.state.issuance_workers.stop()
+        if app.state.chain_indexer is not None:
+            await app.state.chain_indexer.stop()
+        if app.state.issuance_sweeper is not None:
+            await app.state.issuance_sweeper.stop()
+        if pipeline is not None and pipeline.anchor_batcher is not None:
+            # Certificates waiting for their batch window are anchored now rather than lost
+            await run_in_threadpool(pipeline.anchor_batcher.flush)
+        if app.state.render_pool is not None:
+            await run_in_threadpool(app.state.render_pool.shutdown)
+
 app = FastAPI(
     title="Prince's FastAPI Backend",
     description="FastAPI backend for Prince's application with AI-powered study materials",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
+def get_pipeline(request: Request) -> Optional["CertificatePipeline"]:
+    """The application-wide certificate pipeline, or None if it is not available."""
+    return getattr(request.app.state, "pipeline", None)
+
 # CORS middleware configuration
 app.add_middleware(
     CORSMiddleware,
@@ -92,6 +191,35 @@ app.add_middleware(
 # Include routers
 app.include_router(proctor.router)
 
+# Upload endpoints that are guarded by the request size limit
+UPLOAD_PATHS = {"/api/generate-questionnaire", "/api/generate-study-materials"}
+# Allowance for multipart boundaries and the other form fields
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Reject uploads by Content-Length before the multipart body is parsed."""
+    if request.method == "POST" and request.url.path in UPLOAD_PATHS:
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"File too large: maximum upload size is {MAX_UPLOAD_BYTES} bytes"}
+            )
+    return await call_next(request)
+
+def print_normalization_stats(extraction: Dict[str, Any]):
+    """Log text normalization savings for an extracted PDF."""
+    if extraction.get('cached'):
+        print("Reused cached PDF text")
+    stats = extraction.get('normalization')
+    if stats:
+        print(
+            f"Normalized text: {stats['chars_before']} -> {stats['chars_after']} chars, "
+            f"~{stats['tokens_before']} -> ~{stats['tokens_after']} tokens "
+            f"({stats['removed_lines']} header/footer lines removed)"
+        )
+
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -102,12 +230,13 @@ async def root():
     }
 
 @app.get("/api/health")
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint"""
     return {
         "status": "healthy",
         "service": "gemini-study-materials",
-        "version": "2.0.0"
+        "version": "2.0.0",
+        "certificate_services": getattr(request.app.state, "service_health", {})
     }
 
 @app.post("/api/generate-questionnaire")
@@ -127,20 +256,30 @@ async def generate_questionnaire_endpoint(
         print(f"File: {file.filename} ({file.content_type})")
         
         lesson_content = ""
+        is_excerpt = False
         
         # Process file upload
         try:
             if file.filename.endswith('.pdf') or (file.content_type and 'pdf' in file.content_type):
-                # Read the PDF file
-                file_content = await file.read()
-                print(f"Read {len(file_content)} bytes from PDF")
-                lesson_content = extract_text_from_pdf(file_content)
+                # Stream the PDF into a spool and extract from it
+                with await spool_upload(file, require_pdf=True) as upload:
+                    print(f"Read {upload.size} bytes from PDF")
+                    extraction = await run_in_threadpool(extract_sample_from_upload, upload)
+                lesson_content = extraction['text']
+                is_excerpt = extraction['sampled']
+                if is_excerpt:
+                    print(f"Sampled pages {extraction['sampled_pages']} of {extraction['page_count']}")
                 print(f"Extracted {len(lesson_content)} characters from PDF")
+                print_normalization_stats(extraction)
             else:
                 # Read as text file
-                lesson_content = (await file.read()).decode('utf-8')
+                with await spool_upload(file) as upload:
+                    lesson_content = upload.read_bytes().decode('utf-8')
                 print(f"Read {len(lesson_content)} characters from text file")
                 
+        except UploadRejectedError as e:
+            print(f"✗ Upload rejected: {str(e)}")
+            raise HTTPException(status_code=e.status_code, detail=str(e))
         except Exception as e:
             print(f"✗ Error processing file: {str(e)}")
             raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
@@ -149,7 +288,7 @@ async def generate_questionnaire_endpoint(
             raise HTTPException(status_code=400, detail="The uploaded file appears to be empty")
         
         # Generate questionnaire
-        questions = generate_questionnaire(lesson_name, lesson_content)
+        questions = generate_questionnaire(lesson_name, lesson_content, is_excerpt=is_excerpt)
         print(f"✓ Generated {len(questions)} questions successfully")
         
         return JSONResponse(content={"questions": questions})
@@ -207,20 +346,28 @@ async def generate_study_materials_endpoint(
         file_extension = file.filename.split('.')[-1].lower()
         content = ""
         
-        if file_extension == 'pdf':
-            file_content = await file.read()
-            print(f"Read {len(file_content)} bytes from PDF")
-            content = extract_text_from_pdf(file_content)
-            print(f"Extracted {len(content)} characters from PDF")
-        elif file_extension in ['txt', 'md']:
-            content = (await file.read()).decode('utf-8')
-            print(f"Read {len(content)} characters from text file")
-        else:
+        if file_extension not in ['pdf', 'txt', 'md']:
             raise HTTPException(
                 status_code=400,
                 detail=f"Unsupported file type: .{file_extension}. Please upload a PDF, TXT, or MD file."
             )
         
+        try:
+            if file_extension == 'pdf':
+                with await spool_upload(file, require_pdf=True) as upload:
+                    print(f"Read {upload.size} bytes from PDF")
+                    extraction = await run_in_threadpool(extract_text_from_upload, upload)
+                content = extraction['text']
+                print(f"Extracted {len(content)} characters from PDF")
+                print_normalization_stats(extraction)
+            else:
+                with await spool_upload(file) as upload:
+                    content = upload.read_bytes().decode('utf-8')
+                print(f"Read {len(content)} characters from text file")
+        except UploadRejectedError as e:
+            print(f"✗ Upload rejected: {str(e)}")
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        
         if not content.strip():
             raise HTTPException(
                 status_code=400,
@@ -290,7 +437,10 @@ class IssueCertificateRequest(BaseModel):
         populate_by_name = True
 
 @app.post("/internal/issue-certificate")
-async def issue_certificate_endpoint(request: IssueCertificateRequest):
+async def issue_certificate_endpoint(
+    request: IssueCertificateRequest,
+    pipeline: Optional["CertificatePipeline"] = Depends(get_pipeline)
+):
     """
     Internal endpoint for issuing certificates.
     Called by course completion worker/event handler.
@@ -301,12 +451,10 @@ async def issue_certificate_endpoint(request: IssueCertificateRequest):
                 status_code=503,
                 detail="Certificate service not available. Please install dependencies: pip install -r requirements.txt"
             )
-        try:
-            pipeline = CertificatePipeline()
-        except Exception as init_error:
+        if pipeline is None:
             raise HTTPException(
                 status_code=503,
-                detail=f"Certificate service not configured. Please configure environment variables. Error: {str(init_error)}"
+                detail="Certificate service not configured. Please configure environment variables."
             )
         
         # Get user and course info (in production, fetch from database)
@@ -342,6 +490,12 @@ async def issue_certificate_endpoint(request: IssueCertificateRequest):
                 status_code=200,
                 content=result
             )
+        elif result.get('status') == 'in_progress':
+            # Another worker is still issuing this certificate; safe to retry
+            return JSONResponse(
+                status_code=409,
+                content=result
+            )
         else:
             return JSONResponse(
                 status_code=500,
@@ -358,8 +512,177 @@ async def issue_certificate_endpoint(request: IssueCertificateRequest):
             detail=f"Failed to issue certificate: {str(e)}"
         )
 
+# Largest cohort accepted by one bulk issuance request
+BULK_ISSUE_MAX_LEARNERS = int(os.getenv("BULK_ISSUE_MAX_LEARNERS", "5000"))
+
+class CohortLearner(BaseModel):
+    userId: str = Field(..., alias='userId')
+    learnerName: str = Field(..., alias='learnerName')
+    grade: str
+    email: Optional[str] = None
+    durationHours: Optional[float] = Field(default=None, alias='durationHours')
+    modules: Optional[int] = None
+    metadata: Optional[Dict[str, Any]] = None
+    ownerAddress: Optional[str] = Field(default=None, alias='ownerAddress')
+    
+    class Config:
+        populate_by_name = True
+
+class BulkIssueCertificatesRequest(BaseModel):
+    courseId: str = Field(..., alias='courseId')
+    courseName: str = Field(..., alias='courseName')
+    durationHours: float = Field(default=0.0, alias='durationHours')
+    modules: int = Field(default=0)
+    learners: List[CohortLearner]
+    
+    class Config:
+        populate_by_name = True
+
+@app.post("/internal/issue-certificates/bulk")
+async def issue_certificates_bulk_endpoint(
+    request: BulkIssueCertificatesRequest,
+    pipeline: Optional["CertificatePipeline"] = Depends(get_pipeline)
+):
+    """
+    Internal endpoint for issuing certificates to a whole cohort.
+    Returns a per-learner report; learners that already hold a certificate
+    for the course are reported as already_issued.
+    """
+    if not CERTIFICATE_PIPELINE_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="Certificate service not available. Please install dependencies: pip install -r requirements.txt"
+        )
+    if pipeline is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Certificate service not configured. Please configure environment variables."
+        )
+    if not request.learners:
+        raise HTTPException(status_code=400, detail="No learners provided")
+    if len(request.learners) > BULK_ISSUE_MAX_LEARNERS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many learners: {len(request.learners)} (maximum {BULK_ISSUE_MAX_LEARNERS} per request)"
+        )
+    
+    learners = []
+    for learner in request.learners:
+        entry = {
+            'user_id': learner.userId,
+            'learner_name': learner.learnerName,
+            'grade': learner.grade,
+            'email': learner.email,
+            'metadata': learner.metadata,
+            'owner_address': learner.ownerAddress
+        }
+        if learner.durationHours is not None:
+            entry['duration_hours'] = learner.durationHours
+        if learner.modules is not None:
+            entry['modules'] = learner.modules
+        learners.append(entry)
+    
+    try:
+        report = await pipeline.issue_cohort(
+            course_id=request.courseId,
+            course_name=request.courseName,
+            learners=learners,
+            duration_hours=request.durationHours,
+            modules=request.modules
+        )
+        return JSONResponse(content=report)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to issue certificates: {str(e)}"
+        )
+
+@app.post("/internal/issue-certificate-async", status_code=202)
+async def issue_certificate_async_endpoint(
+    request: IssueCertificateRequest,
+    http_request: Request,
+    pipeline: Optional["CertificatePipeline"] = Depends(get_pipeline)
+):
+    """
+    Internal endpoint for queued certificate issuance.
+    Records the request and returns the assigned cert_id immediately
+    (the learner's existing certificate, if one is issued or resumable);
+    poll the status URL for the outcome.
+    """
+    issuance_queue = getattr(http_request.app.state, "issuance_queue", None)
+    issuance_workers = getattr(http_request.app.state, "issuance_workers", None)
+    if issuance_queue is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Certificate issuance queue not available"
+        )
+    
+    payload = {
+        'user_id': request.userId,
+        'course_id': request.courseId,
+        'course_name': request.courseName or "Course",
+        'learner_name': request.learnerName or "Learner",
+        'grade': request.grade,
+        'duration_hours': request.durationHours,
+        'modules': request.modules,
+        'metadata': request.metadata,
+        'owner_address': request.ownerAddress
+    }
+    
+    # Reuse an issued or resumable certificate's ID rather than allocating one it would never get
+    cert_id = None
+    if pipeline is not None:
+        cert_id = await pipeline.current_cert_id(request.userId, request.courseId)
+    
+    try:
+        job = await run_in_threadpool(issuance_queue.enqueue, payload, cert_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to queue certificate issuance: {str(e)}"
+        )
+    
+    if issuance_workers is not None:
+        issuance_workers.notify()
+    
+    return JSONResponse(
+        status_code=202,
+        content={
+            'status': job['status'],
+            'cert_id': job['cert_id'],
+            'status_url': f"/internal/issue-certificate-async/{job['cert_id']}"
+        }
+    )
+
+@app.get("/internal/issue-certificate-async/{cert_id}")
+async def issuance_status_endpoint(cert_id: str, request: Request):
+    """
+    Internal endpoint for polling a queued issuance.
+    Status is one of queued, running, issued or failed; issued jobs
+    include the pipeline result.
+    """
+    issuance_queue = getattr(request.app.state, "issuance_queue", None)
+    if issuance_queue is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Certificate issuance queue not available"
+        )
+    
+    job = await run_in_threadpool(issuance_queue.get, cert_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No issuance job for {cert_id}"
+        )
+    return JSONResponse(content=job)
+
 @app.get("/api/verify")
-async def verify_certificate_endpoint(certId: str):
+async def verify_certificate_endpoint(
+    certId: str,
+    pipeline: Optional["CertificatePipeline"] = Depends(get_pipeline)
+):
     """
     Public endpoint for verifying certificates.
     Returns verification status and details.
@@ -371,13 +694,11 @@ async def verify_certificate_endpoint(certId: str):
                 "status": "service_unavailable",
                 "message": "Verification service not available. Please install dependencies."
             })
-        try:
-            pipeline = CertificatePipeline()
-        except Exception as init_error:
+        if pipeline is None:
             return JSONResponse(content={
                 "verified": False,
                 "status": "service_unavailable",
-                "message": f"Verification service not configured. Error: {str(init_error)}"
+                "message": "Verification service not configured."
             })
         
         result = await pipeline.verify_certificate(certId)
@@ -393,17 +714,133 @@ async def verify_certificate_endpoint(certId: str):
             "message": str(e)
         })
 
+# Largest number of certificate IDs accepted by one batch verification request
+VERIFY_BATCH_MAX_IDS = int(os.getenv("VERIFY_BATCH_MAX_IDS", "1000"))
+
+class BatchVerifyRequest(BaseModel):
+    certIds: List[str] = Field(..., alias='certIds')
+    
+    class Config:
+        populate_by_name = True
+
+@app.post("/api/verify/batch")
+async def verify_certificates_batch_endpoint(
+    request: BatchVerifyRequest,
+    pipeline: Optional["CertificatePipeline"] = Depends(get_pipeline)
+):
+    """
+    Public endpoint for verifying many certificates at once.
+    Returns one result per certificate ID, in the same shape as /api/verify.
+    """
+    if not request.certIds:
+        raise HTTPException(status_code=400, detail="No certificate IDs provided")
+    if len(request.certIds) > VERIFY_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many certificate IDs: {len(request.certIds)} (maximum {VERIFY_BATCH_MAX_IDS} per request)"
+        )
+    if not CERTIFICATE_PIPELINE_AVAILABLE or pipeline is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Verification service not available. Please configure the certificate service."
+        )
+    
+    try:
+        results = await pipeline.verify_certificates(request.certIds)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to verify certificates: {str(e)}"
+        )
+    
+    return JSONResponse(content={
+        "summary": {
+            "total": len(results),
+            "verified": sum(1 for result in results.values() if result.get('verified'))
+        },
+        "results": results
+    })
+
+# Cache lifetime of downloaded certificate PDFs (content is addressed by CID, so it never changes)
+CERT_DOWNLOAD_MAX_AGE = int(os.getenv("CERT_DOWNLOAD_MAX_AGE", str(365 * 24 * 3600)))
+
+@app.api_route("/api/certificates/{cert_id}/pdf", methods=["GET", "HEAD"])
+async def download_certificate_endpoint(
+    cert_id: str,
+    request: Request,
+    pipeline: Optional["CertificatePipeline"] = Depends(get_pipeline)
+):
+    """
+    Public endpoint serving a certificate PDF directly, without an IPFS gateway.
+    The strong ETag is the document CID; supports If-None-Match (304) and
+    single byte ranges (206), so a CDN can cache and split the responses.
+    """
+    if not CERTIFICATE_PIPELINE_AVAILABLE or pipeline is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Certificate service not available. Please configure the certificate service."
+        )
+    
+    try:
+        document = await pipeline.find_certificate_document(cert_id)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Certificate lookup failed: {str(e)}")
+    if document['status'] == 'not_found':
+        raise HTTPException(status_code=404, detail="Certificate not found")
+    if document['status'] == 'revoked':
+        raise HTTPException(status_code=410, detail="Certificate has been revoked")
+    
+    etag = f'"{document["cid_doc"]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={CERT_DOWNLOAD_MAX_AGE}, immutable",
+        "Accept-Ranges": "bytes"
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    loaded = await pipeline.load_certificate_document(document['record'])
+    if loaded is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Certificate document is temporarily unavailable",
+            headers={"Retry-After": "30"}
+        )
+    content = loaded['content']
+    headers["Content-Disposition"] = f'inline; filename="{cert_id}.pdf"'
+    headers["X-Certificate-Source"] = loaded['source']
+    
+    # A Range for an older version of the document (If-Range mismatch) gets the whole document
+    if_range = request.headers.get("if-range")
+    try:
+        byte_range = parse_byte_range(request.headers.get("range"), len(content)) if not if_range or if_range == etag else None
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(content)}"})
+    if byte_range is None:
+        return Response(content=content, media_type="application/pdf", headers=headers)
+    first, last = byte_range
+    headers["Content-Range"] = f"bytes {first}-{last}/{len(content)}"
+    return Response(content=content[first:last + 1], status_code=206, media_type="application/pdf", headers=headers)
+
 @app.post("/internal/revoke-certificate")
-async def revoke_certificate_endpoint(certId: str, reason: Optional[str] = None):
+async def revoke_certificate_endpoint(
+    certId: str,
+    reason: Optional[str] = None,
+    pipeline: Optional["CertificatePipeline"] = Depends(get_pipeline)
+):
     """
     Internal endpoint for revoking certificates.
     Marks certificate as revoked in database.
     """
     try:
-        from app.services.db_service import DatabaseService
-        db = DatabaseService()
-        
-        success = await db.revoke_certificate(certId, reason)
+        if pipeline is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Certificate service not configured. Please configure environment variables."
+            )
+        success = await pipeline.revoke_certificate(certId, reason)
         
         if success:
             return JSONResponse(content={
@@ -426,6 +863,59 @@ async def revoke_certificate_endpoint(certId: str, reason: Optional[str] = None)
             detail=f"Failed to revoke certificate: {str(e)}"
         )
 
+@app.post("/internal/resume-certificate")
+async def resume_certificate_endpoint(
+    certId: str,
+    pipeline: Optional["CertificatePipeline"] = Depends(get_pipeline)
+):
+    """
+    Internal endpoint for resuming a failed issuance.
+    Continues from the last checkpointed stage, keeping the cert_id.
+    """
+    if pipeline is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Certificate service not configured. Please configure environment variables."
+        )
+    
+    result = await pipeline.resume_certificate(certId)
+    if result.get('status') == 'already_issued':
+        result['status'] = 'success'
+    status_codes = {'success': 200, 'in_progress': 409}
+    return JSONResponse(
+        status_code=status_codes.get(result.get('status'), 500),
+        content=result
+    )
+
+@app.get("/internal/metrics")
+async def metrics_endpoint(
+    request: Request,
+    pipeline: Optional["CertificatePipeline"] = Depends(get_pipeline)
+):
+    """
+    Internal endpoint for cache and service metrics.
+    Reports verification and render cache hit ratios, render pool queue
+    depth, Merkle anchor batches, the certificate artifact store, CertStored
+    index sync position and the latest service probes.
+    """
+    if pipeline is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Certificate service not configured. Please configure environment variables."
+        )
+    state = request.app.state
+    chain_indexer = getattr(state, "chain_indexer", None)
+    render_cache = get_render_cache()
+    return JSONResponse(content={
+        "verification_cache": pipeline.verification_cache.stats(),
+        "render_cache": render_cache.stats() if render_cache is not None else None,
+        "render_pool": state.render_pool.stats() if state.render_pool is not None else None,
+        "anchor_batches": pipeline.anchor_batcher.stats() if pipeline.anchor_batcher is not None else None,
+        "artifact_cache": await run_in_threadpool(pipeline.artifacts.stats),
+        "chain_index": await run_in_threadpool(chain_indexer.stats) if chain_indexer is not None else None,
+        "service_health": getattr(state, "service_health", {})
+    })
+
 # Global error handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
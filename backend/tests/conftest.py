@@ -0,0 +1,54 @@
+"""
+Shared test fixtures.
+"""
+
+import pytest
+from app.services import artifact_store, certificate_generator, serial_allocator, tracing
+from app.services.tracing import SpanExporter
+from app.utils.disk_cache import DiskLRUCache
+
+
+class CollectingExporter(SpanExporter):
+    """Keeps finished spans in memory."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, finished):
+        self.spans.append(finished)
+
+    def by_name(self, name):
+        return next(s for s in self.spans if s.name == name)
+
+
+@pytest.fixture
+def exporter():
+    """Collect spans exported during a test."""
+    collector = CollectingExporter()
+    tracing.set_exporter(collector)
+    yield collector
+    tracing.set_exporter(None)
+
+
+@pytest.fixture(autouse=True)
+def render_cache(tmp_path, monkeypatch):
+    """Keep rendered certificates in a per-test cache instead of .cache/."""
+    cache = DiskLRUCache(str(tmp_path / "certificates"), 64 * 1024 * 1024, suffix=".pdf")
+    monkeypatch.setattr(certificate_generator, "_render_cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def serial_file(tmp_path, monkeypatch):
+    """Allocate certificate serials from a per-test counter file."""
+    path = tmp_path / "cert_serial"
+    monkeypatch.setattr(serial_allocator, "CERT_SERIAL_FILE", str(path))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def artifact_dir(tmp_path, monkeypatch):
+    """Store certificate artifacts in a per-test directory instead of .cache/."""
+    path = tmp_path / "artifacts"
+    monkeypatch.setattr(artifact_store, "ARTIFACT_CACHE_DIR", str(path))
+    return path
@@ -0,0 +1,92 @@
+"""
+Tests for Merkle trees and batched on-chain anchoring.
+"""
+
+import threading
+import pytest
+from unittest.mock import Mock
+from app.services.anchor_batcher import AnchorBatcher
+from app.utils.merkle import build_tree, inclusion_proof, leaf_hash, verify_proof, from_hex
+
+
+class TestMerkleTree:
+    """Test roots and inclusion proofs for every batch shape."""
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 13])
+    def test_every_leaf_proves_inclusion(self, size):
+        """Each leaf's proof leads to the root; a different leaf's does not."""
+        leaves = [leaf_hash(f"LEARNOVA-2025-{i:06d}", f"QmDoc{i}") for i in range(size)]
+        levels = build_tree(leaves)
+        root = levels[-1][0]
+
+        for index, leaf in enumerate(leaves):
+            assert verify_proof(leaf, inclusion_proof(levels, index), root)
+        assert not verify_proof(leaf_hash("LEARNOVA-2025-000000", "QmForged"), inclusion_proof(levels, 0), root)
+
+    def test_single_leaf_is_root(self):
+        """A batch of one anchors the leaf itself, with an empty proof."""
+        leaf = leaf_hash("LEARNOVA-2025-000001", "QmDoc")
+
+        assert build_tree([leaf])[-1] == [leaf]
+        assert inclusion_proof(build_tree([leaf]), 0) == []
+
+
+class TestAnchorBatcher:
+    """Test batches close on size or window, and failures reach every waiter."""
+
+    def submit_all(self, batcher, count):
+        results = [None] * count
+
+        def submit(index):
+            try:
+                results[index] = batcher.submit(f"LEARNOVA-2025-{index:06d}", f"QmDoc{index}").result(timeout=10)
+            except Exception as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=submit, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        return results
+
+    def test_full_batch_anchors_one_root(self):
+        """Certificates filling a batch share one transaction and get valid proofs."""
+        blockchain = Mock()
+        blockchain.store_merkle_root.return_value = {'tx_hash': '0xbatch', 'status': 'confirmed'}
+        batcher = AnchorBatcher(lambda: blockchain, window_seconds=30, max_size=4)
+
+        results = self.submit_all(batcher, 4)
+
+        blockchain.store_merkle_root.assert_called_once()
+        root, size = blockchain.store_merkle_root.call_args.args
+        assert size == 4
+        for index, result in enumerate(results):
+            assert result['tx_hash'] == '0xbatch'
+            assert result['root'] == root
+            leaf = leaf_hash(f"LEARNOVA-2025-{index:06d}", f"QmDoc{index}")
+            assert verify_proof(leaf, [from_hex(node) for node in result['proof']], from_hex(root))
+        assert batcher.stats() == {'batches': 1, 'anchored': 4, 'failed': 0, 'pending': 0, 'avg_batch_size': 4.0}
+
+    def test_window_closes_partial_batch(self):
+        """A batch that never fills is anchored once the window passes."""
+        blockchain = Mock()
+        blockchain.store_merkle_root.return_value = {'tx_hash': '0xpartial', 'status': 'confirmed'}
+        batcher = AnchorBatcher(lambda: blockchain, window_seconds=0.05, max_size=100)
+
+        results = self.submit_all(batcher, 3)
+
+        blockchain.store_merkle_root.assert_called_once()
+        assert sorted(result['index'] for result in results) == [0, 1, 2]
+        assert all(result['size'] == 3 for result in results)
+
+    def test_failed_anchor_fails_whole_batch(self):
+        """Every certificate of a batch whose transaction fails gets the error."""
+        blockchain = Mock()
+        blockchain.store_merkle_root.side_effect = Exception("Failed to store certificate on-chain: out of gas")
+        batcher = AnchorBatcher(lambda: blockchain, window_seconds=30, max_size=2)
+
+        results = self.submit_all(batcher, 2)
+
+        assert all(isinstance(result, Exception) for result in results)
+        assert batcher.stats()['failed'] == 2
@@ -3,13 +3,21 @@ Unit and integration tests for certificate issuance pipeline.
 """
 
 import pytest
+import asyncio
 import os
+import threading
 import tempfile
 from unittest.mock import Mock, patch, AsyncMock
 from datetime import datetime
 from app.services.certificate_pipeline import CertificatePipeline
 from app.services.certificate_generator import CertificateGenerator
 from app.services.proof_generator import ProofGenerator
+from app.utils.ipfs_cid import compute_cid
+
+
+def pin_as_computed(content, file_name, cid=None):
+    """Pinata stand-in that pins content under its locally computed CID."""
+    return {'cid': cid, 'gateway_url': f"https://ipfs.io/ipfs/{cid}"}
 
 
 class TestCertificateGenerator:
@@ -63,6 +71,363 @@ class TestCertificateGenerator:
         assert "metadata" in keys
 
 
+    def test_render_pdf_in_memory(self, tmp_path):
+        """Test PDF rendering returns bytes and only writes a file when asked."""
+        generator = CertificateGenerator()
+        cert_json = generator.create_canonical_json(
+            cert_id="LEARNOVA-2025-000001",
+            name="John Doe",
+            learner_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            issued_on=datetime(2025, 1, 27),
+            issuer_address="0x1234567890abcdef",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        
+        pdf_bytes = generator.render_pdf(cert_json)
+        assert pdf_bytes.startswith(b"%PDF-")
+        
+        output_path = tmp_path / "cert.pdf"
+        generator.render_pdf(cert_json, str(output_path))
+        assert output_path.read_bytes().startswith(b"%PDF-")
+    
+    def test_render_pdf_deterministic_and_cached(self, render_cache):
+        """Test the same canonical JSON renders identical bytes, reused from the cache."""
+        generator = CertificateGenerator()
+        cert_json = generator.create_canonical_json(
+            cert_id="LEARNOVA-2025-000001",
+            name="John Doe",
+            learner_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            issued_on=datetime(2025, 1, 27),
+            issuer_address="0x1234567890abcdef",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        
+        first = generator._build_pdf(cert_json)
+        assert generator._build_pdf(dict(cert_json)) == first
+        
+        assert generator.render_pdf(cert_json) == first
+        with patch.object(generator, '_build_pdf') as mock_build:
+            assert generator.render_pdf(dict(reversed(list(cert_json.items())))) == first
+        mock_build.assert_not_called()
+        assert render_cache.stats()['hits'] == 1
+        
+        changed = generator.render_pdf({**cert_json, 'grade': "Distinction"})
+        assert changed != first
+    
+    @patch('app.services.certificate_generator.CERT_RENDERER', 'stamped')
+    def test_stamped_renderer(self):
+        """Test the stamping renderer is deterministic and fills in every field."""
+        from io import BytesIO
+        from PyPDF2 import PdfReader
+        
+        generator = CertificateGenerator()
+        cert_json = generator.create_canonical_json(
+            cert_id="LEARNOVA-2025-000001",
+            name="John Doe",
+            learner_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            issued_on=datetime(2025, 1, 27),
+            issuer_address="0x1234567890abcdef",
+            grade="Distinction",
+            duration_hours=10.0,
+            modules=5
+        )
+        
+        pdf_bytes = generator.render_pdf(cert_json)
+        assert generator._build_pdf(cert_json) == pdf_bytes
+        text = PdfReader(BytesIO(pdf_bytes)).pages[0].extract_text()
+        for value in ("Certificate of Completion", "John Doe", "Test Course", "LEARNOVA-2025-000001",
+                      "course-456", "Distinction", "10.0 hours", "2025-01-27T00:00:00", "Learnova"):
+            assert value in text
+        
+        with patch('app.services.certificate_generator.CERT_RENDERER', 'flowable'):
+            assert CertificateGenerator().render_pdf(cert_json) != pdf_bytes
+    
+    def test_stamped_layout_recorded_once(self):
+        """Test the stamper replays its recorded layout and matches drawing the layout per certificate."""
+        from io import BytesIO
+        from reportlab.pdfgen.canvas import Canvas
+        from app.services.certificate_stamper import StampedCertificateRenderer
+        
+        cert_json = CertificateGenerator().create_canonical_json(
+            cert_id="LEARNOVA-2025-000001",
+            name="John Doe",
+            learner_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            issued_on=datetime(2025, 1, 27),
+            issuer_address="0x1234567890abcdef",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        renderer = StampedCertificateRenderer()
+        with patch.object(renderer, '_draw_layout') as draw_layout:
+            stamped = renderer.render(cert_json)
+        draw_layout.assert_not_called()
+        
+        buffer = BytesIO()
+        canvas = Canvas(buffer, pagesize=(renderer.width, renderer.height), invariant=1, pageCompression=1)
+        canvas.setTitle(f"Certificate {cert_json['certId']}")
+        canvas.setAuthor(cert_json['issuer'])
+        canvas.setCreator(cert_json['issuer'])
+        canvas.beginForm('layout')
+        renderer._draw_layout(canvas)
+        canvas.endForm()
+        canvas.doForm('layout')
+        renderer._stamp_fields(canvas, cert_json)
+        canvas.showPage()
+        canvas.save()
+        assert stamped == buffer.getvalue()
+    
+    def test_stamper_reportlab_internals(self):
+        """Test the reportlab internals the stamper replays exist, and their absence fails loudly."""
+        from io import BytesIO
+        from reportlab.pdfgen.canvas import Canvas
+        from app.services.certificate_stamper import StampedCertificateRenderer
+        
+        canvas = Canvas(BytesIO())
+        canvas.beginForm('layout')
+        assert isinstance(canvas._code, list)
+        assert isinstance(canvas._doc.fontMapping, dict)
+        assert callable(canvas._doc.getInternalFontName)
+        
+        class ChangedCanvas(Canvas):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                del self._code
+        
+        with patch('app.services.certificate_stamper.Canvas', ChangedCanvas):
+            with pytest.raises(RuntimeError, match="CERT_RENDERER=flowable"):
+                StampedCertificateRenderer()
+    
+    def test_compact_output(self):
+        """Test compact output writes binary streams and is smaller than ASCII85 output."""
+        from reportlab import rl_config
+        
+        generator = CertificateGenerator()
+        cert_json = generator.create_canonical_json(
+            cert_id="LEARNOVA-2025-000001",
+            name="John Doe",
+            learner_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            issued_on=datetime(2025, 1, 27),
+            issuer_address="0x1234567890abcdef",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        
+        with patch.object(rl_config, 'useA85', 1):
+            with patch('app.services.certificate_generator.PDF_COMPACT', True):
+                compact = generator._build_pdf(cert_json)
+                proof = ProofGenerator()._generate_pdf_fallback(
+                    "LEARNOVA-2025-000001", "John Doe", "Test Course", "2025-01-27", "QmTest", "0xabc"
+                )
+            # Only the compact renders themselves skip ASCII85; other reportlab users keep it
+            assert rl_config.useA85 == 1
+            with patch('app.services.certificate_generator.PDF_COMPACT', False):
+                a85 = generator._build_pdf(cert_json)
+        
+        assert b"ASCII85Decode" not in compact and b"ASCII85Decode" not in proof
+        assert b"FlateDecode" in compact
+        assert len(compact) < len(a85) < 16 * 1024
+    
+    def test_render_pool(self):
+        """Test worker processes render the same bytes as the issuing process."""
+        from app.services.render_pool import RenderPool
+        
+        generator = CertificateGenerator("stamped")
+        cert_json = generator.create_canonical_json(
+            cert_id="LEARNOVA-2025-000001",
+            name="John Doe",
+            learner_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            issued_on=datetime(2025, 1, 27),
+            issuer_address="0x1234567890abcdef",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        
+        pool = RenderPool(workers=1, renderer="stamped", timeout=120)
+        try:
+            generator.render_pool = pool
+            assert generator.render_pdf(cert_json) == generator._build_pdf(cert_json)
+            
+            proof_generator = ProofGenerator()
+            proof_generator.render_pool = pool
+            proof_bytes = proof_generator.generate_pdf_proof_page(
+                cert_id="LEARNOVA-2025-000001",
+                learner_name="John Doe",
+                course_name="Test Course",
+                issued_on="2025-01-27",
+                cid_doc="QmTest",
+                tx_hash="0xabc"
+            )
+            assert proof_bytes.startswith(b"%PDF")
+            assert pool.stats() == {'workers': 1, 'pending': 0, 'queue_depth': 0, 'completed': 2, 'failed': 0}
+        finally:
+            pool.shutdown()
+
+
+class TestPinataService:
+    """Test Pinata uploads."""
+    
+    @patch.dict(os.environ, {'PINATA_JWT': 'test-jwt'})
+    @patch('app.services.pinata_service.tempfile', create=True)
+    @patch('app.services.pinata_service.requests.post')
+    def test_pin_bytes_uploads_from_memory(self, mock_post, mock_tempfile):
+        """Test bytes and JSON are uploaded directly without temp files."""
+        from app.services.pinata_service import PinataService
+        
+        mock_post.return_value.json.return_value = {'IpfsHash': 'QmBytes'}
+        service = PinataService()
+        
+        result = service.pin_bytes(memoryview(b"%PDF-1.4 test"), "cert.pdf")
+        assert result['cid'] == 'QmBytes'
+        name, content, _ = mock_post.call_args.kwargs['files']['file']
+        assert name == "cert.pdf"
+        assert bytes(content) == b"%PDF-1.4 test"
+        
+        service.pin_json({'b': 1, 'a': 2}, "cert.json")
+        _, content, _ = mock_post.call_args.kwargs['files']['file']
+        assert content.startswith(b'{\n  "a": 2')
+        mock_tempfile.NamedTemporaryFile.assert_not_called()
+    
+    @patch.dict(os.environ, {'PINATA_JWT': 'test-jwt'})
+    @patch('app.services.pinata_service.time.sleep')
+    @patch('app.services.pinata_service.requests.get')
+    @patch('app.services.pinata_service.requests.post')
+    def test_pin_skips_known_content(self, mock_post, mock_get, mock_sleep):
+        """Test content pinned earlier, or by a failed attempt, is not uploaded again."""
+        import requests
+        from app.services.pinata_service import PinataService
+        
+        content = b"%PDF-1.4 test"
+        cid = compute_cid(content)
+        service = PinataService()
+        
+        # First attempt times out after Pinata stored the file
+        mock_post.side_effect = requests.ConnectionError("read timed out")
+        mock_get.return_value.json.return_value = {'count': 1}
+        result = service.pin_bytes(content, "cert.pdf", cid=cid)
+        assert result['cid'] == cid
+        assert mock_post.call_count == 1
+        assert mock_get.call_args.kwargs['params']['cid'] == cid
+        
+        # Known pins are skipped without any request
+        mock_post.reset_mock()
+        mock_get.reset_mock()
+        assert service.pin_bytes(content, "cert-copy.pdf", cid=cid)['cid'] == cid
+        mock_post.assert_not_called()
+        mock_get.assert_not_called()
+
+
+class TestBlockchainService:
+    """Test batched contract reads."""
+
+    def make_service(self):
+        from web3 import Web3
+        from app.services.blockchain_service import BlockchainService
+
+        service = BlockchainService.__new__(BlockchainService)
+        service.rpc_url = "http://rpc.test"
+        service.w3 = Web3()
+        service.contract_address = Web3.to_checksum_address("0x" + "11" * 20)
+        service.contract = service.w3.eth.contract(
+            address=service.contract_address,
+            abi=service._load_contract_abi()
+        )
+        return service
+
+    @patch('app.services.blockchain_service.requests.post')
+    def test_get_certificate_cids_batches_calls(self, mock_post):
+        """Test many getCertCID reads are sent as one JSON-RPC batch."""
+        service = self.make_service()
+        encoded = "0x" + service.w3.codec.encode(['string'], ['QmOnChain']).hex()
+        mock_post.return_value.json.return_value = [
+            {'jsonrpc': '2.0', 'id': 1, 'error': {'code': 3, 'message': 'execution reverted'}},
+            {'jsonrpc': '2.0', 'id': 0, 'result': encoded}
+        ]
+
+        cids = service.get_certificate_cids(["LEARNOVA-2025-000001", "LEARNOVA-2025-000002"])
+
+        assert cids == {"LEARNOVA-2025-000001": 'QmOnChain', "LEARNOVA-2025-000002": None}
+        mock_post.assert_called_once()
+        batch = mock_post.call_args.kwargs['json']
+        assert [call['method'] for call in batch] == ['eth_call', 'eth_call']
+
+    def test_merkle_inclusion_checked_against_anchored_root(self):
+        """Test a proof counts only if it leads to a root anchored on chain."""
+        from app.utils.merkle import build_tree, inclusion_proof, leaf_hash, to_hex
+
+        service = self.make_service()
+        service._anchored_roots = {}
+        levels = build_tree([leaf_hash("LEARNOVA-2025-000001", "QmA"), leaf_hash("LEARNOVA-2025-000002", "QmB")])
+        root = to_hex(levels[-1][0])
+        merkle = {'root': root, 'proof': [to_hex(node) for node in inclusion_proof(levels, 1)]}
+
+        with patch.object(service, 'get_root_timestamp', side_effect=lambda r: 1700000000 if r == root else None):
+            assert service.verify_certificate("LEARNOVA-2025-000002", "QmB", merkle=merkle)
+            assert not service.verify_certificate("LEARNOVA-2025-000002", "QmForged", merkle=merkle)
+            assert not service.verify_certificate("LEARNOVA-2025-000001", "QmA", merkle=merkle)
+
+
+class TestServiceLifetime:
+    """Test that a shared pipeline builds its service clients once."""
+
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    def test_service_built_once(self, mock_blockchain):
+        """Test the client is reused across accesses."""
+        pipeline = CertificatePipeline()
+
+        assert pipeline.blockchain is pipeline.blockchain
+        mock_blockchain.assert_called_once()
+
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    def test_failed_init_is_not_retried_immediately(self, mock_blockchain):
+        """Test a failed initialization is cached until reset."""
+        mock_blockchain.side_effect = ValueError("BLOCKCHAIN_RPC_URL not set")
+        pipeline = CertificatePipeline()
+
+        for _ in range(3):
+            with pytest.raises(Exception, match="BLOCKCHAIN_RPC_URL not set"):
+                pipeline.blockchain
+        mock_blockchain.assert_called_once()
+
+        mock_blockchain.side_effect = None
+        pipeline.reset_service('blockchain')
+        assert pipeline.blockchain is mock_blockchain.return_value
+
+    @pytest.mark.asyncio
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    async def test_check_health_rebuilds_broken_client(self, mock_db, mock_blockchain):
+        """Test an unreachable RPC node drops the client so it is rebuilt."""
+        mock_blockchain.return_value.w3.is_connected.return_value = False
+        pipeline = CertificatePipeline()
+
+        health = await pipeline.check_health()
+
+        assert health['blockchain']['ok'] is False
+        assert health['database']['ok'] is True
+        assert pipeline._blockchain is None
+        pipeline.blockchain
+        assert mock_blockchain.call_count == 2
+
+
 @pytest.mark.asyncio
 class TestCertificatePipeline:
     """Test certificate issuance pipeline."""
@@ -76,15 +441,13 @@ class TestCertificatePipeline:
         mock_email,
         mock_db,
         mock_blockchain,
-        mock_pinata
+        mock_pinata,
+        exporter
     ):
         """Test successful certificate issuance."""
         # Setup mocks
         mock_pinata_instance = Mock()
-        mock_pinata_instance.pin_file.return_value = {
-            'cid': 'QmTest123',
-            'gateway_url': 'https://ipfs.io/ipfs/QmTest123'
-        }
+        mock_pinata_instance.pin_bytes.side_effect = pin_as_computed
         mock_pinata.return_value = mock_pinata_instance
         
         mock_blockchain_instance = Mock()
@@ -120,14 +483,193 @@ class TestCertificatePipeline:
         # Assertions
         assert result['status'] == 'success'
         assert 'cert_id' in result
-        assert result['cid_doc'] == 'QmTest123'
+        rendered_pdf = mock_pinata_instance.pin_bytes.call_args_list[0].args[0]
+        assert result['cid_doc'] == compute_cid(rendered_pdf)
         assert result['tx_hash'] == '0xabcdef123456'
+        assert result['timings']['critical_path'][0] == 'render'
+        assert set(result['timings']['stages']) >= {'render', 'pin_doc', 'anchor', 'save_record'}
+        
+        # Every stage is traced under the issuance span
+        root = exporter.by_name('certificate.issue')
+        assert root.attributes['cert_id'] == result['cert_id']
+        assert exporter.by_name('stage.pin_doc').parent_id == root.span_id
+        render_span = exporter.by_name('render.certificate_pdf')
+        assert render_span.parent_id == exporter.by_name('stage.render').span_id
+        assert render_span.attributes['bytes'] > 0
         
         # Verify mocks were called
-        mock_pinata_instance.pin_file.assert_called()
+        mock_pinata_instance.pin_bytes.assert_called()
         mock_blockchain_instance.store_certificate.assert_called()
         mock_db_instance.save_certificate.assert_called()
     
+    @patch('app.services.certificate_pipeline.PinataService')
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    @patch('app.services.certificate_pipeline.EmailService')
+    async def test_issue_cohort_batches_db_calls(
+        self,
+        mock_email,
+        mock_db,
+        mock_blockchain,
+        mock_pinata
+    ):
+        """Test cohort issuance re-reads only learners not already issued in the batched query."""
+        mock_pinata_instance = Mock()
+        mock_pinata_instance.pin_bytes.side_effect = pin_as_computed
+        mock_pinata.return_value = mock_pinata_instance
+        
+        mock_blockchain_instance = Mock()
+        mock_blockchain_instance.store_certificate.return_value = {'tx_hash': '0xcohort', 'status': 'confirmed'}
+        mock_blockchain_instance.issuer_address = '0xIssuer123'
+        mock_blockchain.return_value = mock_blockchain_instance
+        
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificates_by_users.return_value = {
+            'user-2': {'cert_id': 'LEARNOVA-2025-000009', 'user_id': 'user-2', 'status': 'issued', 'cid_doc': 'QmOld'}
+        }
+        mock_db_instance.get_certificate_by_user_course.return_value = None
+        mock_db.return_value = mock_db_instance
+        mock_email.return_value = AsyncMock()
+        
+        learners = [
+            {'user_id': f"user-{i}", 'learner_name': f"Learner {i}", 'grade': "Pass"}
+            for i in range(1, 4)
+        ]
+        pipeline = CertificatePipeline()
+        report = await pipeline.issue_cohort("course-456", "Test Course", learners, concurrency=2)
+        
+        assert [result['user_id'] for result in report['results']] == ["user-1", "user-2", "user-3"]
+        assert [result['status'] for result in report['results']] == ['success', 'already_issued', 'success']
+        assert report['summary'] == {'total': 3, 'issued': 2, 'already_issued': 1, 'in_progress': 0, 'failed': 0}
+        mock_db_instance.get_certificates_by_users.assert_awaited_once()
+        looked_up = {call.args[0] for call in mock_db_instance.get_certificate_by_user_course.await_args_list}
+        assert looked_up == {"user-1", "user-3"}
+        saved = [call.args[0] for call in mock_db_instance.save_certificate.await_args_list]
+        assert {record['user_id'] for record in saved if record['status'] == 'issued'} == {"user-1", "user-3"}
+        assert mock_email.return_value.send_certificate_email.await_count == 2
+    
+    @patch('app.services.certificate_pipeline.PinataService')
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    @patch('app.services.certificate_pipeline.EmailService')
+    async def test_cohort_leases_learners_and_resumes_checkpoints(
+        self,
+        mock_email,
+        mock_db,
+        mock_blockchain,
+        mock_pinata
+    ):
+        """Test each cohort learner is checkpointed and saved under its own lease and failed rows keep their cert_id."""
+        mock_pinata.return_value.pin_bytes.side_effect = pin_as_computed
+        mock_blockchain.return_value.store_certificate.return_value = {'tx_hash': '0xcohort', 'status': 'confirmed'}
+        mock_blockchain.return_value.issuer_address = '0xIssuer123'
+        
+        failed = {
+            'cert_id': 'LEARNOVA-2025-000042',
+            'user_id': 'user-1',
+            'course_id': 'course-456',
+            'cid_doc': 'QmPinned',
+            'issuer_addr': '0xIssuer123',
+            'issued_on': '2025-01-27T10:00:00',
+            'status': 'failed',
+            'meta': {'issuance': {
+                'learner_name': "Learner 1", 'course_name': "Test Course", 'grade': "Pass",
+                'duration_hours': 10.0, 'modules': 5, 'metadata': None, 'owner_address': None, 'attempts': 1
+            }}
+        }
+        events = []
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificates_by_users.return_value = {'user-1': failed}
+        mock_db_instance.get_certificate_by_user_course.side_effect = (
+            lambda user_id, course_id: failed if user_id == 'user-1' else None
+        )
+        mock_db_instance.acquire_issuance_lease.side_effect = lambda user_id, *args: events.append(('lease', user_id)) or True
+        mock_db_instance.release_issuance_lease.side_effect = lambda user_id, *args: events.append(('release', user_id))
+        mock_db_instance.save_certificate.side_effect = (
+            lambda record: events.append((record['status'], record['user_id']))
+        )
+        mock_db.return_value = mock_db_instance
+        mock_email.return_value = AsyncMock()
+        
+        learners = [
+            {'user_id': f"user-{i}", 'learner_name': f"Learner {i}", 'grade': "Pass"}
+            for i in range(1, 3)
+        ]
+        pipeline = CertificatePipeline()
+        report = await pipeline.issue_cohort("course-456", "Test Course", learners)
+        
+        assert [result['status'] for result in report['results']] == ['success', 'success']
+        assert report['results'][0]['cert_id'] == 'LEARNOVA-2025-000042'
+        assert report['results'][0]['issued_on'] == '2025-01-27T10:00:00'
+        assert report['results'][0]['cid_doc'] == 'QmPinned'
+        saved = [call.args[0] for call in mock_db_instance.save_certificate.await_args_list]
+        assert {record['cert_id'] for record in saved if record['status'] == 'issued'} == {
+            'LEARNOVA-2025-000042', report['results'][1]['cert_id']
+        }
+        # Each learner's checkpoints and record are written while its own lease is held
+        for user_id in ('user-1', 'user-2'):
+            own = [event for event in events if event[1] == user_id]
+            assert own[0] == ('lease', user_id)
+            assert own[-2:] == [('issued', user_id), ('release', user_id)]
+        assert ('pending', 'user-2') in events
+    
+    @patch('app.services.certificate_pipeline.PinataService')
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    @patch('app.services.certificate_pipeline.EmailService')
+    async def test_cohort_anchored_in_merkle_batch(
+        self,
+        mock_email,
+        mock_db,
+        mock_blockchain,
+        mock_pinata
+    ):
+        """Test batched anchoring sends one root and verifies each certificate by its proof."""
+        from app.services.anchor_batcher import AnchorBatcher
+        
+        mock_pinata.return_value.pin_bytes.side_effect = pin_as_computed
+        mock_blockchain_instance = Mock()
+        mock_blockchain_instance.store_merkle_root.return_value = {'tx_hash': '0xroot', 'status': 'confirmed'}
+        mock_blockchain_instance.issuer_address = '0xIssuer123'
+        mock_blockchain.return_value = mock_blockchain_instance
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificates_by_users.return_value = {}
+        mock_db_instance.get_certificate_by_user_course.return_value = None
+        mock_db.return_value = mock_db_instance
+        mock_email.return_value = AsyncMock()
+        
+        pipeline = CertificatePipeline()
+        pipeline.anchor_batcher = AnchorBatcher(lambda: pipeline.blockchain, window_seconds=30, max_size=3)
+        learners = [
+            {'user_id': f"user-{i}", 'learner_name': f"Learner {i}", 'grade': "Pass"}
+            for i in range(1, 4)
+        ]
+        report = await pipeline.issue_cohort("course-456", "Test Course", learners, concurrency=3)
+        
+        assert report['summary']['issued'] == 3
+        assert {result['tx_hash'] for result in report['results']} == {'0xroot'}
+        mock_blockchain_instance.store_merkle_root.assert_called_once()
+        mock_blockchain_instance.store_certificate.assert_not_called()
+        root = mock_blockchain_instance.store_merkle_root.call_args.args[0]
+        saved = [
+            call.args[0] for call in mock_db_instance.save_certificate.await_args_list
+            if call.args[0]['status'] == 'issued'
+        ]
+        assert len(saved) == 3
+        assert {record['meta']['merkle']['root'] for record in saved} == {root}
+        
+        record = saved[0]
+        mock_db_instance.get_certificate.return_value = record
+        mock_blockchain_instance.verify_merkle_inclusion.return_value = root
+        result = await pipeline.verify_certificate(record['cert_id'])
+        
+        assert result['status'] == 'verified'
+        assert result['merkle_root'] == root
+        mock_blockchain_instance.verify_merkle_inclusion.assert_called_once_with(
+            record['cert_id'], record['cid_doc'], record['meta']['merkle']
+        )
+        mock_blockchain_instance.get_certificate_cid.assert_not_called()
+    
     @patch('app.services.certificate_pipeline.PinataService')
     @patch('app.services.certificate_pipeline.BlockchainService')
     @patch('app.services.certificate_pipeline.DatabaseService')
@@ -159,60 +701,780 @@ class TestCertificatePipeline:
         assert result['status'] == 'already_issued'
         assert result['cert_id'] == 'LEARNOVA-2025-000001'
     
+    @patch('app.services.certificate_pipeline.PinataService')
     @patch('app.services.certificate_pipeline.BlockchainService')
     @patch('app.services.certificate_pipeline.DatabaseService')
-    async def test_verify_certificate_success(
+    async def test_current_cert_id(
         self,
         mock_db,
-        mock_blockchain
+        mock_blockchain,
+        mock_pinata
     ):
-        """Test certificate verification."""
+        """Test issued and checkpointed rows keep their cert_id and abandoned rows get a new one."""
         mock_db_instance = AsyncMock()
-        mock_db_instance.get_certificate.return_value = {
-            'cert_id': 'LEARNOVA-2025-000001',
-            'cid_doc': 'QmTest123',
-            'tx_hash': '0xabcdef',
-            'issued_on': datetime.now().isoformat(),
-            'revoked': False
-        }
         mock_db.return_value = mock_db_instance
-        
-        mock_blockchain_instance = Mock()
-        mock_blockchain_instance.get_certificate_cid.return_value = 'QmTest123'
-        mock_blockchain.return_value = mock_blockchain_instance
-        
         pipeline = CertificatePipeline()
-        result = await pipeline.verify_certificate('LEARNOVA-2025-000001')
+        rows = {
+            'issued': {'cert_id': 'LEARNOVA-2025-000001', 'status': 'issued'},
+            'pending': {'cert_id': 'LEARNOVA-2025-000002', 'status': 'pending', 'updated_at': datetime.now().isoformat(),
+                        'meta': {'issuance': {'attempts': 1}}},
+            'abandoned': {'cert_id': 'LEARNOVA-2025-000003', 'status': 'failed',
+                          'meta': {'abandoned_issuance': {'attempts': 3}}},
+            'missing': None
+        }
         
-        assert result['verified'] is True
-        assert result['status'] == 'verified'
-        assert result['on_chain_cid'] == 'QmTest123'
+        found = {}
+        for name, row in rows.items():
+            mock_db_instance.get_certificate_by_user_course.return_value = row
+            found[name] = await pipeline.current_cert_id("user-123", "course-456")
+        
+        assert found == {
+            'issued': 'LEARNOVA-2025-000001',
+            'pending': 'LEARNOVA-2025-000002',
+            'abandoned': None,
+            'missing': None
+        }
     
+    @patch('app.services.certificate_pipeline.PinataService')
     @patch('app.services.certificate_pipeline.BlockchainService')
     @patch('app.services.certificate_pipeline.DatabaseService')
-    async def test_verify_certificate_mismatch(
+    @patch('app.services.certificate_pipeline.EmailService')
+    async def test_failed_issuance_resumes_from_checkpoint(
         self,
+        mock_email,
         mock_db,
-        mock_blockchain
+        mock_blockchain,
+        mock_pinata
     ):
-        """Test certificate verification with CID mismatch."""
-        mock_db_instance = AsyncMock()
-        mock_db_instance.get_certificate.return_value = {
-            'cert_id': 'LEARNOVA-2025-000001',
-            'cid_doc': 'QmTest123',
-            'revoked': False
-        }
-        mock_db.return_value = mock_db_instance
+        """Test a failure after pinning keeps the CID and resume does not re-pin."""
+        mock_pinata_instance = Mock()
+        mock_pinata_instance.pin_bytes.side_effect = pin_as_computed
+        mock_pinata.return_value = mock_pinata_instance
         
         mock_blockchain_instance = Mock()
-        mock_blockchain_instance.get_certificate_cid.return_value = 'QmDifferent456'
+        mock_blockchain_instance.store_certificate.return_value = {'tx_hash': '0xanchored', 'status': 'confirmed'}
+        mock_blockchain_instance.issuer_address = '0xIssuer123'
         mock_blockchain.return_value = mock_blockchain_instance
         
+        saved = {}
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate_by_user_course.return_value = None
+        mock_db_instance.save_certificate.side_effect = lambda record: saved.update({record['cert_id']: record})
+        mock_db_instance.get_certificate.side_effect = lambda cert_id: saved.get(cert_id)
+        mock_db.return_value = mock_db_instance
+        mock_email.return_value = AsyncMock()
+        
         pipeline = CertificatePipeline()
-        result = await pipeline.verify_certificate('LEARNOVA-2025-000001')
+        with patch.object(pipeline.proof_generator, 'generate_html_proof_page', side_effect=RuntimeError("template missing")):
+            result = await pipeline.issue_certificate(
+                user_id="user-123",
+                course_id="course-456",
+                course_name="Test Course",
+                learner_name="John Doe",
+                grade="Pass",
+                duration_hours=10.0,
+                modules=5
+            )
         
-        assert result['verified'] is False
-        assert result['status'] == 'mismatch'
+        assert result['status'] == 'failed'
+        failed = saved[result['cert_id']]
+        pinned_cid = mock_pinata_instance.pin_bytes.call_args.kwargs['cid']
+        assert failed['status'] == 'failed'
+        assert failed['cid_doc'] == pinned_cid
+        assert failed['tx_hash'] == '0xanchored'
+        assert failed['meta']['issuance']['attempts'] == 1
+        assert failed['meta']['issuance']['learner_name'] == "John Doe"
+        
+        mock_pinata_instance.pin_bytes.reset_mock()
+        mock_blockchain_instance.store_certificate.reset_mock()
+        with patch.object(pipeline.cert_generator, 'render_pdf') as mock_render:
+            resumed = await pipeline.resume_certificate(result['cert_id'])
+        
+        assert resumed['status'] == 'success'
+        assert resumed['cert_id'] == result['cert_id']
+        assert resumed['cid_doc'] == pinned_cid
+        assert saved[result['cert_id']]['status'] == 'issued'
+        mock_render.assert_not_called()
+        mock_blockchain_instance.store_certificate.assert_not_called()
+        # Only the proof page is pinned on resume
+        assert [call.args[1] for call in mock_pinata_instance.pin_bytes.call_args_list] == [f"{result['cert_id']}_proof.html"]
+    
+    @patch('app.services.certificate_pipeline.PinataService')
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    @patch('app.services.certificate_pipeline.EmailService')
+    async def test_retry_resumes_failed_row(
+        self,
+        mock_email,
+        mock_db,
+        mock_blockchain,
+        mock_pinata
+    ):
+        """Test issuing again for a learner with a failed row keeps its cert_id."""
+        mock_pinata.return_value.pin_bytes.return_value = {'cid': 'QmProof'}
+        mock_blockchain.return_value.issuer_address = '0xIssuer123'
+        mock_blockchain.return_value.store_certificate.return_value = {'tx_hash': '0xnew', 'status': 'confirmed'}
+        
+        failed = {
+            'cert_id': 'LEARNOVA-2025-000042',
+            'user_id': 'user-123',
+            'course_id': 'course-456',
+            'cid_doc': 'QmPinned',
+            'tx_hash': None,
+            'cid_proof': None,
+            'issuer_addr': '0xIssuer123',
+            'issued_on': '2025-01-27T10:00:00',
+            'status': 'failed',
+            'meta': {'error': 'RPC timeout', 'issuance': {
+                'learner_name': "John Doe", 'course_name': "Test Course", 'grade': "Pass",
+                'duration_hours': 10.0, 'modules': 5, 'metadata': None, 'owner_address': None, 'attempts': 1
+            }}
+        }
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate_by_user_course.return_value = failed
+        mock_db.return_value = mock_db_instance
+        mock_email.return_value = AsyncMock()
+        
+        pipeline = CertificatePipeline()
+        result = await pipeline.issue_certificate(
+            user_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            learner_name="John Doe",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        
+        assert result['status'] == 'success'
+        assert result['cert_id'] == 'LEARNOVA-2025-000042'
+        assert result['tx_hash'] == '0xnew'
+        assert result['issued_on'] == '2025-01-27T10:00:00'
+        final = mock_db_instance.save_certificate.call_args.args[0]
+        assert final['status'] == 'issued'
+        assert final['cid_doc'] == 'QmPinned'
+        assert 'issuance' not in final['meta']
+    
+    @patch('app.services.certificate_pipeline.PinataService')
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    @patch('app.services.certificate_pipeline.EmailService')
+    async def test_preassigned_cert_id_resumes_failed_row(
+        self,
+        mock_email,
+        mock_db,
+        mock_blockchain,
+        mock_pinata
+    ):
+        """Test a queued issuance resumes the learner's failed row instead of minting a second certificate."""
+        mock_pinata.return_value.pin_bytes.return_value = {'cid': 'QmProof'}
+        mock_blockchain.return_value.issuer_address = '0xIssuer123'
+        mock_blockchain.return_value.store_certificate.return_value = {'tx_hash': '0xnew', 'status': 'confirmed'}
+        
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate_by_user_course.return_value = {
+            'cert_id': 'LEARNOVA-2025-000042',
+            'user_id': 'user-123',
+            'course_id': 'course-456',
+            'cid_doc': 'QmPinned',
+            'issuer_addr': '0xIssuer123',
+            'issued_on': '2025-01-27T10:00:00',
+            'status': 'failed',
+            'meta': {'issuance': {
+                'learner_name': "John Doe", 'course_name': "Test Course", 'grade': "Pass",
+                'duration_hours': 10.0, 'modules': 5, 'metadata': None, 'owner_address': None, 'attempts': 1
+            }}
+        }
+        mock_db.return_value = mock_db_instance
+        mock_email.return_value = AsyncMock()
+        
+        pipeline = CertificatePipeline()
+        result = await pipeline.issue_certificate(
+            user_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            learner_name="John Doe",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5,
+            cert_id='LEARNOVA-2025-000099'
+        )
+        
+        assert result['status'] == 'success'
+        assert result['cert_id'] == 'LEARNOVA-2025-000042'
+        saved_ids = {call.args[0]['cert_id'] for call in mock_db_instance.save_certificate.call_args_list}
+        assert saved_ids == {'LEARNOVA-2025-000042'}
+    
+    @patch('app.services.certificate_pipeline.PinataService')
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    async def test_resume_supersedes_row_of_issued_learner(
+        self,
+        mock_db,
+        mock_blockchain,
+        mock_pinata
+    ):
+        """Test a stale failed row is superseded, not resumed, once the learner has another certificate."""
+        stale = {
+            'cert_id': 'LEARNOVA-2025-000042',
+            'user_id': 'user-123',
+            'course_id': 'course-456',
+            'cid_doc': 'QmPinned',
+            'tx_hash': '0xold',
+            'status': 'failed',
+            'meta': {'issuance': {'learner_name': "John Doe", 'attempts': 1}}
+        }
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate.return_value = stale
+        mock_db_instance.get_certificate_by_user_course.return_value = {
+            'cert_id': 'LEARNOVA-2025-000077', 'user_id': 'user-123', 'course_id': 'course-456', 'status': 'issued'
+        }
+        mock_db_instance.supersede_certificate.return_value = True
+        mock_db.return_value = mock_db_instance
+        
+        pipeline = CertificatePipeline()
+        result = await pipeline.resume_certificate('LEARNOVA-2025-000042')
+        
+        assert result['status'] == 'superseded'
+        assert result['superseded_by'] == 'LEARNOVA-2025-000077'
+        mock_db_instance.supersede_certificate.assert_awaited_once_with('LEARNOVA-2025-000042')
+        mock_db_instance.save_certificate.assert_not_called()
+        mock_pinata.return_value.pin_bytes.assert_not_called()
+        mock_blockchain.return_value.store_certificate.assert_not_called()
+    
+    @patch('app.services.certificate_pipeline.PinataService')
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    @patch('app.services.certificate_pipeline.EmailService')
+    async def test_concurrent_duplicates_issue_once(
+        self,
+        mock_email,
+        mock_db,
+        mock_blockchain,
+        mock_pinata
+    ):
+        """Test concurrent requests for one learner and course share a single issuance."""
+        mock_pinata.return_value.pin_bytes.side_effect = pin_as_computed
+        mock_blockchain.return_value.issuer_address = '0xIssuer123'
+        mock_blockchain.return_value.store_certificate.return_value = {'tx_hash': '0xonce', 'status': 'confirmed'}
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate_by_user_course.return_value = None
+        mock_db.return_value = mock_db_instance
+        mock_email.return_value = AsyncMock()
+        
+        pipeline = CertificatePipeline()
+        request = dict(
+            user_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            learner_name="John Doe",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        first, second = await asyncio.gather(
+            pipeline.issue_certificate(**request),
+            pipeline.issue_certificate(**request)
+        )
+        
+        assert first['status'] == second['status'] == 'success'
+        assert first['cert_id'] == second['cert_id']
+        assert first is not second
+        mock_blockchain.return_value.store_certificate.assert_called_once()
+        mock_db_instance.acquire_issuance_lease.assert_awaited_once()
+        mock_db_instance.release_issuance_lease.assert_awaited_once()
+        assert pipeline._inflight == {}
+    
+    @patch('app.services.certificate_pipeline.PinataService')
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    @patch('app.services.certificate_pipeline.EmailService')
+    async def test_anchor_overlaps_document_upload(
+        self,
+        mock_email,
+        mock_db,
+        mock_blockchain,
+        mock_pinata
+    ):
+        """Test the locally computed CID is anchored while the PDF is still uploading, once Pinata agrees with it."""
+        anchored = threading.Event()
+        
+        def slow_pin(content, file_name, cid=None):
+            if file_name.endswith(".pdf"):
+                assert anchored.wait(5), "anchor did not start before the upload finished"
+            return pin_as_computed(content, file_name, cid)
+        
+        def store_certificate(cert_id, cid, owner_address):
+            anchored.set()
+            return {'tx_hash': '0xearly', 'status': 'confirmed'}
+        
+        mock_pinata.return_value.pin_bytes.side_effect = slow_pin
+        mock_blockchain.return_value.issuer_address = '0xIssuer123'
+        mock_blockchain.return_value.store_certificate.side_effect = store_certificate
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate_by_user_course.return_value = None
+        mock_db.return_value = mock_db_instance
+        mock_email.return_value = AsyncMock()
+        
+        pipeline = CertificatePipeline()
+        # An earlier single-chunk document was pinned under its local CID
+        pipeline._confirmed_cid_layouts.add('single-chunk')
+        result = await pipeline.issue_certificate(
+            user_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            learner_name="John Doe",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        
+        assert result['status'] == 'success'
+        assert mock_blockchain.return_value.store_certificate.call_args.kwargs['cid'] == result['cid_doc']
+        final = mock_db_instance.save_certificate.call_args.args[0]
+        assert (final['cid_doc'], final['tx_hash']) == (result['cid_doc'], '0xearly')
+    
+    @patch('app.services.certificate_pipeline.PinataService')
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    @patch('app.services.certificate_pipeline.EmailService')
+    async def test_first_anchor_waits_for_pin(
+        self,
+        mock_email,
+        mock_db,
+        mock_blockchain,
+        mock_pinata
+    ):
+        """Test the anchor waits for the upload until Pinata has confirmed the local CID once."""
+        events = []
+        
+        def pin(content, file_name, cid=None):
+            events.append(('pin', file_name))
+            return pin_as_computed(content, file_name, cid)
+        
+        def store_certificate(cert_id, cid, owner_address):
+            events.append(('anchor', cid))
+            return {'tx_hash': '0xafter', 'status': 'confirmed'}
+        
+        mock_pinata.return_value.pin_bytes.side_effect = pin
+        mock_blockchain.return_value.issuer_address = '0xIssuer123'
+        mock_blockchain.return_value.store_certificate.side_effect = store_certificate
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate_by_user_course.return_value = None
+        mock_db.return_value = mock_db_instance
+        mock_email.return_value = AsyncMock()
+        
+        pipeline = CertificatePipeline()
+        result = await pipeline.issue_certificate(
+            user_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            learner_name="John Doe",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        
+        assert result['status'] == 'success'
+        assert events[:2] == [('pin', f"{result['cert_id']}.pdf"), ('anchor', result['cid_doc'])]
+        assert pipeline._confirmed_cid_layouts == {'single-chunk'}
+    
+    @patch('app.services.certificate_pipeline.PinataService')
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    @patch('app.services.certificate_pipeline.EmailService')
+    async def test_pinned_cid_must_match_local_cid(
+        self,
+        mock_email,
+        mock_db,
+        mock_blockchain,
+        mock_pinata
+    ):
+        """Test issuance fails, with nothing anchored, when Pinata returns a CID other than the local one."""
+        mock_pinata.return_value.pin_bytes.return_value = {'cid': 'QmSomethingElse'}
+        mock_blockchain.return_value.issuer_address = '0xIssuer123'
+        mock_blockchain.return_value.store_certificate.return_value = {'tx_hash': '0xanchored', 'status': 'confirmed'}
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate_by_user_course.return_value = None
+        mock_db.return_value = mock_db_instance
+        mock_email.return_value = AsyncMock()
+        
+        pipeline = CertificatePipeline()
+        result = await pipeline.issue_certificate(
+            user_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            learner_name="John Doe",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        
+        assert result['status'] == 'failed'
+        assert 'computed locally' in result['error']
+        # No pin has confirmed the local CID yet, so the anchor waited for the pin
+        mock_blockchain.return_value.store_certificate.assert_not_called()
+        failed = mock_db_instance.save_certificate.call_args.args[0]
+        assert failed['cid_doc'] is None
+        assert failed['tx_hash'] is None
+        assert 'anchored_cid' not in failed['meta']['issuance']
+        
+        # A disagreement also withdraws an earlier confirmation of the layout
+        pipeline._confirmed_cid_layouts.add('single-chunk')
+        mock_db_instance.get_certificate_by_user_course.return_value = None
+        await pipeline.issue_certificate(
+            user_id="user-789",
+            course_id="course-456",
+            course_name="Test Course",
+            learner_name="Jane Doe",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        assert 'single-chunk' not in pipeline._confirmed_cid_layouts
+    
+    @patch('app.services.certificate_pipeline.ISSUE_LEASE_POLL_SECONDS', 0)
+    @patch('app.services.certificate_pipeline.PinataService')
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    @patch('app.services.certificate_pipeline.EmailService')
+    async def test_held_lease_waits_for_other_worker(
+        self,
+        mock_email,
+        mock_db,
+        mock_blockchain,
+        mock_pinata
+    ):
+        """Test a lease held by another worker returns that worker's certificate."""
+        issued = {
+            'cert_id': 'LEARNOVA-2025-000077',
+            'user_id': 'user-123',
+            'course_id': 'course-456',
+            'cid_doc': 'QmOther',
+            'status': 'issued'
+        }
+        mock_db_instance = AsyncMock()
+        mock_db_instance.acquire_issuance_lease.return_value = False
+        mock_db_instance.get_certificate_by_user_course.side_effect = [None, issued]
+        mock_db.return_value = mock_db_instance
+        
+        pipeline = CertificatePipeline()
+        result = await pipeline.issue_certificate(
+            user_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            learner_name="John Doe",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        
+        assert result['status'] == 'already_issued'
+        assert result['cert_id'] == 'LEARNOVA-2025-000077'
+        assert mock_db_instance.acquire_issuance_lease.await_count == 2
+        mock_pinata.return_value.pin_bytes.assert_not_called()
+        mock_db_instance.release_issuance_lease.assert_not_called()
+    
+    @patch('app.services.certificate_pipeline.PinataService')
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    @patch('app.services.certificate_pipeline.EmailService')
+    async def test_download_rerenders_then_serves_cached(
+        self,
+        mock_email,
+        mock_db,
+        mock_blockchain,
+        mock_pinata,
+        tmp_path
+    ):
+        """Test a missing document is rebuilt from its record, checked against cid_doc and cached."""
+        from app.services.artifact_store import ArtifactStore
+        
+        mock_pinata.return_value.pin_bytes.side_effect = pin_as_computed
+        mock_blockchain.return_value.store_certificate.return_value = {'tx_hash': '0xabc', 'status': 'confirmed'}
+        mock_blockchain.return_value.issuer_address = '0xIssuer123'
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate_by_user_course.return_value = None
+        mock_db.return_value = mock_db_instance
+        mock_email.return_value = AsyncMock()
+        
+        pipeline = CertificatePipeline()
+        issued = await pipeline.issue_certificate(
+            user_id="user-123",
+            course_id="course-456",
+            course_name="Test Course",
+            learner_name="John Doe",
+            grade="Pass",
+            duration_hours=10.0,
+            modules=5
+        )
+        record = mock_db_instance.save_certificate.call_args.args[0]
+        pinned = mock_pinata.return_value.pin_bytes.call_args_list[0].args[0]
+        assert (await pipeline.load_certificate_document(record))['source'] == 'cache'
+        
+        # A server that did not issue the certificate has no local copy
+        pipeline.artifacts = ArtifactStore(directory=str(tmp_path / "other"), gateways=[])
+        mock_db_instance.get_certificate.return_value = record
+        document = await pipeline.find_certificate_document(issued['cert_id'])
+        assert document['cid_doc'] == issued['cid_doc']
+        
+        loaded = await pipeline.load_certificate_document(document['record'])
+        assert loaded == {'content': pinned, 'source': 'render'}
+        assert (await pipeline.load_certificate_document(document['record']))['source'] == 'cache'
+        
+        mock_db_instance.get_certificate.return_value = {**record, 'revoked': True}
+        assert (await pipeline.find_certificate_document(issued['cert_id']))['status'] == 'revoked'
+    
+    @patch('app.services.artifact_store.requests.get')
+    async def test_download_fetches_verified_content_from_gateway(self, mock_get, tmp_path):
+        """Test gateway content that does not match cid_doc is rejected."""
+        from unittest.mock import MagicMock
+        from app.services.artifact_store import ArtifactStore
+        
+        content = b"%PDF-1.4 certificate"
+        cid = compute_cid(content)
+        responses = []
+        for body in (b"%PDF-1.4 tampered", content):
+            response = MagicMock()
+            response.__enter__.return_value.iter_content.return_value = [body]
+            responses.append(response)
+        mock_get.side_effect = responses
+        
+        pipeline = CertificatePipeline()
+        pipeline.artifacts = ArtifactStore(
+            directory=str(tmp_path / "artifacts"),
+            gateways=["https://bad.example/ipfs/", "https://good.example/ipfs/"]
+        )
+        record = {'cert_id': 'LEARNOVA-2025-000001', 'cid_doc': cid, 'meta': {}}
+        
+        assert await pipeline.load_certificate_document(record) == {'content': content, 'source': 'gateway'}
+        assert [call.args[0] for call in mock_get.call_args_list] == [
+            f"https://bad.example/ipfs/{cid}", f"https://good.example/ipfs/{cid}"
+        ]
+        assert pipeline.artifacts.get(cid) == content
+    
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    async def test_verify_certificate_success(
+        self,
+        mock_db,
+        mock_blockchain
+    ):
+        """Test certificate verification."""
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate.return_value = {
+            'cert_id': 'LEARNOVA-2025-000001',
+            'cid_doc': 'QmTest123',
+            'status': 'issued',
+            'tx_hash': '0xabcdef',
+            'issued_on': datetime.now().isoformat(),
+            'revoked': False
+        }
+        mock_db.return_value = mock_db_instance
+        
+        mock_blockchain_instance = Mock()
+        mock_blockchain_instance.get_certificate_cid.return_value = 'QmTest123'
+        mock_blockchain.return_value = mock_blockchain_instance
+        
+        pipeline = CertificatePipeline()
+        result = await pipeline.verify_certificate('LEARNOVA-2025-000001')
+        
+        assert result['verified'] is True
+        assert result['status'] == 'verified'
+        assert result['on_chain_cid'] == 'QmTest123'
+    
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    async def test_verify_certificate_mismatch(
+        self,
+        mock_db,
+        mock_blockchain
+    ):
+        """Test certificate verification with CID mismatch."""
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate.return_value = {
+            'cert_id': 'LEARNOVA-2025-000001',
+            'cid_doc': 'QmTest123',
+            'status': 'issued',
+            'revoked': False
+        }
+        mock_db.return_value = mock_db_instance
+        
+        mock_blockchain_instance = Mock()
+        mock_blockchain_instance.get_certificate_cid.return_value = 'QmDifferent456'
+        mock_blockchain.return_value = mock_blockchain_instance
+        
+        pipeline = CertificatePipeline()
+        result = await pipeline.verify_certificate('LEARNOVA-2025-000001')
+        
+        assert result['verified'] is False
+        assert result['status'] == 'mismatch'
+
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    async def test_verify_caches_chain_lookup_not_revocation(
+        self,
+        mock_db,
+        mock_blockchain
+    ):
+        """Test repeat verifications reuse the chain lookup but see a revocation made elsewhere at once."""
+        record = {
+            'cert_id': 'LEARNOVA-2025-000001',
+            'cid_doc': 'QmTest123',
+            'status': 'issued',
+            'revoked': False
+        }
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate.return_value = record
+        mock_db.return_value = mock_db_instance
+
+        mock_blockchain_instance = Mock()
+        mock_blockchain_instance.get_certificate_cid.return_value = 'QmTest123'
+        mock_blockchain.return_value = mock_blockchain_instance
+
+        pipeline = CertificatePipeline()
+        for _ in range(3):
+            result = await pipeline.verify_certificate('LEARNOVA-2025-000001')
+            assert result['status'] == 'verified'
+
+        assert mock_db_instance.get_certificate.await_count == 3
+        assert mock_blockchain_instance.get_certificate_cid.call_count == 1
+        assert pipeline.verification_cache.stats()['hits'] == 2
+
+        # Revoked by another worker: this pipeline's cache is not invalidated
+        record['revoked'] = True
+        result = await pipeline.verify_certificate('LEARNOVA-2025-000001')
+
+        assert result['status'] == 'revoked'
+        assert mock_blockchain_instance.get_certificate_cid.call_count == 1
+
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    async def test_verify_certificates_batch(
+        self,
+        mock_db,
+        mock_blockchain
+    ):
+        """Test batch verification uses one database query and one chain batch."""
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificates.return_value = {
+            'LEARNOVA-2025-000001': {'cert_id': 'LEARNOVA-2025-000001', 'status': 'issued', 'cid_doc': 'QmOne', 'revoked': False},
+            'LEARNOVA-2025-000002': {'cert_id': 'LEARNOVA-2025-000002', 'status': 'issued', 'cid_doc': 'QmTwo', 'revoked': True}
+        }
+        mock_db.return_value = mock_db_instance
+
+        mock_blockchain_instance = Mock()
+        mock_blockchain_instance.get_certificate_cids.return_value = {'LEARNOVA-2025-000001': 'QmOne'}
+        mock_blockchain.return_value = mock_blockchain_instance
+
+        pipeline = CertificatePipeline()
+        results = await pipeline.verify_certificates(
+            ['LEARNOVA-2025-000001', 'LEARNOVA-2025-000002', 'LEARNOVA-2025-000003', 'LEARNOVA-2025-000001']
+        )
+
+        assert list(results) == ['LEARNOVA-2025-000001', 'LEARNOVA-2025-000002', 'LEARNOVA-2025-000003']
+        assert [result['status'] for result in results.values()] == ['verified', 'revoked', 'not_found']
+        mock_db_instance.get_certificates.assert_awaited_once()
+        mock_blockchain_instance.get_certificate_cids.assert_called_once_with(['LEARNOVA-2025-000001'])
+
+        # The chain lookup is cached for single verification
+        mock_db_instance.get_certificate.return_value = mock_db_instance.get_certificates.return_value['LEARNOVA-2025-000001']
+        result = await pipeline.verify_certificate('LEARNOVA-2025-000001')
+        assert result['verified'] is True
+        mock_blockchain_instance.get_certificate_cid.assert_not_called()
+
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    async def test_verify_reads_chain_index_first(
+        self,
+        mock_db,
+        mock_blockchain,
+        tmp_path
+    ):
+        """Test indexed certificates verify without a contract call."""
+        from app.services.chain_index import CertEventIndex
+
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate.return_value = {
+            'cert_id': 'LEARNOVA-2025-000001',
+            'cid_doc': 'QmTest123',
+            'status': 'issued',
+            'revoked': False,
+            'issued_on': datetime.now().isoformat()
+        }
+        mock_db.return_value = mock_db_instance
+
+        pipeline = CertificatePipeline()
+        pipeline.chain_index = CertEventIndex(str(tmp_path / "index.sqlite3"))
+        pipeline.chain_index.apply("0xRegistry", [{
+            'block_number': 5, 'log_index': 0, 'cert_id': 'LEARNOVA-2025-000001',
+            'cid': 'QmTest123', 'block_hash': '0xblock5'
+        }], {'number': 5, 'hash': '0xblock5', 'timestamp': 1_700_000_000})
+
+        result = await pipeline.verify_certificate('LEARNOVA-2025-000001')
+        assert result['status'] == 'verified'
+        mock_blockchain.return_value.get_certificate_cid.assert_not_called()
+
+        # Not indexed and issued after the index position: fall back to the contract
+        mock_blockchain.return_value.get_certificate_cid.return_value = 'QmFresh'
+        mock_db_instance.get_certificate.return_value = {
+            'cert_id': 'LEARNOVA-2025-000002',
+            'cid_doc': 'QmFresh',
+            'status': 'issued',
+            'revoked': False,
+            'issued_on': datetime.now().isoformat()
+        }
+        result = await pipeline.verify_certificate('LEARNOVA-2025-000002')
+        assert result['status'] == 'verified'
+        mock_blockchain.return_value.get_certificate_cid.assert_called_once_with('LEARNOVA-2025-000002')
+
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    async def test_verify_errors_not_cached(self, mock_db):
+        """Test lookup errors are retried instead of cached."""
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate.side_effect = Exception("Supabase timeout")
+        mock_db.return_value = mock_db_instance
+
+        pipeline = CertificatePipeline()
+        await pipeline.verify_certificate('LEARNOVA-2025-000001')
+        result = await pipeline.verify_certificate('LEARNOVA-2025-000001')
+
+        assert result['status'] == 'error'
+        assert mock_db_instance.get_certificate.await_count == 2
+
+    @patch('app.services.certificate_pipeline.BlockchainService')
+    @patch('app.services.certificate_pipeline.DatabaseService')
+    async def test_unfinished_issuance_not_verified_or_served(
+        self,
+        mock_db,
+        mock_blockchain
+    ):
+        """Test a failed row that was pinned and anchored is neither verified nor downloadable."""
+        mock_db_instance = AsyncMock()
+        mock_db_instance.get_certificate.return_value = {
+            'cert_id': 'LEARNOVA-2025-000001',
+            'status': 'failed',
+            'cid_doc': 'QmTest123',
+            'tx_hash': '0xabcdef',
+            'revoked': False
+        }
+        mock_db_instance.get_certificates.return_value = {
+            'LEARNOVA-2025-000001': mock_db_instance.get_certificate.return_value
+        }
+        mock_db.return_value = mock_db_instance
+        mock_blockchain.return_value.get_certificate_cid.return_value = 'QmTest123'
+        
+        pipeline = CertificatePipeline()
+        result = await pipeline.verify_certificate('LEARNOVA-2025-000001')
+        assert result['verified'] is False
+        assert result['status'] == 'incomplete'
+        results = await pipeline.verify_certificates(['LEARNOVA-2025-000001'])
+        assert results['LEARNOVA-2025-000001']['status'] == 'incomplete'
+        mock_blockchain.return_value.get_certificate_cid.assert_not_called()
+        mock_blockchain.return_value.get_certificate_cids.assert_not_called()
+        
+        document = await pipeline.find_certificate_document('LEARNOVA-2025-000001')
+        assert document == {'status': 'not_found'}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+"""
+Tests for the local CertStored event index.
+"""
+
+from datetime import datetime
+from app.services.chain_index import CertEventIndex, CertEventIndexer
+
+
+class FakeChain:
+    """In-memory chain with CertStored events and replaceable block hashes."""
+
+    contract_address = "0xRegistry"
+
+    def __init__(self, head: int):
+        self.head = head
+        self.events = []
+        self.fork = 0
+        self.log_requests = []
+
+    def block_hash(self, number: int) -> str:
+        return f"0x{self.fork}-{number}"
+
+    def get_block_header(self, block="latest"):
+        number = self.head if block == 'latest' else block
+        return {'number': number, 'hash': self.block_hash(number), 'timestamp': 1_700_000_000 + number * 2}
+
+    def get_cert_stored_events(self, from_block, to_block):
+        self.log_requests.append((from_block, to_block))
+        return [
+            {**event, 'block_hash': self.block_hash(event['block_number'])}
+            for event in self.events
+            if from_block <= event['block_number'] <= to_block
+        ]
+
+    def store(self, block_number, cert_id, cid):
+        self.events.append({
+            'block_number': block_number,
+            'log_index': len(self.events),
+            'cert_id': cert_id,
+            'cid': cid,
+            'owner': "0xOwner",
+            'tx_hash': f"0xtx{len(self.events)}"
+        })
+
+
+def make_indexer(tmp_path, chain, **kwargs):
+    index = CertEventIndex(str(tmp_path / "chain_index.sqlite3"))
+    return index, CertEventIndexer(index, lambda: chain, start_block=10, reorg_depth=3, **kwargs)
+
+
+class TestCertEventIndexer:
+    """Test syncing, lookups and reorg handling."""
+
+    def test_sync_in_block_batches(self, tmp_path):
+        """Events are fetched in block ranges and the latest CID wins."""
+        chain = FakeChain(head=60)
+        chain.store(12, "LEARNOVA-2025-000001", "QmOld")
+        chain.store(40, "LEARNOVA-2025-000002", "QmTwo")
+        chain.store(55, "LEARNOVA-2025-000001", "QmNew")
+        index, indexer = make_indexer(tmp_path, chain, batch_blocks=20)
+
+        assert indexer.sync() == 3
+
+        assert chain.log_requests == [(10, 29), (30, 49), (50, 60)]
+        assert index.lookup_many(["LEARNOVA-2025-000001", "LEARNOVA-2025-000002", "missing"]) == {
+            "LEARNOVA-2025-000001": "QmNew",
+            "LEARNOVA-2025-000002": "QmTwo"
+        }
+        assert index.state()['block_number'] == 60
+
+        chain.head = 70
+        chain.log_requests = []
+        indexer.sync()
+        assert chain.log_requests == [(61, 70)]
+        assert indexer.stats()['lag_blocks'] == 0
+
+    def test_reorg_rewinds_and_resyncs(self, tmp_path):
+        """A replaced tip block drops recent events and re-syncs them from the new fork."""
+        chain = FakeChain(head=50)
+        chain.store(49, "LEARNOVA-2025-000001", "QmOrphaned")
+        index, indexer = make_indexer(tmp_path, chain)
+        indexer.sync()
+        assert index.lookup("LEARNOVA-2025-000001") == "QmOrphaned"
+
+        chain.fork = 1
+        chain.events = []
+        chain.store(51, "LEARNOVA-2025-000001", "QmCanonical")
+        chain.head = 52
+        chain.log_requests = []
+        indexer.sync()
+
+        assert chain.log_requests == [(48, 52)]
+        assert index.lookup("LEARNOVA-2025-000001") == "QmCanonical"
+        assert index.state()['block_hash'] == chain.block_hash(52)
+
+    def test_rejected_range_is_split(self, tmp_path):
+        """A block range the node refuses is retried in smaller ranges."""
+        chain = FakeChain(head=29)
+        fetch = chain.get_cert_stored_events
+
+        def capped(from_block, to_block):
+            if to_block - from_block >= 10:
+                raise ValueError("query returned more than 10000 results")
+            return fetch(from_block, to_block)
+
+        chain.get_cert_stored_events = capped
+        index, indexer = make_indexer(tmp_path, chain, batch_blocks=20)
+        indexer.sync()
+
+        assert index.state()['block_number'] == 29
+        assert chain.log_requests == [(10, 19), (20, 29)]
+
+    def test_covers_issue_time(self, tmp_path):
+        """Missing certificates are only trusted as off-chain once the anchor window has passed."""
+        chain = FakeChain(head=1000)
+        index, indexer = make_indexer(tmp_path, chain)
+        assert index.covers("2023-11-14T22:13:20") is False
+
+        indexer.sync()
+        synced_ts = index.state()['block_timestamp']
+
+        assert index.covers(datetime.fromtimestamp(synced_ts - 3600)) is True
+        assert index.covers(datetime.fromtimestamp(synced_ts - 60)) is False
+        assert index.covers(None) is False
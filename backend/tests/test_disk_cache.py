@@ -0,0 +1,40 @@
+"""
+Tests for the disk-backed LRU cache.
+"""
+
+from app.utils.disk_cache import DiskLRUCache
+
+
+class TestDiskLRUCache:
+    """Test storage, recency and eviction."""
+
+    def test_get_and_set(self, tmp_path):
+        """Stored values round-trip and count as hits."""
+        cache = DiskLRUCache(str(tmp_path), max_bytes=1024)
+        cache.set("abc", b"hello")
+
+        assert cache.get("abc") == b"hello"
+        assert cache.get("missing") is None
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Entries are evicted oldest-access first once over budget."""
+        cache = DiskLRUCache(str(tmp_path), max_bytes=10)
+        cache.set("a", b"1234")
+        cache.set("b", b"1234")
+        cache.get("a")
+        cache.set("c", b"1234")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"1234"
+        assert cache.get("c") == b"1234"
+        assert cache.stats()['bytes'] == 8
+
+    def test_index_survives_restart(self, tmp_path):
+        """A new instance picks up existing entries."""
+        DiskLRUCache(str(tmp_path), max_bytes=1024).set("key", b"value")
+
+        cache = DiskLRUCache(str(tmp_path), max_bytes=1024)
+        assert cache.stats()['entries'] == 1
+        assert cache.get("key") == b"value"
@@ -0,0 +1,43 @@
+"""
+Tests for conditional and byte range request parsing.
+"""
+
+import pytest
+from app.utils.http_ranges import etag_matches, parse_byte_range, RangeNotSatisfiable
+
+
+class TestByteRanges:
+    """Test single ranges, suffix ranges and ranges past the end."""
+
+    @pytest.mark.parametrize("header, expected", [
+        ("bytes=0-3", (0, 3)),
+        ("bytes=10-", (10, 99)),
+        ("bytes=-5", (95, 99)),
+        ("bytes=90-500", (90, 99)),
+        ("bytes=-500", (0, 99)),
+    ])
+    def test_satisfiable_ranges(self, header, expected):
+        """Ranges are clamped to the content."""
+        assert parse_byte_range(header, 100) == expected
+
+    @pytest.mark.parametrize("header", [None, "", "bytes=0-1,5-6", "items=0-3", "bytes=5-2", "bytes=-"])
+    def test_ignored_ranges(self, header):
+        """Missing, multiple and malformed ranges mean the whole content."""
+        assert parse_byte_range(header, 100) is None
+
+    @pytest.mark.parametrize("header", ["bytes=100-", "bytes=150-200", "bytes=-0"])
+    def test_unsatisfiable_ranges(self, header):
+        """A range starting past the end cannot be served."""
+        with pytest.raises(RangeNotSatisfiable):
+            parse_byte_range(header, 100)
+
+
+class TestEtagMatches:
+    """Test If-None-Match lists, wildcards and weak tags."""
+
+    def test_matches(self):
+        assert etag_matches('"QmA"', '"QmA"')
+        assert etag_matches('"QmB", W/"QmA"', '"QmA"')
+        assert etag_matches('*', '"QmA"')
+        assert not etag_matches('"QmB"', '"QmA"')
+        assert not etag_matches(None, '"QmA"')
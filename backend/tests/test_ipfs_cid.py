@@ -0,0 +1,46 @@
+"""
+Tests for local IPFS CID computation.
+"""
+
+import pytest
+from app.utils.ipfs_cid import compute_cid
+
+
+class TestComputeCid:
+    """Test CIDs against values produced by `ipfs add`."""
+
+    def test_single_chunk_cidv0(self):
+        assert compute_cid(b"hello world\n") == "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"
+        assert compute_cid(memoryview(b"hello world\n")) == "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"
+
+    def test_empty_file(self):
+        assert compute_cid(b"") == "QmbFMke1KXqnYyBBWxB74N4c5SBnJMVAiMNRcGu6x1AwQH"
+
+    def test_single_chunk_cidv1_is_raw_block(self):
+        assert compute_cid(b"hello world\n", cid_version=1) == (
+            "bafkreifjjcie6lypi6ny7amxnfftagclbuxndqonfipmb64f2km2devei4"
+        )
+
+    def test_multi_chunk_builds_dag(self):
+        """Larger content is chunked into a dag-pb root; every byte affects the CID."""
+        content = bytes(range(256)) * 2048  # 512 KiB: two chunks
+        cid_v0 = compute_cid(content)
+        cid_v1 = compute_cid(content, cid_version=1)
+
+        assert cid_v0.startswith("Qm")
+        assert cid_v1.startswith("bafybei")  # dag-pb root over raw leaves
+        assert cid_v0 != compute_cid(content[:-1] + b"\x00")
+        # A tree deeper than one level gives a different root than a flat one
+        assert compute_cid(content, chunk_size=1024, max_links=4) != compute_cid(content, chunk_size=1024)
+
+    def test_multi_chunk_cidv0_matches_ipfs_add(self):
+        """Multi-chunk files hash as `ipfs add` (kubo v0.22) does: dag-pb File leaves under a File root."""
+        pattern = bytes(range(256)) * 2048  # 512 KiB: two full chunks
+        assert compute_cid(pattern) == "QmZ63CUmxwNSpqCDFL3x3EKXvbHhxdbfRLtW4Xonc53VbW"
+        # A short last chunk
+        assert compute_cid(pattern + b"tail") == "QmPq1b6UWJhroQw7QyCVjQS1kTJMBpMMRQuVkCToRSnbza"
+        assert compute_cid(b"\x00" * (1 << 20)) == "QmVkbauSDEaMP4Tkq6Epm9uW75mWm136n81YH8fGtfwdHU"
+
+    def test_rejects_unknown_version(self):
+        with pytest.raises(ValueError):
+            compute_cid(b"data", cid_version=2)
@@ -0,0 +1,152 @@
+"""
+Tests for the durable certificate issuance queue.
+"""
+
+import itertools
+import pytest
+from unittest.mock import Mock, AsyncMock
+from app.services.issuance_queue import IssuanceQueue, IssuanceWorkerPool
+
+
+def make_queue(tmp_path, **kwargs):
+    serials = itertools.count(1)
+    return IssuanceQueue(
+        path=str(tmp_path / "queue.sqlite3"),
+        retry_base_seconds=0,
+        cert_id_factory=lambda: f"LEARNOVA-2025-{next(serials):06d}",
+        **kwargs
+    )
+
+
+def make_payload(user_id="user-1", course_id="course-1"):
+    return {
+        'user_id': user_id,
+        'course_id': course_id,
+        'course_name': "Course",
+        'learner_name': "Learner",
+        'grade': "Pass",
+        'duration_hours': 1.0,
+        'modules': 1,
+        'metadata': None,
+        'owner_address': None
+    }
+
+
+class TestIssuanceQueue:
+    """Test queue persistence, claiming and retries."""
+
+    def test_enqueue_assigns_cert_id(self, tmp_path):
+        """Enqueued jobs get a cert_id and are visible from a new connection."""
+        queue = make_queue(tmp_path)
+        job = queue.enqueue(make_payload())
+
+        assert job['cert_id'] == "LEARNOVA-2025-000001"
+        assert job['status'] == "queued"
+        assert make_queue(tmp_path).get(job['cert_id'])['status'] == "queued"
+
+    def test_duplicate_learner_course_not_requeued(self, tmp_path):
+        """A second request for the same learner and course returns the first job."""
+        queue = make_queue(tmp_path)
+        first = queue.enqueue(make_payload())
+        second = queue.enqueue(make_payload())
+
+        assert second['cert_id'] == first['cert_id']
+        assert second['created'] is False
+        assert queue.stats()['queued'] == 1
+
+    def test_enqueue_keeps_existing_cert_id(self, tmp_path):
+        """A learner's existing certificate ID is used, and its failed job is queued again."""
+        queue = make_queue(tmp_path, max_attempts=1)
+        job = queue.enqueue(make_payload(), "LEARNOVA-2024-000042")
+        queue.claim()
+        queue.fail(job['cert_id'], "boom")
+
+        again = queue.enqueue(make_payload(), "LEARNOVA-2024-000042")
+
+        assert job['cert_id'] == "LEARNOVA-2024-000042"
+        assert again['cert_id'] == "LEARNOVA-2024-000042"
+        assert again['created'] is True
+        assert (again['status'], again['attempts'], again['error']) == ("queued", 0, None)
+
+    def test_claim_and_complete(self, tmp_path):
+        """A claimed job is not claimed again and stores its result when completed."""
+        queue = make_queue(tmp_path)
+        queue.enqueue(make_payload())
+
+        job = queue.claim()
+        assert job['status'] == "running"
+        assert job['payload']['user_id'] == "user-1"
+        assert queue.claim() is None
+
+        queue.complete(job['cert_id'], {'status': 'success', 'tx_hash': '0xabc'})
+        done = queue.get(job['cert_id'])
+        assert done['status'] == "issued"
+        assert done['result']['tx_hash'] == '0xabc'
+
+    def test_failed_job_retried_then_failed(self, tmp_path):
+        """Failures are retried until max_attempts is reached."""
+        queue = make_queue(tmp_path, max_attempts=2)
+        queue.enqueue(make_payload())
+
+        job = queue.claim()
+        assert queue.fail(job['cert_id'], "pinata down") == "queued"
+        job = queue.claim()
+        assert job['attempts'] == 2
+        assert queue.fail(job['cert_id'], "pinata down") == "failed"
+        assert queue.get(job['cert_id'])['error'] == "pinata down"
+
+    def test_expired_lease_is_reclaimed(self, tmp_path):
+        """Jobs left running by a dead worker are picked up after the lease expires."""
+        queue = make_queue(tmp_path, lease_seconds=-1)
+        queue.enqueue(make_payload())
+
+        first = queue.claim()
+        second = queue.claim()
+        assert second['cert_id'] == first['cert_id']
+        assert second['attempts'] == 2
+
+
+@pytest.mark.asyncio
+class TestIssuanceWorkerPool:
+    """Test running queued jobs through the pipeline."""
+
+    async def test_process_runs_pipeline_with_cert_id(self, tmp_path):
+        """Workers issue with the preassigned cert_id and record the result."""
+        queue = make_queue(tmp_path)
+        queue.enqueue(make_payload())
+        pipeline = Mock()
+        pipeline.issue_certificate = AsyncMock(return_value={'status': 'success', 'cert_id': "LEARNOVA-2025-000001"})
+        pool = IssuanceWorkerPool(queue, lambda: pipeline, workers=1)
+
+        status = await pool.process(queue.claim())
+
+        assert status == "issued"
+        assert pipeline.issue_certificate.call_args.kwargs['cert_id'] == "LEARNOVA-2025-000001"
+        assert queue.get("LEARNOVA-2025-000001")['status'] == "issued"
+
+    async def test_pipeline_failure_requeues(self, tmp_path):
+        """A failed pipeline result schedules a retry."""
+        queue = make_queue(tmp_path)
+        queue.enqueue(make_payload())
+        pipeline = Mock()
+        pipeline.issue_certificate = AsyncMock(return_value={'status': 'failed', 'error': "boom"})
+        pool = IssuanceWorkerPool(queue, lambda: pipeline, workers=1)
+
+        status = await pool.process(queue.claim())
+
+        assert status == "queued"
+        assert queue.get("LEARNOVA-2025-000001")['error'] == "boom"
+
+    async def test_status_reports_issued_cert_id(self, tmp_path):
+        """A job whose learner was issued under another cert_id reports that one."""
+        queue = make_queue(tmp_path)
+        queue.enqueue(make_payload())
+        pipeline = Mock()
+        pipeline.issue_certificate = AsyncMock(
+            return_value={'status': 'already_issued', 'cert_id': "LEARNOVA-2024-000042"}
+        )
+        pool = IssuanceWorkerPool(queue, lambda: pipeline, workers=1)
+
+        await pool.process(queue.claim())
+
+        assert queue.get("LEARNOVA-2025-000001")['cert_id'] == "LEARNOVA-2024-000042"
@@ -0,0 +1,35 @@
+"""
+Tests for background resumption of failed issuances.
+"""
+
+import pytest
+from unittest.mock import Mock, AsyncMock
+from app.services.issuance_sweeper import IssuanceSweeper
+
+
+@pytest.mark.asyncio
+class TestIssuanceSweeper:
+    """Test which rows are resumed and how outcomes are counted."""
+
+    async def test_sweep_resumes_resumable_rows(self):
+        """Resumable rows are resumed one by one; others are skipped."""
+        rows = [
+            {'cert_id': "LEARNOVA-2025-000001", 'status': 'failed'},
+            {'cert_id': "LEARNOVA-2025-000002", 'status': 'pending'},
+            {'cert_id': "LEARNOVA-2025-000003", 'status': 'failed'}
+        ]
+        pipeline = Mock()
+        pipeline.db.get_resumable_certificates = AsyncMock(return_value=rows)
+        pipeline.is_resumable.side_effect = lambda record: record['status'] == 'failed'
+        pipeline.resume_certificate = AsyncMock(side_effect=[
+            {'status': 'success'},
+            {'status': 'failed', 'error': "pinata down"}
+        ])
+
+        counts = await IssuanceSweeper(pipeline, batch_size=10, retry_seconds=60).sweep()
+
+        assert counts == {'resumed': 1, 'superseded': 0, 'failed': 1}
+        assert [call.args[0] for call in pipeline.resume_certificate.await_args_list] == [
+            "LEARNOVA-2025-000001", "LEARNOVA-2025-000003"
+        ]
+        assert pipeline.db.get_resumable_certificates.await_args.args[1] == 10
@@ -0,0 +1,186 @@
+"""
+Tests for PDF text extraction utilities.
+"""
+
+import io
+import os
+import pytest
+from reportlab.pdfgen import canvas
+from starlette.datastructures import UploadFile
+from app.utils import pdf_utils
+from app.utils.disk_cache import DiskLRUCache
+from app.utils.pdf_backends import get_backend
+from app.utils.pdf_utils import (
+    extract_pdf_pages, extract_text_from_pdf, extract_text_from_upload,
+    extract_sample_from_upload, sample_page_indices
+)
+from app.utils.upload_utils import spool_upload, UploadRejectedError
+
+
+def make_pdf(page_texts):
+    """Build a small PDF with one line of text per page."""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for text in page_texts:
+        pdf.drawString(72, 720, text)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+class TestPdfExtraction:
+    """Test sequential and parallel page extraction."""
+
+    def test_parallel_matches_sequential(self):
+        """Parallel extraction reassembles pages in page order."""
+        content = make_pdf([f"Page number {i}" for i in range(12)])
+
+        sequential = extract_pdf_pages(content, parallel=False)
+        parallel = extract_pdf_pages(content, parallel=True, workers=3)
+
+        assert parallel['pages'] == sequential['pages']
+        assert "Page number 0" in parallel['pages'][0]
+        assert "Page number 11" in parallel['pages'][11]
+        assert len(parallel['page_timings']) == 12
+
+    def test_page_cap(self):
+        """Only the first max_pages pages are extracted."""
+        content = make_pdf([f"Page number {i}" for i in range(5)])
+
+        result = extract_pdf_pages(content, max_pages=2)
+
+        assert result['page_count'] == 5
+        assert result['truncated'] is True
+        assert len(result['pages']) == 2
+
+    def test_backend_selection(self):
+        """Unknown backends fall back to PyPDF2; auto picks an installed backend."""
+        assert get_backend("pypdf2").name == "pypdf2"
+        assert get_backend("no-such-backend").name == "pypdf2"
+        assert get_backend("auto").is_available()
+
+    def test_invalid_pdf(self):
+        """Non-PDF bytes raise ValueError."""
+        with pytest.raises(ValueError):
+            extract_text_from_pdf(b"not a pdf")
+
+
+@pytest.mark.asyncio
+class TestUploadSpooling:
+    """Test streaming uploads into a spool."""
+
+    async def test_small_upload_stays_in_memory(self):
+        """Uploads below the spool threshold are kept in memory."""
+        content = make_pdf(["Short lesson"])
+        file = UploadFile(io.BytesIO(content), filename="lesson.pdf")
+
+        with await spool_upload(file, require_pdf=True) as upload:
+            assert upload.in_memory
+            assert upload.size == len(content)
+            assert "Short lesson" in extract_text_from_pdf(upload.source)
+            # The bytes are copied out of the buffer once, not on every access
+            assert upload.source is upload.source is upload.read_bytes()
+
+    async def test_rollover_and_extract_from_path(self):
+        """Large uploads roll over to disk and extract from the spool file."""
+        content = make_pdf([f"Page number {i}" for i in range(3)])
+        file = UploadFile(io.BytesIO(content), filename="lesson.pdf")
+
+        with await spool_upload(file, require_pdf=True, spool_memory_bytes=16) as upload:
+            assert not upload.in_memory
+            assert os.path.exists(upload.source)
+            assert "Page number 2" in extract_text_from_pdf(upload.source)
+            path = upload.path
+        assert not os.path.exists(path)
+
+    async def test_rejects_non_pdf(self):
+        """Content without PDF magic bytes is rejected."""
+        file = UploadFile(io.BytesIO(b"hello world"), filename="lesson.pdf")
+
+        with pytest.raises(UploadRejectedError) as exc:
+            await spool_upload(file, require_pdf=True)
+        assert exc.value.status_code == 415
+
+    async def test_rejects_oversized(self):
+        """Uploads larger than max_bytes are rejected."""
+        file = UploadFile(io.BytesIO(b"%PDF-" + b"x" * 100), filename="lesson.pdf")
+
+        with pytest.raises(UploadRejectedError) as exc:
+            await spool_upload(file, max_bytes=50, require_pdf=True)
+        assert exc.value.status_code == 413
+
+
+@pytest.mark.asyncio
+class TestExtractedTextCache:
+    """Test the extracted-text cache for repeat uploads."""
+
+    async def test_repeat_upload_skips_parsing(self, tmp_path, monkeypatch):
+        """A second upload of the same bytes is served from the cache."""
+        monkeypatch.setattr(pdf_utils, "_text_cache", DiskLRUCache(str(tmp_path), 1024 * 1024, suffix=".json"))
+        content = make_pdf(["Cached lesson"])
+
+        with await spool_upload(UploadFile(io.BytesIO(content), filename="a.pdf"), require_pdf=True) as upload:
+            first = extract_text_from_upload(upload)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("PDF should not be parsed on a cache hit")
+
+        monkeypatch.setattr(pdf_utils, "extract_pdf_pages", fail)
+        with await spool_upload(UploadFile(io.BytesIO(content), filename="b.pdf"), require_pdf=True) as upload:
+            second = extract_text_from_upload(upload)
+
+        assert second['text'] == first['text']
+        assert "Cached lesson" in second['text']
+        assert first['cached'] is False
+        assert second['cached'] is True
+
+
+class TestQuestionnaireSampling:
+    """Test stratified page sampling for long documents."""
+
+    def test_sample_spans_document(self):
+        """Sampled pages are spread across every part of the document."""
+        indices = sample_page_indices(400, 10)
+        assert len(indices) == 10
+        assert indices == sorted(set(indices))
+        assert indices[0] < 40 and indices[-1] >= 360
+
+    def test_sample_includes_section_starts(self):
+        """Chapter start pages from the outline are always sampled."""
+        indices = sample_page_indices(300, 8, section_starts=[0, 120, 250])
+        # The page after each chapter start is taken to skip title pages
+        assert {1, 121, 251} <= set(indices)
+        assert len(indices) == 8
+
+    def test_short_document_not_sampled(self):
+        """Documents no longer than the sample are returned whole."""
+        assert sample_page_indices(5, 12) == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_long_upload_is_sampled(self, monkeypatch):
+        """Long PDFs are sampled and trimmed to the character budget."""
+        monkeypatch.setattr(pdf_utils, "TEXT_CACHE_ENABLED", False)
+        # Letters rather than numbers, so pages are not mistaken for a running header
+        topics = [f"Topic {chr(65 + i)}{chr(97 + i)} body" for i in range(30)]
+        content = make_pdf(topics)
+
+        with await spool_upload(UploadFile(io.BytesIO(content), filename="book.pdf"), require_pdf=True) as upload:
+            result = extract_sample_from_upload(upload, threshold=10, sample_size=5, max_chars=10000)
+
+        assert result['sampled'] is True
+        assert result['page_count'] == 30
+        assert len(result['sampled_pages']) == 5
+        for page in result['sampled_pages']:
+            assert topics[page - 1] in result['text']
+
+    @pytest.mark.asyncio
+    async def test_short_upload_uses_full_text(self, monkeypatch):
+        """PDFs under the threshold are extracted in full."""
+        monkeypatch.setattr(pdf_utils, "TEXT_CACHE_ENABLED", False)
+        content = make_pdf(["First page", "Second page"])
+
+        with await spool_upload(UploadFile(io.BytesIO(content), filename="short.pdf"), require_pdf=True) as upload:
+            result = extract_sample_from_upload(upload, threshold=10)
+
+        assert result['sampled'] is False
+        assert "First page" in result['text'] and "Second page" in result['text']
@@ -0,0 +1,58 @@
+"""
+Tests for leased certificate serial allocation.
+"""
+
+import json
+import threading
+from app.services.serial_allocator import SerialAllocator
+
+
+class TestSerialAllocator:
+    """Test block leasing, uniqueness across allocators and yearly rollover."""
+
+    def test_serials_served_from_leased_block(self, tmp_path):
+        """Only the first serial of each block touches the counter file."""
+        path = tmp_path / "cert_serial"
+        allocator = SerialAllocator(str(path), block_size=3)
+
+        assert [allocator.next(2025) for _ in range(3)] == [1, 2, 3]
+        assert json.loads(path.read_text()) == {"2025": 3}
+        assert allocator.next(2025) == 4
+        assert json.loads(path.read_text()) == {"2025": 6}
+
+    def test_allocators_never_share_serials(self, tmp_path):
+        """Allocators on one file (as in separate workers) hand out disjoint serials."""
+        path = str(tmp_path / "cert_serial")
+        allocators = [SerialAllocator(path, block_size=4) for _ in range(4)]
+        issued = []
+        issued_lock = threading.Lock()
+
+        def issue(allocator):
+            serials = [allocator.next(2025) for _ in range(50)]
+            with issued_lock:
+                issued.extend(serials)
+
+        threads = [threading.Thread(target=issue, args=(allocator,)) for allocator in allocators]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(issued) == len(set(issued)) == 200
+
+    def test_year_rollover_restarts_serials(self, tmp_path):
+        path = tmp_path / "cert_serial"
+        allocator = SerialAllocator(str(path), block_size=10)
+
+        assert allocator.next(2025) == 1
+        assert allocator.next(2026) == 1
+        assert allocator.next(2025) == 2
+        assert json.loads(path.read_text()) == {"2025": 10, "2026": 10}
+
+    def test_legacy_counter_file(self, tmp_path):
+        """The old single-number counter continues for the year it is first used in."""
+        path = tmp_path / "cert_serial"
+        path.write_text("13")
+
+        assert SerialAllocator(str(path), block_size=5).next(2025) == 14
+        assert json.loads(path.read_text()) == {"2025": 18}
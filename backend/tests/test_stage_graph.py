@@ -0,0 +1,119 @@
+"""
+Tests for the stage graph runner.
+"""
+
+import time
+import asyncio
+import pytest
+from app.services.stage_graph import StageGraph
+
+
+class TestStageGraph:
+    """Test dependency-ordered concurrent stage execution."""
+
+    @pytest.mark.asyncio
+    async def test_dependencies_receive_results(self):
+        """Stages get the results of their dependencies."""
+        graph = (
+            StageGraph()
+            .add('a', lambda _: 2)
+            .add('b', lambda inputs: inputs['a'] * 10, deps=['a'])
+        )
+        run = await graph.run()
+
+        assert run['results'] == {'a': 2, 'b': 20}
+        assert run['timings']['b']['start'] >= run['timings']['a']['end']
+
+    @pytest.mark.asyncio
+    async def test_independent_stages_overlap(self):
+        """Sync and async stages without dependencies between them run concurrently."""
+        async def wait(_):
+            await asyncio.sleep(0.2)
+
+        graph = (
+            StageGraph()
+            .add('start', lambda _: None)
+            .add('blocking', lambda _: time.sleep(0.2), deps=['start'])
+            .add('waiting', wait, deps=['start'])
+        )
+        run = await graph.run()
+
+        assert run['elapsed'] < 0.35
+        assert run['critical_path'][0] == 'start'
+        assert run['critical_path'][-1] in ('blocking', 'waiting')
+
+    @pytest.mark.asyncio
+    async def test_critical_path_follows_slowest_branch(self):
+        """The critical path runs through the dependency that finished last."""
+        graph = (
+            StageGraph()
+            .add('render', lambda _: None)
+            .add('slow', lambda _: time.sleep(0.15), deps=['render'])
+            .add('fast', lambda _: None, deps=['render'])
+            .add('save', lambda _: None, deps=['slow', 'fast'])
+        )
+        run = await graph.run()
+
+        assert run['critical_path'] == ['render', 'slow', 'save']
+        assert run['critical_path_seconds'] >= 0.15
+
+    @pytest.mark.asyncio
+    async def test_optional_failure_yields_none(self):
+        """A failing optional stage does not stop its dependents."""
+        def fail(_):
+            raise RuntimeError("pin failed")
+
+        graph = (
+            StageGraph()
+            .add('pin', fail, required=False)
+            .add('save', lambda inputs: inputs['pin'] is None, deps=['pin'])
+        )
+        run = await graph.run()
+
+        assert run['failed'] == ['pin']
+        assert run['results']['save'] is True
+
+    @pytest.mark.asyncio
+    async def test_required_failure_raises(self):
+        """A failing required stage aborts the run and cancels pending stages."""
+        cancelled = asyncio.Event()
+
+        async def slow(_):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        def fail(_):
+            raise RuntimeError("render failed")
+
+        graph = StageGraph().add('render', fail).add('other', slow)
+
+        with pytest.raises(RuntimeError, match="render failed"):
+            await graph.run()
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_required_failure_waits_for_running_threads(self):
+        """Stages already running in threads finish before the failure is raised."""
+        finished = []
+
+        def anchor(_):
+            time.sleep(0.2)
+            finished.append('anchor')
+
+        async def fail(_):
+            await asyncio.sleep(0.05)
+            raise RuntimeError("upload failed")
+
+        graph = StageGraph().add('anchor', anchor).add('pin', fail)
+
+        with pytest.raises(RuntimeError, match="upload failed"):
+            await graph.run()
+        assert finished == ['anchor']
+
+    def test_unknown_dependency_rejected(self):
+        """Dependencies must be added before the stages that use them."""
+        with pytest.raises(ValueError):
+            StageGraph().add('save', lambda _: None, deps=['pin'])
@@ -0,0 +1,48 @@
+"""
+Tests for extracted-text normalization.
+"""
+
+from app.utils.text_normalizer import normalize_pages, normalize_text, estimate_tokens
+
+
+class TestTextNormalizer:
+    """Test header/footer removal and whitespace cleanup."""
+
+    def test_removes_running_headers_and_page_numbers(self):
+        """Lines repeated at page edges and bare page numbers are dropped."""
+        bodies = [
+            "Cells are the basic unit of life.\nThey divide by mitosis.",
+            "Proteins fold into shapes.\nEnzymes catalyse reactions.",
+            "DNA stores genetic information.\nIt is copied before division.",
+            "Membranes control transport.\nThey are lipid bilayers.",
+        ]
+        pages = [
+            f"Intro to Biology - Chapter 2\n{body}\nPage {i + 1} of 4\n(c) Learnova Press"
+            for i, body in enumerate(bodies)
+        ]
+
+        result = normalize_pages(pages)
+
+        assert "Intro to Biology" not in result['text']
+        assert "Learnova Press" not in result['text']
+        assert "Page 2 of 4" not in result['text']
+        assert "Enzymes catalyse reactions." in result['text']
+        assert result['stats']['removed_lines'] == 12
+        assert result['stats']['tokens_after'] < result['stats']['tokens_before']
+
+    def test_short_documents_keep_repeated_lines(self):
+        """Repetition is not inferred from fewer than three pages."""
+        pages = ["Summary\nPoint one.", "Summary\nPoint two."]
+
+        assert normalize_pages(pages)['text'].count("Summary") == 2
+
+    def test_hyphenation_and_whitespace(self):
+        """Hyphenated line breaks are rejoined and whitespace collapsed."""
+        text = "Cells divide by mito-\nsis   in\t most\n\n\n\ntissues."
+
+        assert normalize_text(text) == "Cells divide by mitosis in most\n\ntissues."
+
+    def test_estimate_tokens(self):
+        """Token estimate is roughly four characters per token."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcdefgh") == 2
@@ -0,0 +1,79 @@
+"""
+Tests for span tracing and exporters.
+"""
+
+import json
+import asyncio
+import pytest
+from app.services import tracing
+from app.services.tracing import JsonLinesExporter, NullExporter, span, traced, current_span
+from tests.conftest import CollectingExporter
+
+
+class TestSpans:
+    """Test span nesting, attributes and errors."""
+
+    def test_nested_spans_share_trace(self, exporter):
+        """Child spans record their parent and trace."""
+        with span("parent", cert_id="LEARNOVA-2025-000001") as parent:
+            with span("child") as child:
+                child.set_attribute('bytes', 42)
+
+        assert [s.name for s in exporter.spans] == ["child", "parent"]
+        assert child.parent_id == parent.span_id
+        assert child.trace_id == parent.trace_id
+        assert child.attributes == {'bytes': 42}
+        assert parent.duration >= child.duration
+        assert current_span() is None
+
+    def test_error_marks_span(self, exporter):
+        """Exceptions are recorded on the span and re-raised."""
+        with pytest.raises(ValueError):
+            with span("failing"):
+                raise ValueError("boom")
+
+        failed = exporter.by_name("failing")
+        assert failed.status == "error"
+        assert "boom" in failed.error
+
+    @pytest.mark.asyncio
+    async def test_worker_threads_inherit_parent(self, exporter):
+        """Spans opened in asyncio.to_thread nest under the caller's span."""
+        def blocking():
+            with span("in_thread"):
+                pass
+
+        @traced("root")
+        async def run():
+            await asyncio.to_thread(blocking)
+
+        await run()
+
+        assert exporter.by_name("in_thread").parent_id == exporter.by_name("root").span_id
+
+
+class TestExporters:
+    """Test exporter selection and the JSON-lines exporter."""
+
+    def test_jsonl_exporter_writes_lines(self, tmp_path):
+        """Each finished span becomes one JSON line."""
+        path = tmp_path / "traces.jsonl"
+        tracing.set_exporter(JsonLinesExporter(str(path)))
+        try:
+            with span("pinata.pin", bytes=10):
+                pass
+            with span("chain.wait_receipt"):
+                pass
+        finally:
+            tracing.set_exporter(None)
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line['name'] for line in lines] == ["pinata.pin", "chain.wait_receipt"]
+        assert lines[0]['attributes'] == {'bytes': 10}
+        assert lines[0]['duration_ms'] >= 0
+
+    def test_exporter_from_env(self):
+        """TRACE_EXPORTER accepts built-in names and module:Class paths."""
+        assert isinstance(tracing._exporter_from_env("none"), NullExporter)
+        assert isinstance(tracing._exporter_from_env("tests.conftest:CollectingExporter"), CollectingExporter)
+        assert isinstance(tracing._exporter_from_env("missing.module:Nope"), NullExporter)
@@ -0,0 +1,52 @@
+"""
+Tests for the in-memory TTL cache.
+"""
+
+from unittest.mock import patch
+from app.utils.ttl_cache import TTLCache
+
+
+class TestTTLCache:
+    """Test expiry, eviction and invalidation."""
+
+    def test_get_and_set(self):
+        """Stored values round-trip and count as hits."""
+        cache = TTLCache(max_entries=10)
+        cache.set("abc", {'status': 'verified'}, ttl=60)
+
+        assert cache.get("abc") == {'status': 'verified'}
+        assert cache.get("missing") is None
+        assert cache.stats()['hit_ratio'] == 0.5
+
+    def test_entries_expire(self):
+        """Entries are misses once their TTL has passed."""
+        cache = TTLCache(max_entries=10)
+        with patch('app.utils.ttl_cache.time.monotonic', return_value=100.0):
+            cache.set("abc", "value", ttl=5)
+        with patch('app.utils.ttl_cache.time.monotonic', return_value=104.0):
+            assert cache.get("abc") == "value"
+        with patch('app.utils.ttl_cache.time.monotonic', return_value=105.0):
+            assert cache.get("abc") is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        """The least recently used entry is dropped when full."""
+        cache = TTLCache(max_entries=2)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_delete_counts_invalidations(self):
+        """Deleting a present entry is counted; a zero TTL stores nothing."""
+        cache = TTLCache(max_entries=10)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=0)
+
+        assert cache.delete("a") is True
+        assert cache.delete("b") is False
+        assert cache.stats()['invalidations'] == 1
@@ -0,0 +1,8 @@
+-- Resumable issuance: rows are checkpointed before the document CID exists
+-- (and failed rows may never get one), so cid_doc can no longer be required
+ALTER TABLE public.certificates ALTER COLUMN cid_doc DROP NOT NULL;
+
+-- Sweeper lookup of failed/pending rows, oldest first
+CREATE INDEX IF NOT EXISTS idx_certificates_status_updated_at
+  ON public.certificates(status, updated_at)
+  WHERE status IN ('failed', 'pending');
@@ -0,0 +1,13 @@
+-- Cross-worker issuance lock: one row per learner and course while an
+-- issuance runs. Expired rows (crashed holders) are taken over.
+CREATE TABLE IF NOT EXISTS public.certificate_issuance_leases (
+  user_id UUID NOT NULL,
+  course_id UUID NOT NULL,
+  holder TEXT NOT NULL,
+  expires_at TIMESTAMPTZ NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (user_id, course_id)
+);
+
+-- Only the backend (service role, which bypasses RLS) touches leases
+ALTER TABLE public.certificate_issuance_leases ENABLE ROW LEVEL SECURITY;